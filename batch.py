@@ -0,0 +1,120 @@
+import argparse
+
+from modulo.llm_judge_core import LLMJudgeEvaluatorCore
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+from modulo.llm_judge_batch import LLMJudgeBatchEvaluator
+from modulo.llm_judge_dedup import add_dedup_arguments, build_deduplicator
+from modulo.llm_judge_cache import add_cache_arguments, build_cache
+from modulo.llm_judge_retry import add_retry_arguments, build_retry_policy
+from modulo.llm_judge_sampling import add_sampling_arguments, build_sampling_policy
+from modulo.llm_judge_pool import add_pool_arguments, build_client_pool
+from modulo.llm_judge_scheduler import add_model_arguments, apply_model_arguments, build_keep_alive
+from modulo.llm_judge_compaction import add_compaction_arguments, build_compactor
+from modulo.llm_judge_static import add_static_arguments
+from modulo.llm_judge_sandbox import add_test_arguments, build_test_runner
+from modulo.llm_judge_store import add_store_arguments, build_store
+from modulo.llm_judge_incremental import add_incremental_arguments
+from modulo.llm_judge_metrics import add_metrics_arguments, print_metrics_summary, write_metrics
+from modulo.utils import read_file
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a cohort of submissions for one exercise with LLM-as-a-Judge.",
+        epilog="Example: python batch.py question.md submissions/ results.jsonl python llama3.1:8b 4"
+    )
+    parser.add_argument("question_file", help="Markdown file with the exercise requirement")
+    parser.add_argument("submissions", help="Directory of submissions or a glob pattern")
+    parser.add_argument("results_file", help="Append-only JSONL file receiving one result per submission")
+    parser.add_argument("language", nargs="?", default="python", help="Programming language (default: python)")
+    parser.add_argument("model_name", nargs="?", default="llama3.1:8b", help="Ollama model (default: llama3.1:8b)")
+    parser.add_argument("workers", nargs="?", type=int, default=4, help="Submissions evaluated concurrently (default: 4)")
+    parser.add_argument("--combined-judge", action="store_true", help="Score every criterion in a single LLM call")
+    parser.add_argument("--feedback", action="store_true", help="Always ask the chief judge for narrative feedback")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and stop each judge as soon as its JSON is complete")
+    parser.add_argument("--no-structured-output", action="store_true", help="Do not constrain responses with JSON schemas (for Ollama versions before 0.5)")
+    parser.add_argument("--static-processes", type=int, default=None, help="Processes used to pre-analyse the cohort (default: one per CPU)")
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_sampling_arguments(parser)
+    add_pool_arguments(parser)
+    add_model_arguments(parser)
+    add_compaction_arguments(parser)
+    add_static_arguments(parser)
+    add_test_arguments(parser)
+    add_dedup_arguments(parser)
+    add_store_arguments(parser)
+    add_incremental_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    question_file = args.question_file
+    submissions = args.submissions
+    results_file = args.results_file
+    language = args.language
+    model_name = args.model_name
+    workers = args.workers
+    
+    exercise_requirement = read_file(question_file)
+    if not exercise_requirement:
+        print("Failed to read exercise requirement file")
+        return
+    
+    cache = build_cache(args)
+    client_pool = build_client_pool(args)
+    
+    evaluator_core = LLMJudgeEvaluatorCore(model_name=model_name, compactor=build_compactor(args))
+    try:
+        apply_model_arguments(evaluator_core, args)
+    except ValueError as e:
+        print(f"Invalid model assignment: {e}")
+        return
+    
+    evaluator_api = LLMJudgeEvaluatorAPI(model_name=model_name, evaluator_core=evaluator_core, cache=cache,
+                                         judge_mode="combined" if args.combined_judge else "separate",
+                                         narrative_feedback=args.feedback, stream=args.stream,
+                                         structured_output=not args.no_structured_output,
+                                         retry_policy=build_retry_policy(args), client_pool=client_pool,
+                                         max_concurrency=args.max_concurrency, keep_alive=build_keep_alive(args, evaluator_core),
+                                         prefix_warmup=not args.no_prefix_warmup,
+                                         sampling_policy=build_sampling_policy(args),
+                                         incremental_max_change=args.incremental_max_change,
+                                         static_analysis=not args.no_static_analysis,
+                                         test_runner=build_test_runner(args, question_file, language),
+                                         test_mode="replace" if args.tests_replace_correctness else "inform")
+    batch_evaluator = LLMJudgeBatchEvaluator(evaluator_api, workers=workers, deduplicator=build_deduplicator(args),
+                                             static_processes=args.static_processes, store=build_store(args),
+                                             incremental=not args.no_incremental)
+    
+    print(" Starting LLM-as-a-Judge batch evaluation...")
+    print(f" Exercise: {question_file}")
+    print(f" Submissions: {submissions}")
+    print(f" Language: {language}")
+    print(f" Model: {model_name}")
+    print(f" Workers: {workers}")
+    
+    summary = batch_evaluator.evaluate_cohort(exercise_requirement, submissions, results_file, language)
+    
+    if cache:
+        stats = cache.stats()
+        print(f" Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
+    
+    if len(client_pool.hosts) > 1:
+        stats = client_pool.stats()
+        hosts = ", ".join(f"{name}: {host['requests']} requests" for name, host in stats["hosts"].items())
+        print(f" Hosts: {hosts} ({stats['hedged_requests']} hedged, {stats['hedge_wins']} won by the hedge)")
+    
+    scheduler_stats = evaluator_api.scheduler_stats()
+    if scheduler_stats["fifo_model_switches"]:
+        print(f" Models: {scheduler_stats['model_switches']} switches, {scheduler_stats['model_loads_avoided']} loads avoided versus arrival order")
+    
+    print_metrics_summary(evaluator_api.metrics)
+    write_metrics(evaluator_api.metrics, args)
+    
+    print(f"Batch completed! {summary['evaluated']} evaluated ({summary['duplicates']} reused from near-duplicates), {summary['failed']} failed, {summary['skipped']} skipped "
+          f"({summary['submissions_per_minute']} submissions/min). Results appended to: {results_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Never needed before the first model call: the CLI must reach --dry-run, report.py and argument errors without them.
+FORBIDDEN_MODULES = ["ollama", "httpx", "pydantic", "multiprocessing"]
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    # Graders run an installed tree with its bytecode cached; timing source compilation would measure the wrong thing.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"name": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                        "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return modules
+
+def measure_import(module: str) -> List[Dict[str, Any]]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=child_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+def measure_dry_run(runs: int) -> float:
+    command = [sys.executable, "main.py", "question.md", "answer.py", os.devnull, "--dry-run"]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, env=child_env(), stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def check_module(module: str, runs: int, budget_ms: float, top: int) -> Dict[str, Any]:
+    measure_import(module)
+    samples = [measure_import(module) for _ in range(runs)]
+    totals = [next(entry["cumulative_ms"] for entry in sample if entry["name"] == module and entry["depth"] == 0) for sample in samples]
+    median_ms = statistics.median(totals)
+    typical = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    
+    # Everything imported above the target belongs to the interpreter's own start-up (site, .pth files).
+    end = next(index for index, entry in enumerate(typical) if entry["name"] == module and entry["depth"] == 0)
+    start = end
+    while start > 0 and typical[start - 1]["depth"] > 0:
+        start -= 1
+    own = typical[start:end + 1]
+    names = {entry["name"] for entry in own}
+    
+    return {
+        "module": module,
+        "median_ms": round(median_ms, 1),
+        "budget_ms": budget_ms,
+        "within_budget": median_ms <= budget_ms,
+        "forbidden": sorted({name.split(".")[0] for name in names} & set(FORBIDDEN_MODULES)),
+        "slowest": [{"name": entry["name"], "self_ms": round(entry["self_ms"], 1), "cumulative_ms": round(entry["cumulative_ms"], 1)}
+                    for entry in sorted(own, key=lambda entry: entry["self_ms"], reverse=True)[:top]]
+    }
+
+def print_report(report: Dict[str, Any]):
+    print("=" * 72)
+    print(" LLM-AS-A-JUDGE STARTUP")
+    print("=" * 72)
+    for check in report["imports"]:
+        status = "ok" if check["within_budget"] and not check["forbidden"] else "FAILED"
+        print(f"\n import {check['module']}: {check['median_ms']:.1f} ms (budget {check['budget_ms']:.0f} ms) {status}")
+        if check["forbidden"]:
+            print(f"   Loaded at start-up but only needed by model calls: {', '.join(check['forbidden'])}")
+        for entry in check["slowest"]:
+            print(f"   {entry['name']:<40} {entry['self_ms']:>6.1f} ms self {entry['cumulative_ms']:>7.1f} ms cumulative")
+    if "dry_run_ms" in report:
+        print(f"\n main.py --dry-run wall time: {report['dry_run_ms']:.1f} ms")
+    print("=" * 72)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the CLI's cold import time against a budget with python -X importtime.")
+    parser.add_argument("--module", action="append", default=None, help="Module to import, repeat per module (default: main and report)")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Largest median import time per module in ms (default: 150)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured imports per module; the median is checked (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules listed per check (default: 10)")
+    parser.add_argument("--skip-dry-run", action="store_true", help="Do not time a full main.py --dry-run invocation")
+    parser.add_argument("--json", dest="json_file", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    
+    report = {"python": sys.version.split()[0],
+              "imports": [check_module(module, max(1, args.runs), args.budget_ms, args.top) for module in args.module or ["main", "report"]]}
+    if not args.skip_dry_run:
+        report["dry_run_ms"] = round(measure_dry_run(max(1, args.runs)), 1)
+    
+    print_report(report)
+    
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    
+    if not all(check["within_budget"] and not check["forbidden"] for check in report["imports"]):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Any
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def load_corpus(name: str) -> List[str]:
+    with open(os.path.join(CORPUS_DIR, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def parse_latency(spec: str):
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    
+    if kind == "constant":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+class FakeOllamaServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: str = "constant:0", malformed_rate: float = 0.0,
+                 model_load_time: float = 0.0, seed: int = 0, prompt_cache_slots: int = 0, prompt_eval_rate: float = 0.0):
+        self.latency = parse_latency(latency)
+        self.malformed_rate = malformed_rate
+        self.model_load_time = model_load_time
+        self.prompt_cache_slots = prompt_cache_slots
+        self.prompt_eval_rate = prompt_eval_rate
+        self.prompt_cache = []
+        self.judge_outputs = load_corpus("judge_outputs.json")
+        self.chief_outputs = load_corpus("chief_outputs.json")
+        self.request_count = 0
+        self.model_loads = 0
+        self.loaded_model = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prompt_eval_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._send_json({"version": "0.0.0-fake"})
+                else:
+                    self._send_json({"models": []})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/chat":
+                    self._send_json({"error": f"unsupported path {self.path}"}, status=404)
+                    return
+                server._handle_chat(self, request)
+        
+        return Handler
+
+    def _handle_chat(self, handler: BaseHTTPRequestHandler, request: Dict[str, Any]):
+        prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+        
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency(self._rng)
+            malformed = self._rng.random() < self.malformed_rate
+            model = request.get("model")
+            load_time = 0.0
+            if model != self.loaded_model:
+                self.loaded_model = model
+                self.model_loads += 1
+                load_time = self.model_load_time
+                self.prompt_cache = []
+            reused = self._reused_prefix(prompt)
+        
+        prompt_tokens = max(1, (len(prompt) - reused) // 4)
+        prompt_seconds = prompt_tokens / self.prompt_eval_rate if self.prompt_eval_rate else 0.0
+        time.sleep(load_time)
+        # Prompt evaluation is compute-bound, so parallel requests take turns at it; generation overlaps.
+        with self._prompt_eval_lock:
+            time.sleep(prompt_seconds)
+        time.sleep(delay)
+        with self._lock:
+            self._remember_prompt(prompt)
+        
+        content = self._respond(prompt, request.get("format"), malformed, (request.get("options") or {}).get("seed"))
+        num_predict = (request.get("options") or {}).get("num_predict")
+        if num_predict:
+            content = content[:num_predict * 4]
+        eval_tokens = max(1, len(content) // 4)
+        final = {
+            "model": model,
+            "created_at": "1970-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((delay + load_time + prompt_seconds) * 1e9),
+            "load_duration": int(load_time * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int((delay * 0.3 + prompt_seconds) * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int(delay * 0.7 * 1e9)
+        }
+        
+        if not request.get("stream", True):
+            final["message"]["content"] = content
+            handler._send_json(final)
+            return
+        
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        try:
+            for start in range(0, len(content), 16):
+                chunk = dict(final, done=False, message={"role": "assistant", "content": content[start:start + 16]})
+                self._write_chunk(handler, chunk)
+            self._write_chunk(handler, final)
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, as the evaluator does once a judgment is complete.
+            pass
+
+    def _reused_prefix(self, prompt: str) -> int:
+        # Like Ollama, only prompts that finished evaluating can be reused, and only by their common prefix.
+        return max((len(os.path.commonprefix([cached, prompt])) for cached in self.prompt_cache), default=0)
+
+    def _remember_prompt(self, prompt: str):
+        if self.prompt_cache_slots:
+            self.prompt_cache.append(prompt)
+            del self.prompt_cache[:-self.prompt_cache_slots]
+
+    def _write_chunk(self, handler: BaseHTTPRequestHandler, payload: Dict[str, Any]):
+        line = json.dumps(payload).encode('utf-8') + b"\n"
+        handler.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        handler.wfile.flush()
+
+    def _respond(self, prompt: str, response_format: Any, malformed: bool, seed: int = None) -> str:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        rng = random.Random(digest)
+        # A seed varies the answer around the prompt's own score, as sampling temperature does; about one prompt in
+        # four is ambiguous, where samples scatter widely and the judge is less sure of itself.
+        sample = (random.Random(f"{digest}:{seed}"), int(digest[:8], 16) % 4 == 0) if seed is not None else None
+        
+        if isinstance(response_format, dict):
+            properties = response_format.get("properties", {})
+            if response_format.get("type") == "array":
+                criteria = response_format["items"]["properties"]["criterion"]["enum"]
+                return json.dumps([self._judgment(criterion, rng, sample) for criterion in criteria])
+            if "final_score" in properties:
+                return self._chief_json(properties["weighted_breakdown"]["properties"].keys(), rng)
+            criterion = properties.get("criterion", {}).get("enum", ["correctness"])[0]
+            judgment = self._judgment(criterion, rng, sample)
+            return json.dumps({field: judgment[field] for field in properties if field in judgment})
+        
+        if "CHIEF JUDGE" in prompt:
+            return rng.choice(self.chief_outputs) if malformed else self.chief_outputs[0]
+        
+        criteria = re.findall(r'"criterion": "(\w+)"', prompt)
+        if "JSON array" in prompt:
+            return json.dumps([self._judgment(criterion, rng, sample) for criterion in criteria])
+        
+        criterion = criteria[0] if criteria else "correctness"
+        if malformed:
+            return rng.choice(self.judge_outputs).replace('"correctness"', f'"{criterion}"')
+        return json.dumps(self._judgment(criterion, rng, sample)) + "\n\nI hope this evaluation helps the student improve."
+
+    def _judgment(self, criterion: str, rng: random.Random, sample=None) -> Dict[str, Any]:
+        score = round(rng.uniform(5, 9.5), 1)
+        confidence = round(rng.uniform(0.7, 0.95), 2)
+        if sample:
+            sample_rng, ambiguous = sample
+            score = round(min(10.0, max(0.0, score + sample_rng.gauss(0, 2.0 if ambiguous else 0.3))), 1)
+            confidence = round(confidence - 0.25, 2) if ambiguous else confidence
+        level = "excellent" if score >= 9 else "good" if score >= 7 else "fair"
+        return {
+            "criterion": criterion,
+            "score": score,
+            "confidence": confidence,
+            "level": level,
+            "reasoning": f"Synthetic {criterion} judgment produced by the benchmark server.",
+            "specific_evidence": ["first synthetic observation", "second synthetic observation"]
+        }
+
+    def _chief_json(self, criteria, rng: random.Random) -> str:
+        breakdown = {criterion: round(rng.uniform(5, 9.5), 1) for criterion in criteria}
+        return json.dumps({
+            "final_score": round(sum(breakdown.values()) / len(breakdown), 1),
+            "overall_assessment": "Synthetic chief assessment produced by the benchmark server.",
+            "weighted_breakdown": breakdown,
+            "key_strengths": ["synthetic strength"],
+            "critical_issues": ["synthetic issue"],
+            "actionable_improvements": ["synthetic improvement"],
+            "learning_path": ["synthetic learning step"],
+            "judge_consensus": "medium synthetic consensus"
+        })
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Ollama /api/chat server for benchmarks and local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="constant:S | uniform:A,B | lognormal:MEDIAN,SIGMA | exponential:MEAN")
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="Fraction of unconstrained answers drawn from the malformed corpus")
+    parser.add_argument("--model-load-time", type=float, default=0.0, help="Extra seconds charged whenever the requested model changes")
+    parser.add_argument("--prompt-cache-slots", type=int, default=0, help="Evaluated prompts kept for prefix reuse, like Ollama's parallel slots (default: 0, no reuse)")
+    parser.add_argument("--prompt-eval-rate", type=float, default=0.0, help="Prompt tokens evaluated per second; uncached tokens add to the latency (default: 0, free)")
+    args = parser.parse_args()
+    
+    server = FakeOllamaServer(args.host, args.port, args.latency, args.malformed_rate, args.model_load_time,
+                              prompt_cache_slots=args.prompt_cache_slots, prompt_eval_rate=args.prompt_eval_rate)
+    print(f" Fake Ollama server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import timeit
+from collections import Counter
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ollama_server import FakeOllamaServer, load_corpus
+from modulo.llm_judge_core import LLMJudgeEvaluatorCore
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+from modulo.llm_judge_batch import LLMJudgeBatchEvaluator
+from modulo.llm_judge_pool import OllamaClientPool
+from modulo.llm_judge_scheduler import add_model_arguments, apply_model_arguments
+from modulo.llm_judge_compaction import add_compaction_arguments, build_compactor
+from modulo.llm_judge_sampling import add_sampling_arguments, build_sampling_policy
+from modulo.llm_judge_sandbox import TestCaseRunner
+
+EXERCISE = """Write a function `top_k_frequent(words, k)` that returns the k most frequent words,
+ordered by frequency and then alphabetically. Handle an empty list and k larger than the number of distinct words."""
+
+SUBMISSION_TEMPLATE = '''from collections import Counter
+
+def top_k_frequent(words, k):
+    # variant {variant}
+    if not words:
+        return []
+    counts = Counter(words)
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [word for word, _ in ordered[:k]]
+{padding}
+'''
+
+SANDBOX_SUBMISSION_TEMPLATE = '''import sys
+from collections import Counter
+
+# variant {variant}
+words = sys.stdin.readline().split()
+k = int(sys.stdin.readline())
+ordered = sorted(Counter(words).items(), key=lambda item: (-item[1], item[0]))
+print(" ".join(word for word, _ in ordered[:k]))
+'''
+
+def make_test_case(index: int) -> Dict[str, str]:
+    rng = random.Random(index)
+    words = [rng.choice(["apple", "pear", "plum", "fig", "kiwi", "lime"]) for _ in range(rng.randint(0, 40))]
+    k = rng.randint(1, 4)
+    ordered = sorted(Counter(words).items(), key=lambda item: (-item[1], item[0]))
+    return {"name": f"case{index}", "input": f"{' '.join(words)}\n{k}\n", "expected": " ".join(word for word, _ in ordered[:k]) + "\n"}
+
+def make_submission(variant: int, size: int) -> str:
+    padding = "\n".join(f"def helper_{variant}_{i}(x):\n    return x * {i}\n" for i in range(size))
+    return SUBMISSION_TEMPLATE.format(variant=variant, padding=padding)
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": round(percentile(values, 0.50), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "p99": round(percentile(values, 0.99), 4)
+    }
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def build_api(server: FakeOllamaServer, args) -> LLMJudgeEvaluatorAPI:
+    core = LLMJudgeEvaluatorCore(compactor=build_compactor(args))
+    apply_model_arguments(core, args)
+    return LLMJudgeEvaluatorAPI(
+        evaluator_core=core,
+        client_pool=OllamaClientPool([server.url]),
+        max_concurrency=args.max_concurrency,
+        judge_mode="combined" if args.combined_judge else "separate",
+        narrative_feedback=args.feedback,
+        stream=args.stream,
+        structured_output=not args.no_structured_output,
+        prefix_warmup=not args.no_prefix_warmup,
+        sampling_policy=build_sampling_policy(args)
+    )
+
+def bench_single(server: FakeOllamaServer, args) -> Dict[str, Any]:
+    api = build_api(server, args)
+    latencies = []
+    calls_before = server.request_count
+    
+    for run in range(args.single_runs):
+        code = make_submission(run, args.submission_size)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            api.evaluate_with_multiple_judges(EXERCISE, code)
+        latencies.append(time.perf_counter() - started)
+    
+    return {
+        "runs": args.single_runs,
+        "latency_seconds": latency_summary(latencies),
+        "llm_calls_per_submission": round((server.request_count - calls_before) / args.single_runs, 2)
+    }
+
+def bench_cohort(server: FakeOllamaServer, args) -> Dict[str, Any]:
+    api = build_api(server, args)
+    batch = LLMJudgeBatchEvaluator(api, workers=args.workers)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        submissions_dir = os.path.join(directory, "submissions")
+        os.makedirs(submissions_dir)
+        for index in range(args.submissions):
+            with open(os.path.join(submissions_dir, f"student_{index:04d}.py"), 'w', encoding='utf-8') as f:
+                f.write(make_submission(index, args.submission_size))
+        
+        results_file = os.path.join(directory, "results.jsonl")
+        calls_before = server.request_count
+        loads_before = server.model_loads
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary = batch.evaluate_cohort(EXERCISE, submissions_dir, results_file)
+        wall = time.perf_counter() - started
+        
+        with open(results_file, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+    
+    latencies = [record["elapsed_seconds"] for record in records if "elapsed_seconds" in record]
+    samples = [judgment.get("samples", 1) for record in records for judgment in (record.get("evaluation") or {}).get("individual_judgments", [])
+               if not judgment.get("static") and not judgment.get("tests")]
+    stages = api.metrics.summary()["stages"]
+    return {
+        "submissions": args.submissions,
+        "workers": args.workers,
+        "failed": summary["failed"],
+        "latency_seconds": latency_summary(latencies),
+        "submissions_per_second": round(args.submissions / wall, 2),
+        "llm_calls_per_submission": round((server.request_count - calls_before) / args.submissions, 2),
+        "model_loads": server.model_loads - loads_before,
+        "model_loads_avoided": api.scheduler_stats()["model_loads_avoided"],
+        "samples_per_judgment": round(sum(samples) / len(samples), 2) if samples else 0.0,
+        "tokens_per_submission": {
+            direction: round(sum(stage["tokens"][direction] for stage in stages) / args.submissions, 1)
+            for direction in ["prompt", "completion"]
+        },
+        "stages": stages
+    }
+
+def bench_sandbox(args) -> Dict[str, Any]:
+    runner = TestCaseRunner([make_test_case(index) for index in range(args.sandbox_cases)], isolate_network=False)
+    runner.isolate_network = runner.network_isolation_available()
+    codes = {f"submission_{variant}": SANDBOX_SUBMISSION_TEMPLATE.format(variant=variant) for variant in range(args.sandbox_submissions)}
+    
+    started = time.perf_counter()
+    results = runner.run_cohort(codes)
+    elapsed = time.perf_counter() - started
+    
+    runs = args.sandbox_submissions * args.sandbox_cases
+    return {
+        "submissions": args.sandbox_submissions,
+        "cases_per_submission": args.sandbox_cases,
+        "workers": runner.workers,
+        "network_isolated": runner.isolate_network,
+        "elapsed_seconds": round(elapsed, 3),
+        "cases_per_second": round(runs / elapsed, 1) if elapsed > 0 else 0.0,
+        "all_passed": all(result["passed"] == result["total"] for result in results.values())
+    }
+
+def bench_parsers(iterations: int) -> Dict[str, float]:
+    core = LLMJudgeEvaluatorCore()
+    api = LLMJudgeEvaluatorAPI(evaluator_core=core)
+    corpora = {
+        "parse_final_evaluation": (core.parse_final_evaluation, load_corpus("chief_outputs.json")),
+        "_extract_list_items": (core._extract_list_items, load_corpus("list_sections.json")),
+        "_simplify_json_response": (api._simplify_json_response, load_corpus("judge_outputs.json"))
+    }
+    
+    results = {}
+    for name, (function, corpus) in corpora.items():
+        seconds = timeit.timeit(lambda: [function(sample) for sample in corpus], number=iterations)
+        results[name] = round(seconds / (iterations * len(corpus)) * 1e6, 2)
+    return results
+
+def print_report(report: Dict[str, Any]):
+    print("=" * 72)
+    print(" LLM-AS-A-JUDGE BENCHMARK")
+    print("=" * 72)
+    print(f" Server latency: {report['config']['latency']}, malformed rate: {report['config']['malformed_rate']}")
+    
+    for name in ["single", "cohort"]:
+        if name in report:
+            section = report[name]
+            latency = section["latency_seconds"]
+            print(f"\n {name.upper()}:")
+            print(f"   Latency p50/p95/p99: {latency['p50']:.3f}s / {latency['p95']:.3f}s / {latency['p99']:.3f}s")
+            print(f"   LLM calls per submission: {section['llm_calls_per_submission']}")
+            if "submissions_per_second" in section:
+                print(f"   Throughput: {section['submissions_per_second']} submissions/s ({section['workers']} workers, {section['failed']} failed)")
+            if "model_loads" in section:
+                print(f"   Model loads: {section['model_loads']} ({section['model_loads_avoided']} avoided by model affinity)")
+            if section.get("samples_per_judgment", 1) > 1:
+                print(f"   Samples per judgment: {section['samples_per_judgment']} (cap {report['config']['samples']})")
+            if "tokens_per_submission" in section:
+                tokens = section["tokens_per_submission"]
+                print(f"   Tokens per submission: {tokens['prompt']} prompt / {tokens['completion']} completion")
+    
+    if "sandbox" in report:
+        sandbox = report["sandbox"]
+        print(f"\n SANDBOX:")
+        print(f"   {sandbox['submissions']} submissions x {sandbox['cases_per_submission']} test cases in {sandbox['elapsed_seconds']:.2f}s ({sandbox['cases_per_second']} cases/s, {sandbox['workers']} workers)")
+        print(f"   Network isolated: {sandbox['network_isolated']}, all passed: {sandbox['all_passed']}")
+    
+    if "parsers_us_per_call" in report:
+        print(f"\n PARSERS (microseconds per call):")
+        for name, micros in report["parsers_us_per_call"].items():
+            print(f"   {name:<26}: {micros:.2f}")
+    
+    print(f"\n Peak RSS: {report['peak_rss_mb']} MB")
+    print("=" * 72)
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end and parser benchmarks against a local fake Ollama server.")
+    parser.add_argument("--latency", default="lognormal:0.05,0.5", help="Server latency distribution (see fake_ollama_server.py)")
+    parser.add_argument("--malformed-rate", type=float, default=0.1)
+    parser.add_argument("--single-runs", type=int, default=10)
+    parser.add_argument("--submissions", type=int, default=100)
+    parser.add_argument("--submission-size", type=int, default=5, help="Extra helper functions per generated submission")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--parser-iterations", type=int, default=2000)
+    parser.add_argument("--combined-judge", action="store_true")
+    parser.add_argument("--feedback", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--no-structured-output", action="store_true")
+    parser.add_argument("--model-load-time", type=float, default=0.0, help="Seconds the server spends loading a model on every model switch")
+    parser.add_argument("--prompt-cache-slots", type=int, default=8, help="Prompts the server keeps for prefix reuse, like OLLAMA_NUM_PARALLEL (0 disables it)")
+    parser.add_argument("--prompt-eval-rate", type=float, default=0.0, help="Prompt tokens the server evaluates per second (default: 0, free)")
+    add_model_arguments(parser)
+    add_compaction_arguments(parser)
+    add_sampling_arguments(parser)
+    parser.add_argument("--sandbox-submissions", type=int, default=0, help="Submissions run through the test sandbox (default: 0, skipped)")
+    parser.add_argument("--sandbox-cases", type=int, default=20, help="Test cases per sandboxed submission")
+    parser.add_argument("--skip-e2e", action="store_true", help="Only run the parser microbenchmarks")
+    parser.add_argument("--json", dest="json_file", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    
+    report = {"config": {key: value for key, value in vars(args).items() if key != "json_file"}}
+    
+    if not args.skip_e2e:
+        with FakeOllamaServer(latency=args.latency, malformed_rate=args.malformed_rate, model_load_time=args.model_load_time,
+                              prompt_cache_slots=args.prompt_cache_slots, prompt_eval_rate=args.prompt_eval_rate) as server:
+            report["single"] = bench_single(server, args)
+            report["cohort"] = bench_cohort(server, args)
+    
+    if args.sandbox_submissions:
+        report["sandbox"] = bench_sandbox(args)
+    
+    report["parsers_us_per_call"] = bench_parsers(args.parser_iterations)
+    report["peak_rss_mb"] = peak_rss_mb()
+    
+    print_report(report)
+    
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
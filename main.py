@@ -1,21 +1,61 @@
-import sys
+import argparse
+import datetime
 
 from modulo.llm_judge_core import LLMJudgeEvaluatorCore
 from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
 from modulo.llm_judge_output import LLMJudgeEvaluatorOutput
+from modulo.llm_judge_cache import add_cache_arguments, build_cache
+from modulo.llm_judge_retry import add_retry_arguments, build_retry_policy
+from modulo.llm_judge_sampling import add_sampling_arguments, build_sampling_policy
+from modulo.llm_judge_pool import add_pool_arguments, build_client_pool
+from modulo.llm_judge_scheduler import add_model_arguments, apply_model_arguments, build_keep_alive
+from modulo.llm_judge_compaction import add_compaction_arguments, build_compactor
+from modulo.llm_judge_static import add_static_arguments, analyze_code, certain_judgments
+from modulo.llm_judge_sandbox import add_test_arguments, build_test_runner
+from modulo.llm_judge_store import add_store_arguments, build_store, text_hash
+from modulo.llm_judge_incremental import add_incremental_arguments
+from modulo.llm_judge_metrics import add_metrics_arguments, print_metrics_summary, write_metrics
 from modulo.utils import read_file
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a student submission with LLM-as-a-Judge.",
+        epilog="Example: python main.py question.md answer.py results.txt python llama3.1:8b"
+    )
+    parser.add_argument("question_file", help="Markdown file with the exercise requirement")
+    parser.add_argument("answer_file", help="Student code file to evaluate")
+    parser.add_argument("output_file", help="Where the evaluation report is saved")
+    parser.add_argument("language", nargs="?", default="python", help="Programming language (default: python)")
+    parser.add_argument("model_name", nargs="?", default="llama3.1:8b", help="Ollama model (default: llama3.1:8b)")
+    parser.add_argument("--combined-judge", action="store_true", help="Score every criterion in a single LLM call")
+    parser.add_argument("--feedback", action="store_true", help="Always ask the chief judge for narrative feedback")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and stop each judge as soon as its JSON is complete")
+    parser.add_argument("--no-structured-output", action="store_true", help="Do not constrain responses with JSON schemas (for Ollama versions before 0.5)")
+    parser.add_argument("--submission-id", default=None, help="Student or submission the evaluation is stored under (default: the answer file path)")
+    parser.add_argument("--dry-run", "--render-only", dest="dry_run", action="store_true",
+                        help="Print the judge prompts and exit without contacting Ollama, running tests or saving anything")
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_sampling_arguments(parser)
+    add_pool_arguments(parser)
+    add_model_arguments(parser)
+    add_compaction_arguments(parser)
+    add_static_arguments(parser)
+    add_test_arguments(parser)
+    add_store_arguments(parser)
+    add_incremental_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
 def main():
-    if len(sys.argv) < 4:
-        print("Usage: python main.py question.md answer.py output.txt [language] [model_name]")
-        print("Example: python main.py question.md answer.py results.txt python llama3.1:8b")
-        return
+    args = parse_arguments()
     
-    question_file = sys.argv[1]
-    answer_file = sys.argv[2]
-    output_file = sys.argv[3]
-    language = sys.argv[4] if len(sys.argv) > 4 else "python"
-    model_name = sys.argv[5] if len(sys.argv) > 5 else "llama3.1:8b"
+    question_file = args.question_file
+    answer_file = args.answer_file
+    output_file = args.output_file
+    language = args.language
+    model_name = args.model_name
+    submission_id = args.submission_id or answer_file
     
     exercise_requirement = read_file(question_file)
     if not exercise_requirement:
@@ -23,25 +63,91 @@ def main():
         return
     
     student_code = read_file(answer_file)
-    if not student_code:
+    if student_code is None:
         print("Failed to read student code file")
         return
     
-    evaluator_core = LLMJudgeEvaluatorCore(model_name=model_name)
-    evaluator_api = LLMJudgeEvaluatorAPI(model_name=model_name, evaluator_core=evaluator_core)
+    evaluator_core = LLMJudgeEvaluatorCore(model_name=model_name, compactor=build_compactor(args))
+    try:
+        apply_model_arguments(evaluator_core, args)
+    except ValueError as e:
+        print(f"Invalid model assignment: {e}")
+        return
+    
+    if args.dry_run:
+        analysis = None if args.no_static_analysis else analyze_code(student_code, language)
+        settled = list(certain_judgments(analysis, evaluator_core))
+        prompts = evaluator_core.render_judge_prompts(exercise_requirement, student_code, language, combined=args.combined_judge, analysis=analysis, skip=settled)
+        LLMJudgeEvaluatorOutput(evaluator_core=evaluator_core).display_rendered_prompts(prompts, settled)
+        return
+    
+    cache = build_cache(args)
+    client_pool = build_client_pool(args)
+    
+    evaluator_api = LLMJudgeEvaluatorAPI(model_name=model_name, evaluator_core=evaluator_core, cache=cache,
+                                         judge_mode="combined" if args.combined_judge else "separate",
+                                         narrative_feedback=args.feedback, stream=args.stream,
+                                         structured_output=not args.no_structured_output,
+                                         retry_policy=build_retry_policy(args), client_pool=client_pool,
+                                         max_concurrency=args.max_concurrency, keep_alive=build_keep_alive(args, evaluator_core),
+                                         prefix_warmup=not args.no_prefix_warmup,
+                                         sampling_policy=build_sampling_policy(args),
+                                         incremental_max_change=args.incremental_max_change,
+                                         static_analysis=not args.no_static_analysis,
+                                         test_runner=build_test_runner(args, question_file, language),
+                                         test_mode="replace" if args.tests_replace_correctness else "inform")
     evaluator_output = LLMJudgeEvaluatorOutput(evaluator_core=evaluator_core)
     
+    if args.stream:
+        evaluator_api.on_chief_sections = lambda evaluation, sections: evaluator_output.display_evaluation_result(evaluation, sections=sections)
+    
     print(" Starting LLM-as-a-Judge evaluation...")
     print(f" Exercise: {question_file}")
     print(f" Code: {answer_file}")
     print(f" Language: {language}")
     print(f" Model: {model_name}")
     
-    evaluation_result = evaluator_api.evaluate_with_multiple_judges(exercise_requirement, student_code, language)
+    store = build_store(args)
+    previous = None
+    if store and not args.no_incremental:
+        # The last evaluation of this submission for the same exercise, if any, lets a resubmission be judged from its diff.
+        previous = store.latest(submission_id, text_hash(exercise_requirement))
+    
+    evaluation_result = evaluator_api.evaluate_with_multiple_judges(exercise_requirement, student_code, language, previous=previous)
     
     evaluator_output.display_evaluation_result(evaluation_result)
     
-    saved_file = evaluator_output.save_evaluation_to_file(exercise_requirement, student_code, evaluation_result, language, output_file)
+    if cache:
+        stats = cache.stats()
+        print(f" Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
+    
+    if len(client_pool.hosts) > 1:
+        stats = client_pool.stats()
+        hosts = ", ".join(f"{name}: {host['requests']} requests" for name, host in stats["hosts"].items())
+        print(f" Hosts: {hosts} ({stats['hedged_requests']} hedged, {stats['hedge_wins']} won by the hedge)")
+    
+    scheduler_stats = evaluator_api.scheduler_stats()
+    if scheduler_stats["fifo_model_switches"]:
+        print(f" Models: {scheduler_stats['model_switches']} switches, {scheduler_stats['model_loads_avoided']} loads avoided versus arrival order")
+    
+    print_metrics_summary(evaluator_api.metrics)
+    write_metrics(evaluator_api.metrics, args)
+    
+    if store:
+        record = {
+            "submission_id": submission_id,
+            "language": language,
+            "model": model_name,
+            "evaluated_at": datetime.datetime.now().isoformat(timespec='seconds'),
+            "evaluation": evaluation_result
+        }
+        store.add(record, exercise_requirement, student_code)
+        evaluation_id = store.flush()[-1]
+        print(f" Stored as evaluation {evaluation_id} in {args.store}")
+        saved_file = evaluator_output.save_stored_evaluation(store, evaluation_id, output_file)
+        store.close()
+    else:
+        saved_file = evaluator_output.save_evaluation_to_file(exercise_requirement, student_code, evaluation_result, language, output_file)
     
     if saved_file:
         print(f"Evaluation completed! Results saved to: {saved_file}")
@@ -1,56 +1,421 @@
-import time
+import asyncio
+import contextvars
+import copy
 import re
 import json
-from typing import Dict, List, Any
-from ollama import chat
-from ollama import ChatResponse
+import time
+from typing import Dict, List, Any, TYPE_CHECKING
 from .llm_judge_core import LLMJudgeEvaluatorCore
+from .llm_judge_cache import LLMJudgeCache
+from .llm_judge_stream import IncrementalJSONScanner, ChiefSectionTracker
+from .llm_judge_retry import RetryPolicy
+from .llm_judge_sampling import SamplingPolicy, aggregate_samples, valid_samples
+from .llm_judge_pool import OllamaClientPool
+from .llm_judge_scheduler import ModelAffinityScheduler
+from .llm_judge_compaction import estimate_tokens
+from .llm_judge_static import analyze_code, certain_judgments
+from .llm_judge_sandbox import TestCaseRunner, judgment_from_tests
+from .llm_judge_incremental import code_diff, affected_criteria, previous_judgments, describe_changes
+from .llm_judge_metrics import MetricsCollector, new_call_record, apply_response_metrics, submission_call_records
+
+if TYPE_CHECKING:
+    from ollama import ChatResponse
+
+# Warm-up tasks of the submission being evaluated, keyed by (model, prefix); shared by every judge task it starts.
+submission_prefix_warmups = contextvars.ContextVar("submission_prefix_warmups", default=None)
 
 class LLMJudgeEvaluatorAPI:
-    def __init__(self, model_name: str = "llama3.1:8b", evaluator_core: LLMJudgeEvaluatorCore = None):
+    def __init__(self, model_name: str = "llama3.1:8b", evaluator_core: LLMJudgeEvaluatorCore = None, max_concurrency: int = 4, host: str = None, cache: LLMJudgeCache = None, options: Dict[str, Any] = None, judge_mode: str = "separate", narrative_feedback: bool = False, stream: bool = False, structured_output: bool = True, retry_policy: RetryPolicy = None, client_pool: OllamaClientPool = None, metrics: MetricsCollector = None, keep_alive: str = None, static_analysis: bool = False, test_runner: TestCaseRunner = None, test_mode: str = "inform", prefix_warmup: bool = False, incremental_max_change: float = 0.3, sampling_policy: SamplingPolicy = None):
         self.model_name = model_name
         self.evaluator_core = evaluator_core if evaluator_core else LLMJudgeEvaluatorCore(model_name)
+        self.max_concurrency = max(1, max_concurrency)
+        self.host = host
+        self.cache = cache
+        self.options = options
+        self.judge_mode = judge_mode
+        self.narrative_feedback = narrative_feedback
+        self.stream = stream
+        self.structured_output = structured_output
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.sampling_policy = sampling_policy if sampling_policy else SamplingPolicy()
+        self.client_pool = client_pool if client_pool else OllamaClientPool([host] if host else None)
+        self.metrics = metrics if metrics else MetricsCollector()
+        self.keep_alive = keep_alive
+        self.static_analysis = static_analysis
+        self.test_runner = test_runner
+        self.test_mode = test_mode
+        self.incremental_max_change = incremental_max_change
+        # With keep_alive 0 the model, and its prompt cache, is unloaded after every call.
+        self.prefix_warmup = prefix_warmup and str(keep_alive) not in ("0", "0s", "0m")
+        self.on_chief_sections = None
+        self._loop_state = None
+
+    def _get_loop_state(self):
+        # The scheduler's waiters are futures bound to the event loop they were
+        # created on, so it is rebuilt whenever the wrapper is driven by a new loop.
+        loop = asyncio.get_running_loop()
+        if self._loop_state is None or self._loop_state[0] is not loop:
+            self._loop_state = (loop, self.client_pool, ModelAffinityScheduler(self.max_concurrency))
+        return self._loop_state
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        if self._loop_state is None:
+            return ModelAffinityScheduler().stats()
+        return self._loop_state[2].stats()
+
+    def _model_for(self, criterion: str = None) -> str:
+        if criterion is None:
+            return self.model_name
+        return self.evaluator_core.evaluation_rubric.get(criterion, {}).get("model") or self.model_name
+
+    def _chief_model(self) -> str:
+        return self.evaluator_core.chief_model or self.model_name
+
+    def _cache_key(self, kind: str, prompt: str, options: Dict[str, Any] = None, response_format: Dict[str, Any] = None, model: str = None) -> str:
+        if not self.cache:
+            return None
+        return self.cache.make_key(kind, model or self.model_name, prompt, self.evaluator_core.evaluation_rubric, options, response_format)
 
-    def call_llm_judge(self, prompt: str, max_retries: int = 3) -> Dict[str, Any]:
-        for attempt in range(max_retries):
+    def _cached_response(self, cache_key: str) -> str:
+        return self.cache.get(cache_key) if cache_key else None
+
+    def _store_response(self, cache_key: str, response_text: str):
+        if cache_key:
+            self.cache.put(cache_key, response_text)
+
+    def _start_record(self, stage: str, criterion: str = None) -> Dict[str, Any]:
+        return new_call_record(stage, self.model_name, criterion)
+
+    def _finish_record(self, record: Dict[str, Any]):
+        records = submission_call_records.get()
+        if records is not None:
+            records.append(record)
+        self.metrics.add(record)
+
+    def _response_text(self, response: Any) -> str:
+        if hasattr(response, 'message') and hasattr(response.message, 'content'):
+            return response.message.content
+        elif isinstance(response, dict) and 'message' in response and 'content' in response['message']:
+            return response['message']['content']
+        else:
+            return str(response)
+
+    def _parse_judgment_response(self, response_text: str, record: Dict[str, Any] = None) -> Dict[str, Any]:
+        record = record if record is not None else {}
+        try:
+            record["parse_path"] = "direct_json"
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            pass
+        
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            json_string = json_match.group()
+            
+            simplified_json = self._simplify_json_response(json_string)
+            
             try:
-                response: ChatResponse = chat(
-                    model=self.model_name,
-                    messages=[{'role': 'user', 'content': prompt}]
-                )
+                record["parse_path"] = "simplified_json"
+                return json.loads(simplified_json)
+            except json.JSONDecodeError:
+                record["parse_path"] = "manual_extraction"
+                return self._extract_judgment_manually(response_text)
+        else:
+            record["parse_path"] = "manual_extraction"
+            return self._extract_judgment_manually(response_text)
+
+    def call_llm_judge(self, prompt: str, max_retries: int = None, criterion: str = None) -> Dict[str, Any]:
+        api = self
+        if max_retries is not None:
+            # Attempts for this call only; the copy shares the circuit breaker, the cache and the client pool.
+            api = copy.copy(self)
+            api.retry_policy = copy.copy(self.retry_policy)
+            api.retry_policy.max_retries = max(1, max_retries)
+        return asyncio.run(api.call_llm_judge_async(prompt, criterion=criterion))
+
+    def _call_options(self, num_predict: int = None, seed: int = None) -> Dict[str, Any]:
+        options = dict(self.options or {})
+        if num_predict and "num_predict" not in options:
+            options["num_predict"] = num_predict
+        if seed is not None:
+            # Set even over a configured seed: samples sharing one would all come back identical.
+            options["seed"] = seed
+        return options or None
+
+    async def _stream_chat_async(self, client: OllamaClientPool, prompt: str, options: Dict[str, Any], json_openers: str = None, on_chunk=None, response_format: Dict[str, Any] = None, record: Dict[str, Any] = None, model: str = None) -> str:
+        stream = await client.chat(
+            model=model or self.model_name,
+            messages=[{'role': 'user', 'content': prompt}],
+            options=options,
+            format=response_format,
+            keep_alive=self.keep_alive,
+            stream=True
+        )
+        
+        scanner = IncrementalJSONScanner(json_openers) if json_openers else None
+        parts = []
+        
+        try:
+            async for chunk in stream:
+                piece = self._response_text(chunk)
+                parts.append(piece)
+                if on_chunk:
+                    on_chunk(piece)
+                # Only the final chunk carries token counts and model timings.
+                if record is not None and getattr(chunk, "done", False):
+                    apply_response_metrics(record, chunk)
+                if scanner and scanner.feed(piece):
+                    # Closing the stream drops the HTTP connection, which makes Ollama
+                    # stop generating whatever the model meant to say after the JSON.
+                    if record is not None:
+                        record["early_stop"] = True
+                    break
+        finally:
+            await stream.aclose()
+        
+        return "".join(parts)
+
+    async def _send_warmup_async(self, prefix: str, model: str):
+        record = self._start_record("prefix_warmup")
+        record["model"] = model
+        started = time.perf_counter()
+        _, client, scheduler = self._get_loop_state()
+        # Same options as the judge calls, since a different num_ctx makes Ollama reload the model.
+        options = dict(self.options or {})
+        options["num_predict"] = 1
+        try:
+            async with scheduler.slot(model):
+                response = await asyncio.wait_for(client.chat(
+                    model=model,
+                    messages=[{'role': 'user', 'content': prefix}],
+                    options=options,
+                    keep_alive=self.keep_alive,
+                    latency_key="prefix_warmup"
+                ), self.retry_policy.request_timeout)
+            apply_response_metrics(record, response)
+        except Exception as e:
+            # Best effort: the judge calls still work, they just evaluate the prefix themselves.
+            record["error"] = repr(e)
+        finally:
+            record["wall_seconds"] = time.perf_counter() - started
+            self._finish_record(record)
+
+    async def _warm_prefix_async(self, prefix: str, model: str):
+        # Ollama only copies a cached prompt into another slot once it has been evaluated, so judge calls
+        # sent together would each evaluate the shared prefix. One call evaluates it first; the rest then
+        # fan out and only evaluate their own criterion-specific tail.
+        warmups = submission_prefix_warmups.get()
+        if warmups is None:
+            return
+        key = (model, prefix)
+        if key not in warmups:
+            warmups[key] = asyncio.ensure_future(self._send_warmup_async(prefix, model))
+        await asyncio.shield(warmups[key])
+
+    async def _chat_text_async(self, kind: str, prompt: str, num_predict: int = None, json_openers: str = None, on_chunk=None, response_format: Dict[str, Any] = None, record: Dict[str, Any] = None, model: str = None, prefix: str = None, seed: int = None, cacheable=None, on_reset=None) -> str:
+        model = model or self.model_name
+        record = record if record is not None else self._start_record(kind)
+        record["model"] = model
+        started = time.perf_counter()
+        options = self._call_options(num_predict, seed)
+        cache_key = self._cache_key(kind, prompt, options, response_format, model)
+        cached_text = self._cached_response(cache_key)
+        # An answer that does not parse is asked again rather than replayed, including ones cached before this check.
+        if cached_text is not None and (cacheable is None or cacheable(cached_text)):
+            if on_chunk:
+                on_chunk(cached_text)
+            record["cached"] = True
+            record["wall_seconds"] = time.perf_counter() - started
+            return cached_text
+        
+        if prefix and self.prefix_warmup:
+            await self._warm_prefix_async(prefix, model)
+        
+        _, client, scheduler = self._get_loop_state()
+        chunks_sent = False
+
+        def emit(piece: str):
+            nonlocal chunks_sent
+            chunks_sent = True
+            on_chunk(piece)
+
+        async def request(timeout: float) -> str:
+            nonlocal chunks_sent
+            async with scheduler.slot(model):
+                if self.stream:
+                    if chunks_sent and on_reset:
+                        # A retry streams the answer again from the start, so the consumer drops what the failed attempt sent.
+                        on_reset()
+                        chunks_sent = False
+                    return await asyncio.wait_for(self._stream_chat_async(client, prompt, options, json_openers, emit if on_chunk else None, response_format, record, model), timeout)
                 
-                if hasattr(response, 'message') and hasattr(response.message, 'content'):
-                    response_text = response.message.content
-                elif isinstance(response, dict) and 'message' in response and 'content' in response['message']:
-                    response_text = response['message']['content']
+                response: ChatResponse = await asyncio.wait_for(client.chat(
+                    model=model,
+                    messages=[{'role': 'user', 'content': prompt}],
+                    options=options,
+                    format=response_format,
+                    keep_alive=self.keep_alive,
+                    latency_key=kind
+                ), timeout)
+                apply_response_metrics(record, response)
+                return self._response_text(response)
+        
+        def on_retry(attempt: int, error: Exception):
+            record["retries"] += 1
+            print(f"    {kind} call failed ({error!r}), retry {attempt}/{self.retry_policy.max_retries - 1}")
+        
+        try:
+            response_text = await self.retry_policy.run(request, on_retry)
+        except Exception as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["wall_seconds"] = time.perf_counter() - started
+        
+        if cacheable is None or cacheable(response_text):
+            self._store_response(cache_key, response_text)
+        return response_text
+
+    def _parse_structured_json(self, response_text: str, record: Dict[str, Any] = None) -> Any:
+        record = record if record is not None else {}
+        try:
+            record["parse_path"] = "direct_json"
+            return json.loads(response_text)
+        except json.JSONDecodeError:
+            pass
+        
+        # Streamed answers may be cut right after the JSON value, or carry stray text around it.
+        scanner = IncrementalJSONScanner("{[")
+        if scanner.feed(response_text):
+            try:
+                record["parse_path"] = "scanned_json"
+                return json.loads(scanner.value)
+            except json.JSONDecodeError:
+                pass
+        record["parse_path"] = "unparsed"
+        return None
+
+    async def _validated_judgment_async(self, original_prompt: str, data: Dict[str, Any], criterion: str) -> Dict[str, Any]:
+        judgment, invalid_fields = self.evaluator_core.validate_judgment(data, criterion)
+        
+        if invalid_fields:
+            print(f"    {criterion}: re-asking for {', '.join(invalid_fields)}")
+            repair_prompt = self.evaluator_core.create_judgment_repair_prompt(original_prompt, judgment, invalid_fields)
+            record = self._start_record("judge_repair", criterion)
+            original = judgment.to_dict()
+
+            def repaired_judgment(text: str, record: Dict[str, Any] = None):
+                repaired = self._parse_structured_json(text, record)
+                merged = dict(original)
+                if isinstance(repaired, dict):
+                    merged.update({field: repaired.get(field) for field in invalid_fields})
+                return self.evaluator_core.validate_judgment(merged, criterion)
+            
+            try:
+                repair_text = await self._chat_text_async("judge_repair", repair_prompt, json_openers="{",
+                                                          response_format=self.evaluator_core.judgment_schema([criterion], invalid_fields),
+                                                          record=record, model=self._model_for(criterion),
+                                                          cacheable=lambda text: not repaired_judgment(text)[1])
+                judgment, invalid_fields = repaired_judgment(repair_text, record)
+            finally:
+                self._finish_record(record)
+        
+        if invalid_fields:
+            return {"error": f"Invalid judgment fields: {', '.join(invalid_fields)}"}
+        return judgment.to_dict()
+
+    async def call_llm_judge_async(self, prompt: str, num_predict: int = None, criterion: str = None, prefix: str = None) -> Dict[str, Any]:
+        policy = self.sampling_policy
+        if not policy.enabled or criterion is None:
+            return await self._sample_judgment_async(prompt, num_predict, criterion, prefix)
+        
+        # Self-consistency: seeded samples are drawn in rounds until they agree with high confidence or the cap
+        # is reached, so the extra calls go to the submissions the judge is unsure about.
+        samples = []
+        while len(samples) < policy.max_samples:
+            round_samples = await asyncio.gather(*[
+                self._sample_judgment_async(prompt, num_predict, criterion, prefix, policy.seed_for(index))
+                for index in range(len(samples), len(samples) + policy.next_round(len(samples)))
+            ])
+            samples.extend(round_samples)
+            # A round that failed outright (deadline, open circuit) would only fail again.
+            if not valid_samples(round_samples, self.evaluator_core) or policy.settled(samples, self.evaluator_core):
+                break
+        
+        judgment = aggregate_samples(samples, criterion, self.evaluator_core)
+        if "error" not in judgment:
+            scores = ", ".join(f"{score:g}" for score in judgment["sample_scores"])
+            print(f"    {criterion}: {judgment['samples']} samples ({scores}), median {judgment['score']:g}, variance {judgment['score_variance']:g}")
+        return judgment
+
+    async def _sample_judgment_async(self, prompt: str, num_predict: int = None, criterion: str = None, prefix: str = None, seed: int = None) -> Dict[str, Any]:
+        structured = self.structured_output and criterion is not None
+        response_format = self.evaluator_core.judgment_schema([criterion]) if structured else None
+        record = self._start_record("judge", criterion)
+        
+        try:
+            try:
+                response_text = await self._chat_text_async("judge", prompt, num_predict=num_predict, json_openers="{", response_format=response_format,
+                                                            record=record, model=self._model_for(criterion), prefix=prefix, seed=seed,
+                                                            cacheable=lambda text: self._judgment_text_valid(text, criterion, structured))
+                if structured:
+                    parsed = self._parse_structured_json(response_text, record)
                 else:
-                    response_text = str(response)
-                
-                try:
-                    return json.loads(response_text)
-                except json.JSONDecodeError:
-                    pass
+                    parsed = self._parse_judgment_response(response_text, record)
+            finally:
+                self._finish_record(record)
+            
+            if structured:
+                return await self._validated_judgment_async(prompt, parsed if isinstance(parsed, dict) else {}, criterion)
+            return parsed
                 
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    json_string = json_match.group()
-                    
-                    simplified_json = self._simplify_json_response(json_string)
-                    
-                    try:
-                        return json.loads(simplified_json)
-                    except json.JSONDecodeError:
-                        return self._extract_judgment_manually(response_text)
-                else:
-                    return self._extract_judgment_manually(response_text)
-                    
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                else:
-                    return {"error": f"All retries failed: {e}"}
+        except Exception as e:
+            return {"error": f"Judge call failed: {e!r}"}
+
+    def _judgment_text_valid(self, response_text: str, criterion: str = None, structured: bool = False) -> bool:
+        if structured:
+            data = self._parse_structured_json(response_text)
+            return isinstance(data, dict) and not self.evaluator_core.validate_judgment(data, criterion)[1]
+        record = {}
+        return isinstance(self._parse_judgment_response(response_text, record), dict) and record["parse_path"] != "manual_extraction"
+
+    def _combined_text_valid(self, response_text: str, criteria: List[str], structured: bool = False) -> bool:
+        judgments = {str(judgment.get("criterion", "")).lower(): judgment for judgment in self._parse_combined_judgment_response(response_text, structured)}
+        if structured:
+            return all(criterion in judgments and not self.evaluator_core.validate_judgment(judgments[criterion], criterion)[1] for criterion in criteria)
+        return all(criterion in judgments for criterion in criteria)
+
+    def _parse_combined_judgment_response(self, response_text: str, structured: bool = False, record: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        record = record if record is not None else {}
+        parsed = self._parse_structured_json(response_text, record)
+        
+        if isinstance(parsed, dict):
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), [parsed])
+        
+        if isinstance(parsed, list):
+            return [item for item in parsed if isinstance(item, dict)]
+        
+        if structured:
+            return []
         
-        return {"error": "Unexpected error"}
+        # Judgment objects never nest braces, so each flat {...} block is one criterion.
+        record["parse_path"] = "flat_blocks"
+        return [self._parse_judgment_response(block) for block in re.findall(r'\{[^{}]*\}', response_text, re.DOTALL)]
+
+    async def call_llm_judge_combined_async(self, prompt: str, num_predict: int = None, criteria: List[str] = None) -> List[Dict[str, Any]]:
+        criteria = criteria or list(self.evaluator_core.evaluation_rubric.keys())
+        response_format = self.evaluator_core.combined_judgment_schema(criteria) if self.structured_output else None
+        record = self._start_record("judge_combined")
+        
+        try:
+            response_text = await self._chat_text_async("judge_combined", prompt, num_predict=num_predict, json_openers="[{", response_format=response_format, record=record,
+                                                        cacheable=lambda text: self._combined_text_valid(text, criteria, self.structured_output))
+            return self._parse_combined_judgment_response(response_text, structured=self.structured_output, record=record)
+                
+        except Exception as e:
+            return [{"error": f"Combined judge call failed: {e!r}"}]
+        finally:
+            self._finish_record(record)
 
     def _simplify_json_response(self, json_string: str) -> str:
         result = {}
@@ -107,55 +472,314 @@ class LLMJudgeEvaluatorAPI:
         return judgment
 
     def call_ollama_chat(self, prompt: str) -> str:
-        try:
-            response: ChatResponse = chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': prompt,
-                    },
-                ]
-            )
-            
-            if hasattr(response, 'message') and hasattr(response.message, 'content'):
-                return response.message.content
-            elif isinstance(response, dict) and 'message' in response and 'content' in response['message']:
-                return response['message']['content']
+        return asyncio.run(self.call_ollama_chat_async(prompt))
+
+    async def call_ollama_chat_async(self, prompt: str, response_format: Dict[str, Any] = None, record: Dict[str, Any] = None, cacheable=None) -> str:
+        tracker = None
+        if self.on_chief_sections:
+            if response_format is not None:
+                tracker = ChiefSectionTracker(self.evaluator_core.parse_final_evaluation_json, self.on_chief_sections, structured=True)
             else:
-                return str(response)
-                
+                tracker = ChiefSectionTracker(self.evaluator_core.parse_final_evaluation, self.on_chief_sections)
+        
+        owns_record = record is None
+        record = self._start_record("chief") if owns_record else record
+        try:
+            chief_text = await self._chat_text_async("chief", prompt, on_chunk=tracker.feed if tracker else None, on_reset=tracker.reset if tracker else None,
+                                                     response_format=response_format, record=record, model=self._chief_model(), cacheable=cacheable)
+        finally:
+            if owns_record:
+                self._finish_record(record)
+        if tracker:
+            tracker.finish()
+        return chief_text
+
+    async def _judge_criterion_async(self, exercise_requirement: str, student_code: str, criterion: str, language: str, analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        print(f"    Judge evaluating: {criterion}")
+        
+        prompt = self.evaluator_core.create_judge_prompt(exercise_requirement, student_code, criterion, language, analysis=analysis, test_results=test_results)
+        compactor = self.evaluator_core.compactor
+        if compactor and not compactor.fits(prompt):
+            judgment = await self._judge_criterion_chunked_async(exercise_requirement, student_code, criterion, language, analysis, test_results)
+        else:
+            judgment = await self.call_llm_judge_async(prompt, num_predict=self.evaluator_core.evaluation_rubric[criterion].get("num_predict"), criterion=criterion,
+                                                       prefix=self.evaluator_core.create_judge_prefix(exercise_requirement, student_code, language, criterion=criterion))
+        
+        if "error" not in judgment:
+            print(f"    {criterion}: {judgment.get('score', 'N/A')}/10")
+        else:
+            print(f"    {criterion}: Failed")
+        
+        return judgment
+
+    async def _rejudge_criterion_async(self, exercise_requirement: str, criterion: str, language: str, revision: Dict[str, Any], analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        print(f"    Judge re-evaluating from the diff: {criterion}")
+        
+        core = self.evaluator_core
+        prompt = core.create_revision_judge_prompt(exercise_requirement, revision["diff"], criterion, revision["previous"][criterion], language, analysis, test_results)
+        judgment = await self.call_llm_judge_async(prompt, num_predict=core.evaluation_rubric[criterion].get("num_predict"), criterion=criterion,
+                                                   prefix=core.create_revision_prefix(exercise_requirement, revision["diff"], language))
+        
+        if "error" not in judgment:
+            judgment["revised"] = True
+            print(f"    {criterion}: {judgment.get('score', 'N/A')}/10 (was {revision['previous'][criterion].get('score', 'N/A')})")
+        else:
+            print(f"    {criterion}: Failed")
+        
+        return judgment
+
+    def _plan_revision(self, previous: Dict[str, Any], student_code: str, language: str) -> Dict[str, Any]:
+        if not previous or not previous.get("code") or (previous.get("language") or language).lower() != language.lower():
+            return None
+        
+        evaluation = previous.get("evaluation") or {}
+        diff = code_diff(previous["code"], student_code, language)
+        if diff["change_ratio"] > self.incremental_max_change:
+            print(f"   Resubmission changes {diff['change_ratio']:.0%} of the lines, evaluating it from scratch")
+            return None
+        
+        judgments = previous_judgments(evaluation)
+        affected = affected_criteria(diff, self.evaluator_core.evaluation_rubric)
+        source = f"evaluation {previous['id']}" if previous.get("id") else "the previous evaluation"
+        print(f"   Resubmission of {source}: {describe_changes(diff)}")
+        return {
+            "diff": diff,
+            "previous": judgments,
+            "previous_evaluation": evaluation,
+            "carry": [criterion for criterion in self.evaluator_core.evaluation_rubric if criterion in judgments and criterion not in affected],
+            # Criteria the previous run failed to judge have nothing to update and are judged in full.
+            "rejudge": [criterion for criterion in affected if criterion in judgments],
+            "summary": {
+                "previous_id": previous.get("id"),
+                "previous_evaluated_at": previous.get("evaluated_at"),
+                "changes": describe_changes(diff),
+                "level": diff["level"],
+                "changed_lines": diff["changed_lines"],
+                "change_ratio": diff["change_ratio"]
+            }
+        }
+
+    async def _judge_criterion_chunked_async(self, exercise_requirement: str, student_code: str, criterion: str, language: str, analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> Dict[str, Any]:
+        core = self.evaluator_core
+        compactor = core.compactor
+        rubric_info = core.evaluation_rubric[criterion]
+        code = core.shared_code(student_code, language, criterion)
+        
+        # Whatever the prompt needs besides the code, with room for a long chunk note. Taking the largest
+        # criterion makes criteria that render the code alike split it the same way, so their chunk prompts share prefixes.
+        overhead = max(estimate_tokens(core.create_judge_prompt(exercise_requirement, "", other, language, chunk_note="x " * 64, analysis=analysis, test_results=test_results))
+                       for other in core.evaluation_rubric)
+        chunks = compactor.split_code(code, language, max(256, compactor.token_budget - overhead))
+        print(f"    {criterion}: submission over the {compactor.token_budget}-token budget, judging {len(chunks)} chunks")
+        
+        def chunk_note(index: int, chunk: Dict[str, Any]) -> str:
+            names = ", ".join(chunk["names"][:5]) + (", ..." if len(chunk["names"]) > 5 else "")
+            return (f"part {index} of {len(chunks)}, lines {chunk['start']}-{chunk['end']}: {names}. "
+                    "Judge only this part; the rest of the submission is judged separately")
+        
+        judgments = await asyncio.gather(*[
+            self.call_llm_judge_async(core.create_judge_prompt(exercise_requirement, chunk["code"], criterion, language, chunk_note=chunk_note(index, chunk), analysis=analysis, test_results=test_results),
+                                      num_predict=rubric_info.get("num_predict"), criterion=criterion,
+                                      prefix=core.create_judge_prefix(exercise_requirement, chunk["code"], language, chunk_note(index, chunk), criterion))
+            for index, chunk in enumerate(chunks, 1)
+        ])
+        
+        return core.merge_chunk_judgments(criterion, judgments, [", ".join(chunk["names"]) for chunk in chunks], [chunk["tokens"] for chunk in chunks])
+
+    async def _judge_combined_async(self, exercise_requirement: str, student_code: str, criteria: List[str], language: str, analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        print(f"    Combined judge evaluating: {', '.join(criteria)}")
+        
+        prompt = self.evaluator_core.create_combined_judge_prompt(exercise_requirement, student_code, language, analysis=analysis, test_results=test_results, criteria=criteria)
+        compactor = self.evaluator_core.compactor
+        if compactor and not compactor.fits(prompt):
+            print(f"    Combined prompt over the {compactor.token_budget}-token budget, falling back to individual judges")
+            return await asyncio.gather(*[
+                self._judge_criterion_async(exercise_requirement, student_code, criterion, language, analysis, test_results)
+                for criterion in criteria
+            ])
+        
+        num_predict = sum(self.evaluator_core.evaluation_rubric[criterion].get("num_predict") or 0 for criterion in criteria)
+        combined = await self.call_llm_judge_combined_async(prompt, num_predict=num_predict or None, criteria=criteria)
+        
+        by_criterion = {}
+        for judgment in combined:
+            criterion = str(judgment.get("criterion", "")).lower()
+            if "error" not in judgment and criterion in criteria and criterion not in by_criterion:
+                if self.structured_output:
+                    judgment = await self._validated_judgment_async(prompt, judgment, criterion)
+                    if "error" in judgment:
+                        continue
+                by_criterion[criterion] = judgment
+                print(f"    {criterion}: {judgment.get('score', 'N/A')}/10")
+        
+        # Criteria the combined answer left out are judged individually rather than dropped.
+        missing = [criterion for criterion in criteria if criterion not in by_criterion]
+        if missing:
+            print(f"    Combined judge missed {', '.join(missing)}, falling back to individual judges")
+            fallback = await asyncio.gather(*[
+                self._judge_criterion_async(exercise_requirement, student_code, criterion, language, analysis, test_results)
+                for criterion in missing
+            ])
+            by_criterion.update(zip(missing, fallback))
+        
+        return [by_criterion[criterion] for criterion in criteria]
+
+    async def evaluate_with_multiple_judges_async(self, exercise_requirement: str, student_code: str, language: str = "python", analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None, previous: Dict[str, Any] = None) -> Dict[str, Any]:
+        if analysis is None and self.static_analysis:
+            analysis = analyze_code(student_code, language)
+        
+        deadline_token = self.retry_policy.start_submission()
+        records = []
+        records_token = submission_call_records.set(records)
+        warmups_token = submission_prefix_warmups.set({})
+        started = time.perf_counter()
+        try:
+            evaluation = await self._evaluate_submission_async(exercise_requirement, student_code, language, analysis, test_results, previous)
+        finally:
+            submission_prefix_warmups.reset(warmups_token)
+            submission_call_records.reset(records_token)
+            self.retry_policy.end_submission(deadline_token)
+        
+        wall_seconds = time.perf_counter() - started
+        self.metrics.add_submission(wall_seconds)
+        evaluation["metrics"] = {"wall_seconds": round(wall_seconds, 3), "calls": records}
+        return evaluation
+
+    async def _run_tests_async(self, student_code: str, language: str) -> Dict[str, Any]:
+        print(f"   Running {len(self.test_runner.cases)} test cases...")
+        try:
+            test_results = await asyncio.to_thread(self.test_runner.run, student_code, language)
         except Exception as e:
-            return f"Error"
+            print(f"   Test run failed: {e}")
+            return None
+        
+        if test_results:
+            print(f"   Tests: {test_results['passed']}/{test_results['total']} passed in {test_results['seconds']:.2f}s")
+        return test_results
 
-    def evaluate_with_multiple_judges(self, exercise_requirement: str, student_code: str, language: str = "python") -> Dict[str, Any]:
+    async def _evaluate_submission_async(self, exercise_requirement: str, student_code: str, language: str, analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None, previous: Dict[str, Any] = None) -> Dict[str, Any]:
         print("Starting multi-judge evaluation...")
         
+        criteria = list(self.evaluator_core.evaluation_rubric.keys())
+        settled = certain_judgments(analysis, self.evaluator_core)
+        if settled:
+            print(f"   Static analysis settled {', '.join(settled)}, skipping {'that judge' if len(settled) == 1 else 'those judges'}")
+        
+        revision = self._plan_revision(previous, student_code, language)
+        if revision and revision["diff"]["unchanged"] and not settled:
+            print("   Code unchanged since the previous evaluation, reusing it")
+            evaluation = {key: value for key, value in revision["previous_evaluation"].items() if key not in ("metrics", "revision")}
+            evaluation["revision"] = dict(revision["summary"], rejudged=[], carried_forward=criteria)
+            return evaluation
+        if revision:
+            carried = [criterion for criterion in revision["carry"] if criterion not in settled]
+            settled.update({criterion: dict(revision["previous"][criterion], carried_forward=True) for criterion in carried})
+            revision["summary"].update(rejudged=[criterion for criterion in revision["rejudge"] if criterion not in settled], carried_forward=carried)
+            if carried:
+                print(f"   Carrying forward {', '.join(carried)}")
+        
+        # The tests run while the other criteria are already being judged; only the correctness judge waits for them.
+        tests = None
+        if test_results is None and self.test_runner and "correctness" in criteria and "correctness" not in settled:
+            tests = asyncio.ensure_future(self._run_tests_async(student_code, language))
+        
+        async def wait_for_tests() -> Dict[str, Any]:
+            return await tests if tests else test_results
+        
+        async def judge_criterion(criterion: str) -> Dict[str, Any]:
+            results = await wait_for_tests() if criterion == "correctness" else None
+            if results and self.test_mode == "replace":
+                return judgment_from_tests(results, self.evaluator_core)
+            if revision and criterion in revision["rejudge"]:
+                return await self._rejudge_criterion_async(exercise_requirement, criterion, language, revision, analysis, results)
+            return await self._judge_criterion_async(exercise_requirement, student_code, criterion, language, analysis, results)
+        
+        pending = [criterion for criterion in criteria if criterion not in settled]
+        if len(pending) * self.sampling_policy.initial_samples < 2:
+            # A lone judge call has no other call to share its prefix with; the reset in the caller restores the dict.
+            submission_prefix_warmups.set(None)
+        if not pending:
+            judged = []
+        elif self.judge_mode == "combined" and not revision:
+            results = await wait_for_tests()
+            if results and self.test_mode == "replace" and "correctness" in pending:
+                settled["correctness"] = judgment_from_tests(results, self.evaluator_core)
+                pending.remove("correctness")
+            judged = await self._judge_combined_async(exercise_requirement, student_code, pending, language, analysis, results) if pending else []
+        else:
+            judged = await asyncio.gather(*[judge_criterion(criterion) for criterion in pending])
+        
+        settled.update(zip(pending, judged))
+        test_results = await wait_for_tests()
+        judgments = [settled[criterion] for criterion in criteria]
+        
         individual_judgments = []
         failed_criteria = []
         
-        for criterion in self.evaluator_core.evaluation_rubric.keys():
-            print(f"    Judge evaluating: {criterion}")
-            
-            prompt = self.evaluator_core.create_judge_prompt(exercise_requirement, student_code, criterion, language)
-            judgment = self.call_llm_judge(prompt)
-            
+        for criterion, judgment in zip(criteria, judgments):
             if "error" not in judgment:
                 individual_judgments.append(judgment)
-                print(f"    {criterion}: {judgment.get('score', 'N/A')}/10")
             else:
                 failed_criteria.append(criterion)
-                print(f"    {criterion}: Failed")
-            
-            time.sleep(1)
         
-        print("   Chief judge synthesizing evaluations...")
-        chief_prompt = self.evaluator_core.create_chief_judge_prompt(exercise_requirement, student_code, individual_judgments, language)
-        chief_text = self.call_ollama_chat(chief_prompt)
+        aggregation = self.evaluator_core.aggregate_judgments(individual_judgments)
+        chief_text = ""
+        
+        if individual_judgments and (self.narrative_feedback or aggregation["needs_chief_judge"]):
+            reasons = aggregation["chief_judge_reasons"] or ["narrative feedback requested"]
+            print(f"   Chief judge synthesizing evaluations ({'; '.join(reasons)})...")
+            chief_prompt = self.evaluator_core.create_chief_judge_prompt(exercise_requirement, student_code, individual_judgments, language, structured=self.structured_output)
+            record = self._start_record("chief")
+            try:
+                if self.structured_output:
+                    parse = self.evaluator_core.parse_final_evaluation_json
+                    chief_text = await self.call_ollama_chat_async(chief_prompt, response_format=self.evaluator_core.chief_judge_schema(), record=record,
+                                                                   cacheable=lambda text: bool(parse(text).get("final_score")))
+                    final_evaluation = parse(chief_text)
+                    record["parse_path"] = "json_sections"
+                else:
+                    parse = self.evaluator_core.parse_final_evaluation
+                    chief_text = await self.call_ollama_chat_async(chief_prompt, record=record, cacheable=lambda text: bool(parse(text).get("final_score")))
+                    final_evaluation = parse(chief_text)
+                    record["parse_path"] = "markdown_sections"
+            except Exception as e:
+                print(f"   Chief judge failed ({e!r}), using the local aggregation")
+                final_evaluation = self.evaluator_core.create_local_evaluation(aggregation)
+                final_evaluation["chief_error"] = repr(e)
+            # The chief's free-form answer is scraped with regexes; fall back to the
+            # local arithmetic for anything it failed to provide.
+            if not final_evaluation.get("final_score"):
+                record["parse_path"] = "local_fallback"
+                final_evaluation["final_score"] = aggregation["final_score"]
+            self._finish_record(record)
+            if not final_evaluation.get("weighted_breakdown"):
+                final_evaluation["weighted_breakdown"] = dict(aggregation["weighted_breakdown"])
+            if not final_evaluation.get("judge_consensus"):
+                final_evaluation["judge_consensus"] = aggregation["judge_consensus"]
+            if aggregation["certain_criteria"]:
+                # The chief may explain a certain judgment but not overrule it, so the weighted arithmetic stands.
+                final_evaluation["final_score"] = aggregation["final_score"]
+                final_evaluation["weighted_breakdown"].update({criterion: aggregation["weighted_breakdown"][criterion] for criterion in aggregation["certain_criteria"]})
+        elif not individual_judgments:
+            print("   No valid judgments, chief judge skipped")
+            final_evaluation = self.evaluator_core.create_local_evaluation(aggregation)
+        else:
+            print(f"   Judges agree, weighted score computed locally. Consensus: {aggregation['judge_consensus']}")
+            final_evaluation = self.evaluator_core.create_local_evaluation(aggregation)
         
-        final_evaluation = self.evaluator_core.parse_final_evaluation(chief_text)
         final_evaluation["individual_judgments"] = individual_judgments
         final_evaluation["failed_criteria"] = failed_criteria
+        final_evaluation["aggregation"] = aggregation
+        final_evaluation["chief_judge_called"] = bool(chief_text)
         final_evaluation["raw_chief_response"] = chief_text
+        if analysis:
+            final_evaluation["static_analysis"] = analysis
+        if test_results:
+            final_evaluation["tests"] = test_results
+        if revision:
+            final_evaluation["revision"] = revision["summary"]
         
         return final_evaluation
+
+    def evaluate_with_multiple_judges(self, exercise_requirement: str, student_code: str, language: str = "python", analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None, previous: Dict[str, Any] = None) -> Dict[str, Any]:
+        return asyncio.run(self.evaluate_with_multiple_judges_async(exercise_requirement, student_code, language, analysis, test_results, previous))
@@ -0,0 +1,227 @@
+import asyncio
+import datetime
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Any, Set
+from .llm_judge_api import LLMJudgeEvaluatorAPI
+from .llm_judge_dedup import SubmissionDeduplicator
+from .llm_judge_static import analyze_cohort
+from .llm_judge_store import ResultStore, text_hash
+from .utils import read_file
+
+class LLMJudgeBatchEvaluator:
+    def __init__(self, evaluator_api: LLMJudgeEvaluatorAPI, workers: int = 4, deduplicator: SubmissionDeduplicator = None, static_processes: int = None, store: ResultStore = None, incremental: bool = False):
+        self.evaluator_api = evaluator_api
+        self.workers = max(1, workers)
+        self.deduplicator = deduplicator
+        self.static_processes = static_processes
+        self.store = store
+        self.incremental = incremental
+
+    def collect_submissions(self, submissions: str) -> List[str]:
+        if os.path.isdir(submissions):
+            paths = []
+            for root, dirs, files in os.walk(submissions):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if not name.startswith('.'):
+                        paths.append(os.path.join(root, name))
+        else:
+            paths = sorted(path for path in glob.glob(submissions, recursive=True) if os.path.isfile(path))
+        
+        return [os.path.normpath(path) for path in paths]
+
+    def load_completed(self, results_file: str) -> Set[str]:
+        completed = set()
+        
+        if not os.path.exists(results_file):
+            return completed
+        
+        with open(results_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line; that submission is simply redone.
+                    continue
+                if "error" not in record and "submission_id" in record:
+                    completed.add(record["submission_id"])
+        
+        return completed
+
+    def restore_store(self, results_file: str, exercise_requirement: str) -> int:
+        # Store rows are written in batches while each JSONL record is synced at once, so a crash can lose rows
+        # for submissions the JSONL already holds. Resuming skips those, so they are copied over from the JSONL.
+        if not os.path.exists(results_file):
+            return 0
+        
+        recorded = self.store.recorded(text_hash(exercise_requirement))
+        restored = 0
+        with open(results_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in record or "submission_id" not in record or (record["submission_id"], record.get("evaluated_at")) in recorded:
+                    continue
+                path = record["submission_id"]
+                self.store.add(record, exercise_requirement, read_file(path) if os.path.isfile(path) else None)
+                restored += 1
+        
+        self.store.flush()
+        return restored
+
+    def _append_result(self, results_file: str, record: Dict[str, Any]):
+        with open(results_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _new_record(self, submission_file: str, language: str) -> Dict[str, Any]:
+        return {
+            "submission_id": submission_file,
+            "language": language,
+            "model": self.evaluator_api.model_name,
+            "evaluated_at": datetime.datetime.now().isoformat(timespec='seconds')
+        }
+
+    def read_submissions(self, submission_files: List[str]) -> Dict[str, str]:
+        return {path: read_file(path) for path in submission_files}
+
+    def cluster_submissions(self, codes: Dict[str, str], language: str) -> Dict[str, List]:
+        # Unreadable files stay on their own and fail in the normal path; empty ones are ordinary submissions.
+        codes = {path: student_code if student_code is not None else f"\0unreadable {path}" for path, student_code in codes.items()}
+        
+        clusters = self.deduplicator.cluster(codes, language)
+        return {cluster["representative"]: cluster["members"] for cluster in clusters}
+
+    def analyze_submissions(self, codes: Dict[str, str], language: str) -> Dict[str, Dict[str, Any]]:
+        readable = {path: student_code for path, student_code in codes.items() if student_code is not None}
+        return analyze_cohort(readable, language, self.static_processes)
+
+    async def _evaluate_submission_async(self, exercise_requirement: str, submission_file: str, language: str, analysis: Dict[str, Any] = None, previous: Dict[str, Any] = None) -> Dict[str, Any]:
+        record = self._new_record(submission_file, language)
+        started = time.monotonic()
+        
+        student_code = read_file(submission_file)
+        if student_code is None:
+            record["error"] = "Failed to read student code file"
+            return record
+        
+        try:
+            record["evaluation"] = await self.evaluator_api.evaluate_with_multiple_judges_async(exercise_requirement, student_code, language, analysis, previous=previous)
+        except Exception as e:
+            record["error"] = f"Evaluation failed: {e}"
+        
+        record["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return record
+
+    async def evaluate_cohort_async(self, exercise_requirement: str, submissions: str, results_file: str, language: str = "python") -> Dict[str, Any]:
+        submission_files = self.collect_submissions(submissions)
+        completed = self.load_completed(results_file)
+        pending = [path for path in submission_files if path not in completed]
+        
+        print(f" Submissions found: {len(submission_files)}")
+        print(f" Already evaluated: {len(submission_files) - len(pending)}")
+        print(f" Pending: {len(pending)}")
+        
+        if self.store and completed:
+            restored = self.restore_store(results_file, exercise_requirement)
+            if restored:
+                print(f" Results store: restored {restored} evaluations lost by an interrupted run")
+        
+        codes = self.read_submissions(pending) if pending and (self.deduplicator or self.evaluator_api.static_analysis or self.store) else {}
+        
+        analyses = {}
+        if self.evaluator_api.static_analysis and pending:
+            analysis_started = time.monotonic()
+            # Parsing is CPU-bound, so the whole cohort is analysed up front in worker processes.
+            analyses = self.analyze_submissions(codes, language)
+            print(f" Static analysis: {len(analyses)} submissions in {time.monotonic() - analysis_started:.2f}s")
+        
+        duplicates = {}
+        if self.deduplicator and pending:
+            duplicates = self.cluster_submissions(codes, language)
+            reused = sum(len(members) for members in duplicates.values())
+            print(f" Near-duplicates: {reused} submissions reuse the judgment of {sum(1 for members in duplicates.values() if members)} representatives")
+        
+        previous = {}
+        if self.store and self.incremental and pending:
+            exercise_hash = text_hash(exercise_requirement)
+            previous = {path: self.store.latest(path, exercise_hash) for path in pending}
+            previous = {path: found for path, found in previous.items() if found}
+            print(f" Resubmissions: {len(previous)} submissions have a previous evaluation to build on")
+        
+        queue = asyncio.Queue()
+        for path in pending:
+            if not self.deduplicator or path in duplicates:
+                queue.put_nowait(path)
+        
+        summary = {"total": len(submission_files), "skipped": len(submission_files) - len(pending), "evaluated": 0, "failed": 0, "duplicates": 0}
+        started = time.monotonic()
+        
+        def report(record: Dict[str, Any]):
+            self._append_result(results_file, record)
+            if self.store:
+                self.store.add(record, exercise_requirement, codes.get(record["submission_id"]))
+            
+            if "error" in record:
+                summary["failed"] += 1
+                status = record["error"]
+            else:
+                summary["evaluated"] += 1
+                status = f"{record['evaluation'].get('final_score', 0):.1f}/10"
+                if "duplicate_of" in record:
+                    summary["duplicates"] += 1
+                    status += f" (duplicate of {record['duplicate_of']}, similarity {record['similarity']:.2f})"
+            
+            done = summary["evaluated"] + summary["failed"]
+            elapsed = time.monotonic() - started
+            rate = done / elapsed * 60 if elapsed > 0 else 0.0
+            print(f" [{done}/{len(pending)}] {record['submission_id']}: {status} ({rate:.1f} submissions/min)")
+        
+        async def worker():
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                
+                members = duplicates.pop(path, [])
+                record = await self._evaluate_submission_async(exercise_requirement, path, language, analyses.get(path), previous.get(path))
+                reusable = "error" not in record and bool(record["evaluation"].get("individual_judgments"))
+                if members and reusable:
+                    record["duplicates"] = [member for member, _ in members]
+                report(record)
+                
+                if members and not reusable:
+                    # No judge succeeded for the representative, so its near-duplicates are judged on their own.
+                    for member, _ in members:
+                        queue.put_nowait(member)
+                    continue
+                
+                for member, similarity in members:
+                    duplicate = self._new_record(member, language)
+                    duplicate.update({
+                        "evaluation": record["evaluation"],
+                        "duplicate_of": path,
+                        "similarity": similarity,
+                        "elapsed_seconds": 0.0
+                    })
+                    report(duplicate)
+        
+        await asyncio.gather(*[worker() for _ in range(min(self.workers, len(pending)) or 1)])
+        if self.store:
+            self.store.flush()
+        
+        summary["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        done = summary["evaluated"] + summary["failed"]
+        summary["submissions_per_minute"] = round(done / summary["elapsed_seconds"] * 60, 2) if summary["elapsed_seconds"] > 0 else 0.0
+        
+        return summary
+
+    def evaluate_cohort(self, exercise_requirement: str, submissions: str, results_file: str, language: str = "python") -> Dict[str, Any]:
+        return asyncio.run(self.evaluate_cohort_async(exercise_requirement, submissions, results_file, language))
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_PATH = ".llm_judge_cache.sqlite3"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+class LLMJudgeCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, refresh: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def make_key(self, kind: str, model_name: str, prompt: str, rubric: Dict[str, Any], options: Optional[Dict[str, Any]] = None, response_format: Any = None) -> str:
+        key_fields = {
+            "kind": kind,
+            "model": model_name,
+            "prompt": prompt,
+            "rubric": rubric,
+            "options": options or {}
+        }
+        if response_format is not None:
+            key_fields["format"] = response_format
+        
+        payload = json.dumps(key_fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.refresh:
+            self.misses += 1
+            return None
+        
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        size = len(value.encode('utf-8'))
+        now = time.time()
+        
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Evict least recently used entries down to 90% of the budget so a full cache
+        # does not pay an eviction scan on every single insert.
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.execute("VACUUM")
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._total_bytes
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help=f"Judgment cache database (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_CACHE_MAX_BYTES // (1024 * 1024), help="Cache size limit in MB before LRU eviction")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the judgment cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true", help="Ignore cached responses but store fresh ones")
+    parser.add_argument("--clear-cache", action="store_true", help="Delete every cached response before running")
+
+def build_cache(args) -> Optional[LLMJudgeCache]:
+    if args.no_cache:
+        return None
+    
+    cache = LLMJudgeCache(args.cache_path, max_bytes=args.cache_max_mb * 1024 * 1024, refresh=args.refresh_cache)
+    if args.clear_cache:
+        cache.clear()
+        print(f" Cache cleared: {args.cache_path}")
+    
+    return cache
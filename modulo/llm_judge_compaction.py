@@ -0,0 +1,223 @@
+import ast
+import functools
+import io
+import json
+import re
+import tokenize
+from typing import Dict, List, Any, Tuple
+
+HASH_COMMENT_LANGUAGES = {"python", "py", "ruby", "rb", "shell", "bash", "sh", "r", "perl", "yaml"}
+SLASH_COMMENT_LANGUAGES = {"c", "cpp", "c++", "java", "javascript", "js", "typescript", "ts", "go", "rust", "csharp", "c#", "kotlin", "swift", "scala", "php", "dart"}
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    # Without the model's tokenizer, count words and symbols and never go below
+    # the usual four characters per token; long identifiers split into several.
+    return max(len(TOKEN_PATTERN.findall(text)), len(text) // 4)
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+def _strip_python_comments(code: str) -> str:
+    try:
+        comments = [token.start for token in tokenize.generate_tokens(io.StringIO(code).readline) if token.type == tokenize.COMMENT]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return _strip_line_comments(code, "#")
+    
+    lines = code.splitlines()
+    for row, column in comments:
+        lines[row - 1] = lines[row - 1][:column]
+    return "\n".join(lines)
+
+def _strip_line_comments(code: str, marker: str) -> str:
+    # Best effort for code that does not tokenize: a marker inside a string on the
+    # same line is kept by only cutting when the quotes before it are balanced.
+    lines = []
+    for line in code.splitlines():
+        position = line.find(marker)
+        while position != -1 and (line.count('"', 0, position) % 2 or line.count("'", 0, position) % 2):
+            position = line.find(marker, position + 1)
+        lines.append(line[:position] if position != -1 else line)
+    return "\n".join(lines)
+
+def _strip_slash_comments(code: str) -> str:
+    result = []
+    index = 0
+    quote = None
+    while index < len(code):
+        char = code[index]
+        if quote:
+            result.append(char)
+            if char == "\\" and index + 1 < len(code):
+                result.append(code[index + 1])
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'`":
+            quote = char
+            result.append(char)
+        elif code.startswith("//", index):
+            end = code.find("\n", index)
+            index = len(code) if end == -1 else end
+            continue
+        elif code.startswith("/*", index):
+            end = code.find("*/", index + 2)
+            # Keep line numbers stable by leaving the newlines of the comment.
+            result.append("\n" * code.count("\n", index, len(code) if end == -1 else end))
+            index = len(code) if end == -1 else end + 2
+            continue
+        else:
+            result.append(char)
+        index += 1
+    return "".join(result)
+
+# Every judge prompt and the chief prompt strip the same submission, so the
+# tokenizer runs once per submission instead of once per prompt.
+@functools.lru_cache(maxsize=64)
+def strip_comments(code: str, language: str) -> str:
+    if language in {"python", "py"} and "#" in code:
+        code = _strip_python_comments(code)
+    elif language in HASH_COMMENT_LANGUAGES and "#" in code:
+        code = _strip_line_comments(code, "#")
+    elif language in SLASH_COMMENT_LANGUAGES and "/" in code:
+        code = _strip_slash_comments(code)
+    
+    return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+
+def _python_units(code: str) -> List[Tuple[str, int, int]]:
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    units = []
+    module_start = None
+    
+    for node in tree.body:
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+        end = node.end_lineno
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if module_start is not None:
+                units.append(("module code", module_start, start - 1))
+                module_start = None
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            units.append((f"{kind} {node.name}", start, end))
+        elif module_start is None:
+            module_start = start
+    
+    if module_start is not None:
+        units.append(("module code", module_start, len(lines)))
+    
+    # Comments and blank lines between top-level nodes go with the unit below them.
+    contiguous = []
+    previous_end = 0
+    for name, start, end in units:
+        contiguous.append((name, previous_end + 1, end))
+        previous_end = end
+    if contiguous and previous_end < len(lines):
+        name, start, _ = contiguous[-1]
+        contiguous[-1] = (name, start, len(lines))
+    return contiguous
+
+def _line_units(code: str) -> List[Tuple[str, int, int]]:
+    # Top-level blocks start at lines without indentation.
+    units = []
+    start = 1
+    for number, line in enumerate(code.splitlines(), 1):
+        if number > start and line.strip() and not line[0].isspace() and not line.lstrip().startswith(("}", ")", "]")):
+            units.append((f"lines {start}-{number - 1}", start, number - 1))
+            start = number
+    units.append((f"lines {start}-{len(code.splitlines())}", start, len(code.splitlines())))
+    return units
+
+@functools.lru_cache(maxsize=64)
+def code_units(code: str, language: str) -> Tuple[Tuple[str, int, int], ...]:
+    try:
+        return tuple(_python_units(code) if language in {"python", "py"} else _line_units(code))
+    except SyntaxError:
+        return tuple(_line_units(code))
+
+class PromptCompactor:
+    def __init__(self, token_budget: int = 3000, max_evidence: int = 2, max_evidence_chars: int = 160, max_reasoning_chars: int = 600, share_prefix: bool = False):
+        self.token_budget = token_budget
+        self.share_prefix = share_prefix
+        self.max_evidence = max_evidence
+        self.max_evidence_chars = max_evidence_chars
+        self.max_reasoning_chars = max_reasoning_chars
+
+    def strip_comments(self, code: str, language: str) -> str:
+        return strip_comments(code, language.lower())
+
+    def compact_code(self, code: str, language: str, keep_comments: bool = False) -> str:
+        if keep_comments:
+            return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+        return self.strip_comments(code, language)
+
+    def trim_judgments(self, judgments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        trimmed = []
+        for judgment in judgments:
+            judgment = dict(judgment)
+            evidence = judgment.get("specific_evidence")
+            if isinstance(evidence, list):
+                judgment["specific_evidence"] = [self._truncate(str(item), self.max_evidence_chars) for item in evidence[:self.max_evidence]]
+            if isinstance(judgment.get("reasoning"), str):
+                judgment["reasoning"] = self._truncate(judgment["reasoning"], self.max_reasoning_chars)
+            trimmed.append(judgment)
+        return trimmed
+
+    def _truncate(self, text: str, limit: int) -> str:
+        return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+    def fits(self, prompt: str) -> bool:
+        return estimate_tokens(prompt) <= self.token_budget
+
+    def outline(self, code: str, language: str) -> str:
+        # Signatures only, so the chief can still place evidence in a submission
+        # too large to quote.
+        pattern = r'^\s*(async\s+def|def|class)\s' if language.lower() in {"python", "py"} else r'^\S.*[{(]\s*$'
+        return "\n".join(line.rstrip() for line in code.splitlines() if re.match(pattern, line))
+
+    def split_code(self, code: str, language: str, chunk_budget: int) -> List[Dict[str, Any]]:
+        lines = code.splitlines()
+        units = code_units(code, language.lower())
+        
+        # Token counts are summed per line rather than re-estimated on every joined
+        # slice, which keeps splitting linear in the size of the submission.
+        line_tokens = [estimate_tokens(line) + 1 for line in lines]
+        
+        pieces = []
+        for name, start, end in units:
+            tokens = sum(line_tokens[start - 1:end])
+            if tokens <= chunk_budget:
+                pieces.append((name, start, end, tokens))
+                continue
+            # A single function or class over budget is cut into consecutive line ranges.
+            piece_start, piece_tokens = start, 0
+            for number in range(start, end + 1):
+                if number > piece_start and piece_tokens + line_tokens[number - 1] > chunk_budget:
+                    pieces.append((f"{name} (lines {piece_start}-{number - 1})", piece_start, number - 1, piece_tokens))
+                    piece_start, piece_tokens = number, 0
+                piece_tokens += line_tokens[number - 1]
+            pieces.append((f"{name} (lines {piece_start}-{end})", piece_start, end, piece_tokens))
+        
+        chunks = []
+        for name, start, end, tokens in pieces:
+            if chunks and chunks[-1]["tokens"] + tokens <= chunk_budget:
+                chunks[-1]["names"].append(name)
+                chunks[-1]["end"] = end
+                chunks[-1]["tokens"] += tokens
+            else:
+                chunks.append({"names": [name], "start": start, "end": end, "tokens": tokens})
+        
+        for chunk in chunks:
+            chunk["code"] = "\n".join(lines[chunk["start"] - 1:chunk["end"]])
+        return chunks
+
+def add_compaction_arguments(parser):
+    parser.add_argument("--token-budget", type=int, default=3000,
+                        help="Prompt tokens per LLM call before code is chunked (default: 3000, fits Ollama's default 4096 context)")
+    parser.add_argument("--no-compaction", action="store_true", help="Send code, rubric and judgments verbatim")
+    parser.add_argument("--share-code-prefix", action="store_true",
+                        help="Keep comments for every judge if any criterion reads them, so all judge prompts share one prefix")
+
+def build_compactor(args) -> PromptCompactor:
+    if args.no_compaction:
+        return None
+    return PromptCompactor(token_budget=args.token_budget, share_prefix=args.share_code_prefix)
@@ -1,66 +1,72 @@
 import json
 import re
 from typing import Dict, List, Any, Tuple
+from .llm_judge_compaction import PromptCompactor, compact_json, estimate_tokens
+from .llm_judge_static import format_static_summary
+from .llm_judge_sandbox import format_test_summary
 
-class LLMJudgeEvaluatorCore:
-    def __init__(self, model_name: str = "llama3.1:8b"):
-        self.model_name = model_name
-        self.evaluation_rubric = {
-            "correctness": {
-                "weight": 0.45,
-                "description": "Does the code correctly solve the problem? Does it handle edge cases?",
-                "levels": {
-                    "excellent": (9, 10, "Perfect implementation meeting all requirements"),
-                    "good": (7, 8.9, "Mostly correct with minor issues"),
-                    "fair": (5, 6.9, "Partially correct but significant gaps"),
-                    "poor": (0, 4.9, "Incorrect or completely missing functionality")
-                }
-            },
-            "efficiency": {
-                "weight": 0.30,
-                "description": "Is the code optimized? Appropriate algorithms and data structures?",
-                "levels": {
-                    "excellent": (9, 10, "Optimal solution with best time/space complexity"),
-                    "good": (7, 8.9, "Efficient with minor optimizations possible"),
-                    "fair": (5, 6.9, "Suboptimal but functional"),
-                    "poor": (0, 4.9, "Inefficient or problematic approach")
-                }
-            },
-            "readability": {
-                "weight": 0.25,
-                "description": "Is the code clean, well-organized, and easy to understand?",
-                "levels": {
-                    "excellent": (9, 10, "Exceptionally clean and well-documented"),
-                    "good": (7, 8.9, "Readable with minor style issues"),
-                    "fair": (5, 6.9, "Somewhat readable but needs improvement"),
-                    "poor": (0, 4.9, "Difficult to read and understand")
-                }
-            }
-        }
-    
-    def create_judge_prompt(self, exercise_requirement: str, student_code: str, criterion: str, language: str = "python") -> str:        
-        rubric_info = self.evaluation_rubric[criterion]
-        
-        system_prompt = f"""
-        You are an expert {language.upper()} programming judge specializing in evaluating code for **{criterion.upper()}**.
-        
-        EVALUATION RUBRIC FOR {criterion.upper()}:
-        {rubric_info['description']}
-        
-        SCORING LEVELS:
-        {json.dumps(rubric_info['levels'], indent=2)}
-        
-        EXERCISE REQUIREMENT:
-        {exercise_requirement}
+JUDGMENT_FIELDS = ["criterion", "score", "confidence", "level", "reasoning", "specific_evidence"]
+# Judgments settled without a model are facts, not opinions: they count towards the score but never call for the chief.
+# "static" marks static-analysis certainties, "tests" a correctness score computed from the test pass rate.
+CERTAIN_MARKERS = ["static", "tests"]
 
-        CODE TO EVALUATE:
-        ```{language}
-        {student_code}
-        ```
+# The chief's markdown answer is parsed on every evaluation that asks for one, so the patterns are compiled at import.
+JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+FINAL_SCORE_PATTERN = re.compile(r'\*\*1\.\s*FINAL SCORE\s*\(0-10\):\*\*\s*(\d+(?:\.\d+)?)')
+OVERVIEW_PATTERN = re.compile(r'\*\*2\.\s*OVERALL ASSESSMENT:\*\*\s*(.*?)(?=\*\*3\.|$)', re.DOTALL)
+BREAKDOWN_PATTERN = re.compile(r'\*\*3\.\s*WEIGHTED BREAKDOWN:\*\*(.*?)(?=\*\*4\.|$)', re.DOTALL)
+SECTION_PATTERNS = {
+    "key_strengths": (re.compile(r'\*\*4\.\s*KEY STRENGTHS:\*\*(.*?)(?=\*\*5\.|$)', re.IGNORECASE | re.DOTALL), True),
+    "critical_issues": (re.compile(r'\*\*5\.\s*CRITICAL ISSUES:\*\*(.*?)(?=\*\*6\.|$)', re.IGNORECASE | re.DOTALL), True),
+    "actionable_improvements": (re.compile(r'\*\*6\.\s*ACTIONABLE IMPROVEMENTS:\*\*(.*?)(?=\*\*7\.|$)', re.IGNORECASE | re.DOTALL), True),
+    "learning_path": (re.compile(r'\*\*7\.\s*LEARNING PATH:\*\*(.*?)(?=\*\*8\.|$)', re.IGNORECASE | re.DOTALL), True),
+    "judge_consensus": (re.compile(r'\*\*8\.\s*JUDGE CONSENSUS:\*\*(.*?)(?=$)', re.IGNORECASE | re.DOTALL), False)
+}
+LIST_BULLET_PATTERN = re.compile(r'^\s*[•*]\s*')
+LIST_MARKER_PATTERN = re.compile(r'^[-\s•*]+\s*')
 
-        Please evaluate ONLY for {criterion} and provide your judgment in this EXACT JSON format:
+class FrozenDict(dict):
+    # Still a dict, so the rubric serialises into cache keys and prompts exactly as before, but shared safely.
+    __slots__ = ()
 
-        {{
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("The evaluation rubric is shared and read-only; derive a changed copy with Rubric.with_criterion_options")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class Rubric(FrozenDict):
+    __slots__ = ("_templates",)
+
+    def __init__(self, criteria: Dict[str, Dict[str, Any]]):
+        super().__init__({criterion: freeze(info) for criterion, info in criteria.items()})
+        self._templates = None
+
+    @property
+    def templates(self) -> Dict[str, Any]:
+        # Every part of the prompts that depends only on the rubric is rendered once per rubric and process;
+        # the rubric cannot change, so the rendering never goes stale.
+        if self._templates is None:
+            self._templates = render_rubric_templates(self)
+        return self._templates
+
+    def with_criterion_options(self, criterion: str, **options) -> "Rubric":
+        return Rubric({**self, criterion: {**self[criterion], **options}})
+
+def render_rubric_templates(evaluation_rubric: Dict[str, Any]) -> Dict[str, Any]:
+    dumps = {"json": lambda value: json.dumps(value, indent=2), "compact": compact_json}
+    weights = {criterion: info["weight"] for criterion, info in evaluation_rubric.items()}
+    
+    judgment_formats = {criterion: f"""{{
             "criterion": "{criterion}",
             "score": <number_between_0_and_10>,
             "confidence": <number_between_0_and_1>,
@@ -70,46 +76,303 @@ class LLMJudgeEvaluatorCore:
                 "<concrete example 1 from the code>",
                 "<concrete example 2 from the code>"
             ]
-        }}
+        }}""" for criterion in evaluation_rubric}
+    
+    rubric_sections = {style: "\n".join([
+        f"""
+        {criterion.upper()}:
+        {info['description']}
+        SCORING LEVELS:
+        {dump(info['levels'])}
+        """ for criterion, info in evaluation_rubric.items()
+    ]) for style, dump in dumps.items()}
+    
+    judgment_entries = ",\n".join([
+        f"""            {{
+                "criterion": "{criterion}",
+                "score": <number_between_0_and_10>,
+                "confidence": <number_between_0_and_1>,
+                "level": "<excellent|good|fair|poor>",
+                "reasoning": "<detailed explanation for {criterion}>",
+                "specific_evidence": [
+                    "<concrete example 1 from the code>",
+                    "<concrete example 2 from the code>"
+                ]
+            }}""" for criterion in evaluation_rubric.keys()
+    ])
+    
+    return {
+        "levels": {criterion: {style: dump(info["levels"]) for style, dump in dumps.items()} for criterion, info in evaluation_rubric.items()},
+        "judgment_formats": judgment_formats,
+        "rubric_sections": rubric_sections,
+        "judgment_entries": judgment_entries,
+        "weights": {style: dump(weights) for style, dump in dumps.items()},
+        "breakdown_fields": ', '.join([f'"{criterion}": <score>' for criterion in evaluation_rubric.keys()]),
+        "breakdown_lines": ''.join([f'**{criterion}:** <score> (weight: {info["weight"]})' + '\\n' for criterion, info in evaluation_rubric.items()]),
+        "score_ranges": {criterion: (min(level[0] for level in info["levels"].values()), max(level[1] for level in info["levels"].values()))
+                         for criterion, info in evaluation_rubric.items()},
+        "levels_by_floor": {criterion: sorted(((level, bounds[0]) for level, bounds in info["levels"].items()), key=lambda item: item[1], reverse=True)
+                            for criterion, info in evaluation_rubric.items()},
+        "breakdown_patterns": {criterion: re.compile(fr'\*\*{re.escape(criterion)}:\*\*\s*(\d+(?:\.\d+)?)', re.IGNORECASE) for criterion in evaluation_rubric}
+    }
+
+DEFAULT_RUBRIC = Rubric({
+    "correctness": {
+        "weight": 0.45,
+        "description": "Does the code correctly solve the problem? Does it handle edge cases?",
+        "num_predict": 512,
+        "keep_comments": False,
+        # One broken part breaks the whole program, so chunked judgments keep the worst score.
+        "chunk_merge": "min",
+        # Which kinds of change in a resubmission call for judging this criterion again.
+        "revision_triggers": ["code"],
+        "levels": {
+            "excellent": (9, 10, "Perfect implementation meeting all requirements"),
+            "good": (7, 8.9, "Mostly correct with minor issues"),
+            "fair": (5, 6.9, "Partially correct but significant gaps"),
+            "poor": (0, 4.9, "Incorrect or completely missing functionality")
+        }
+    },
+    "efficiency": {
+        "weight": 0.30,
+        "description": "Is the code optimized? Appropriate algorithms and data structures?",
+        "num_predict": 512,
+        "keep_comments": False,
+        "chunk_merge": "mean",
+        "revision_triggers": ["loops", "structure"],
+        "levels": {
+            "excellent": (9, 10, "Optimal solution with best time/space complexity"),
+            "good": (7, 8.9, "Efficient with minor optimizations possible"),
+            "fair": (5, 6.9, "Suboptimal but functional"),
+            "poor": (0, 4.9, "Inefficient or problematic approach")
+        }
+    },
+    "readability": {
+        "weight": 0.25,
+        "description": "Is the code clean, well-organized, and easy to understand?",
+        "num_predict": 512,
+        "keep_comments": True,
+        "chunk_merge": "mean",
+        "revision_triggers": ["comments", "names", "structure"],
+        "levels": {
+            "excellent": (9, 10, "Exceptionally clean and well-documented"),
+            "good": (7, 8.9, "Readable with minor style issues"),
+            "fair": (5, 6.9, "Somewhat readable but needs improvement"),
+            "poor": (0, 4.9, "Difficult to read and understand")
+        }
+    }
+})
+
+class Judgment:
+    __slots__ = tuple(JUDGMENT_FIELDS)
+
+    def __init__(self, criterion: str, score: float = None, confidence: float = None, level: str = None, reasoning: str = None, specific_evidence: List[str] = None):
+        self.criterion = criterion
+        self.score = score
+        self.confidence = confidence
+        self.level = level
+        self.reasoning = reasoning
+        self.specific_evidence = specific_evidence if specific_evidence is not None else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in JUDGMENT_FIELDS}
+
+class LLMJudgeEvaluatorCore:
+    def __init__(self, model_name: str = "llama3.1:8b", disagreement_threshold: float = 3.0, min_confidence: float = 0.6, chief_model: str = None, compactor: PromptCompactor = None, evaluation_rubric: Rubric = None):
+        self.model_name = model_name
+        self.compactor = compactor
+        # Criteria may name their own judge model with a "model" key; None means the run's model.
+        self.chief_model = chief_model
+        self.disagreement_threshold = disagreement_threshold
+        self.min_confidence = min_confidence
+        # Built once at import and shared by every core; per-run changes such as criterion models make a new Rubric.
+        self.evaluation_rubric = evaluation_rubric if evaluation_rubric is not None else DEFAULT_RUBRIC
+
+    def _static_section(self, analysis: Dict[str, Any], criterion: str = None) -> str:
+        summary = format_static_summary(analysis, criterion)
+        if not summary:
+            return ""
+        return f"""STATIC ANALYSIS (computed by a parser, treat as facts and do not re-derive them):
+        {summary}
+        Keep your reasoning short and build on these facts.
+
+        """
+
+    def _test_section(self, test_results: Dict[str, Any], criterion: str = None) -> str:
+        # Only correctness is about whether the program works; the other judges would over-weight a failing run.
+        summary = format_test_summary(test_results) if criterion in (None, "correctness") else ""
+        if not summary:
+            return ""
+        return f"""TEST RESULTS (the code was run on the exercise's test cases):
+        {summary}
+        Base the correctness score on these results and use the code to explain the failures.
 
-        Focus ONLY on {criterion}. Be specific and reference actual code elements.
         """
+
+    def _levels_text(self, criterion: str) -> str:
+        return self.evaluation_rubric.templates["levels"][criterion]["compact" if self.compactor else "json"]
+
+    def shared_code(self, student_code: str, language: str = "python", criterion: str = None) -> str:
+        # Judges whose criterion ignores comments get the code without them, and criteria with the same setting
+        # still share a prefix. share_prefix trades those tokens for one prefix across every judge.
+        if self.compactor:
+            if criterion is None or self.compactor.share_prefix:
+                keep_comments = any(info.get("keep_comments", False) for info in self.evaluation_rubric.values())
+            else:
+                keep_comments = self.evaluation_rubric[criterion].get("keep_comments", False)
+            return self.compactor.compact_code(student_code, language, keep_comments)
+        return student_code
+
+    def create_judge_prefix(self, exercise_requirement: str, student_code: str, language: str = "python", chunk_note: str = None, criterion: str = None) -> str:
+        code_heading = f"CODE TO EVALUATE ({chunk_note}):" if chunk_note else "CODE TO EVALUATE:"
         
-        return system_prompt
+        return f"""
+        You are an expert {language.upper()} programming judge on a panel that evaluates one submission from several angles.
+
+        EXERCISE REQUIREMENT:
+        {exercise_requirement}
 
-    def create_chief_judge_prompt(self, exercise_requirement: str, student_code: str, individual_judgments: List[Dict], language: str = "python") -> str:
+        {code_heading}
+        ```{language}
+        {self.shared_code(student_code, language, criterion)}
+        ```
+        """
+
+    def create_judge_prompt(self, exercise_requirement: str, student_code: str, criterion: str, language: str = "python", chunk_note: str = None, analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> str:        
+        rubric_info = self.evaluation_rubric[criterion]
+        levels = self._levels_text(criterion)
+        static_section = self._static_section(analysis, criterion) + self._test_section(test_results, criterion)
         
-        judgments_str = json.dumps(individual_judgments, indent=2)
+        # The exercise and code come first and are identical across criteria that render the code alike, so
+        # Ollama evaluates them once per rendering; only this short criterion-specific tail differs between calls.
+        criterion_prompt = f"""
+        YOUR ROLE: specialist judge for **{criterion.upper()}**.
+
+        EVALUATION RUBRIC FOR {criterion.upper()}:
+        {rubric_info['description']}
+        
+        SCORING LEVELS:
+        {levels}
+
+        {static_section}Please evaluate ONLY for {criterion} and provide your judgment in this EXACT JSON format:
+
+        {self._judgment_format(criterion)}
+
+        Focus ONLY on {criterion}. Be specific and reference actual code elements.
+        """
+        
+        return self.create_judge_prefix(exercise_requirement, student_code, language, chunk_note, criterion) + criterion_prompt
+
+    def _judgment_format(self, criterion: str) -> str:
+        return self.evaluation_rubric.templates["judgment_formats"][criterion]
+
+    def create_revision_prefix(self, exercise_requirement: str, diff: Dict[str, Any], language: str = "python") -> str:
+        unit_note = "function by function" if diff["level"] == "function" else "line by line"
         
-        system_prompt = f"""
-        You are the CHIEF JUDGE synthesizing evaluations from multiple specialized judges.
+        return f"""
+        You are an expert {language.upper()} programming judge on a panel re-evaluating a revised submission. The previous version was already judged; you only see what changed since then.
 
         EXERCISE REQUIREMENT:
         {exercise_requirement}
 
-        CODE EVALUATED:
-        ```{language}
-        {student_code}
+        CHANGES SINCE THE PREVIOUS VERSION (unified diff, {unit_note}):
+        ```diff
+        {diff['unified']}
         ```
+        """
 
-        INDIVIDUAL JUDGE EVALUATIONS:
-        {judgments_str}
+    def create_revision_judge_prompt(self, exercise_requirement: str, diff: Dict[str, Any], criterion: str, previous_judgment: Dict[str, Any], language: str = "python", analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None) -> str:
+        rubric_info = self.evaluation_rubric[criterion]
+        levels = self._levels_text(criterion)
+        previous = {key: previous_judgment.get(key) for key in ["score", "level", "reasoning", "specific_evidence"]}
+        previous = compact_json(self.compactor.trim_judgments([previous])[0]) if self.compactor else json.dumps(previous, indent=2)
+        static_section = self._static_section(analysis, criterion) + self._test_section(test_results, criterion)
+        
+        revision_prompt = f"""
+        YOUR ROLE: specialist judge for **{criterion.upper()}**.
 
-        RUBRIC WEIGHTS:
-        {json.dumps({k: v['weight'] for k, v in self.evaluation_rubric.items()}, indent=2)}
+        EVALUATION RUBRIC FOR {criterion.upper()}:
+        {rubric_info['description']}
+        
+        SCORING LEVELS:
+        {levels}
 
-        Your task is to:
-        1. Calculate weighted final score
-        2. Provide comprehensive overall assessment
-        3. Resolve any inconsistencies between judges
-        4. Generate actionable feedback
+        PREVIOUS JUDGMENT FOR {criterion.upper()} (of the previous version):
+        {previous}
+
+        {static_section}Update the judgment for the revised code. Keep whatever the changes do not touch, move the score only as far as the changes justify, and cite the changed lines as evidence. Provide your judgment in this EXACT JSON format:
 
-        Provide your final evaluation in this EXACT format:
+        {self._judgment_format(criterion)}
+
+        Focus ONLY on {criterion}. Be specific and reference actual code elements.
+        """
+        
+        return self.create_revision_prefix(exercise_requirement, diff, language) + revision_prompt
+
+    def create_combined_judge_prompt(self, exercise_requirement: str, student_code: str, language: str = "python", analysis: Dict[str, Any] = None, test_results: Dict[str, Any] = None, criteria: List[str] = None) -> str:
+        static_section = self._static_section(analysis) + self._test_section(test_results)
+        templates = self.evaluation_rubric.templates
+        if criteria and list(criteria) != list(self.evaluation_rubric.keys()):
+            # Criteria settled without a judge are left out, so the answer holds exactly the judgments still needed.
+            templates = render_rubric_templates({criterion: self.evaluation_rubric[criterion] for criterion in criteria})
+        rubric_sections = templates["rubric_sections"]["compact" if self.compactor else "json"]
+        judgment_entries = templates["judgment_entries"]
+        
+        criteria_prompt = f"""
+        YOUR ROLE: judge every criterion below independently.
+
+        EVALUATION RUBRIC:
+        {rubric_sections}
+
+        {static_section}Evaluate each criterion independently and provide your judgments as a JSON array with EXACTLY one object per criterion, in this EXACT format:
+
+        [
+{judgment_entries}
+        ]
+
+        Judge every criterion on its own merits. Be specific and reference actual code elements.
+        """
+        
+        return self.create_judge_prefix(exercise_requirement, student_code, language) + criteria_prompt
+
+    def create_chief_judge_prompt(self, exercise_requirement: str, student_code: str, individual_judgments: List[Dict], language: str = "python", structured: bool = False) -> str:
+        
+        templates = self.evaluation_rubric.templates
+        judgments_str = json.dumps(individual_judgments, indent=2)
+        weights_str = templates["weights"]["json"]
+        # Starting with the judges' prefix lets the chief reuse what the server already evaluated for them.
+        prefix = self.create_judge_prefix(exercise_requirement, student_code, language)
+        
+        if self.compactor:
+            judgments_str = compact_json(self.compactor.trim_judgments(individual_judgments))
+            weights_str = templates["weights"]["compact"]
+            # The judges have already read every line; past the budget the chief only
+            # needs the shape of the submission to place their evidence.
+            if not self.compactor.fits(prefix + judgments_str):
+                prefix = self.create_judge_prefix(exercise_requirement, self.compactor.outline(student_code, language), language,
+                                                  "outline only, the full submission exceeds the prompt budget")
+        
+        if structured:
+            format_instructions = f"""Provide your final evaluation as a JSON object in this EXACT format:
+
+        {{
+            "final_score": <weighted_score_between_0_and_10>,
+            "overall_assessment": "<comprehensive_overview>",
+            "weighted_breakdown": {{{templates['breakdown_fields']}}},
+            "key_strengths": ["<strength1>", "<strength2>"],
+            "critical_issues": ["<issue1>", "<issue2>"],
+            "actionable_improvements": ["<improvement1>", "<improvement2>"],
+            "learning_path": ["<learning_step1>", "<learning_step2>"],
+            "judge_consensus": "<high|medium|low> <explanation>"
+        }}
+"""
+        else:
+            format_instructions = f"""Provide your final evaluation in this EXACT format:
 
         **1. FINAL SCORE (0-10):** <weighted_score>
         **2. OVERALL ASSESSMENT:** <comprehensive_overview>
         **3. WEIGHTED BREAKDOWN:**
-        {''.join([f'**{criterion}:** <score> (weight: {info["weight"]})' + '\\n' for criterion, info in self.evaluation_rubric.items()])}
+        {templates['breakdown_lines']}
         **4. KEY STRENGTHS:** 
         - <strength1>
         - <strength2>
@@ -123,11 +386,303 @@ class LLMJudgeEvaluatorCore:
         - <learning_step1>
         - <learning_step2>
         **8. JUDGE CONSENSUS:** <high|medium|low> <explanation>
+"""
+        
+        chief_prompt = f"""
+        YOUR ROLE: you are the CHIEF JUDGE synthesizing evaluations from multiple specialized judges.
+
+        INDIVIDUAL JUDGE EVALUATIONS:
+        {judgments_str}
+
+        RUBRIC WEIGHTS:
+        {weights_str}
+
+        Your task is to:
+        1. Calculate weighted final score
+        2. Provide comprehensive overall assessment
+        3. Resolve any inconsistencies between judges
+        4. Generate actionable feedback
 
+        {format_instructions}
         Be precise and reference specific evidence from individual judgments.
         """
         
-        return system_prompt
+        return prefix + chief_prompt
+
+    def render_judge_prompts(self, exercise_requirement: str, student_code: str, language: str = "python", combined: bool = False, analysis: Dict[str, Any] = None, skip: List[str] = ()) -> List[Dict[str, Any]]:
+        # What the judges would be sent, without sending it; the chief's prompt needs their answers and is left out.
+        criteria = [criterion for criterion in self.evaluation_rubric if criterion not in skip]
+        if combined and criteria:
+            prompts = [("combined", self.model_name, self.create_combined_judge_prompt(exercise_requirement, student_code, language, analysis=analysis, criteria=criteria))]
+        else:
+            prompts = [(criterion, self.evaluation_rubric[criterion].get("model") or self.model_name,
+                        self.create_judge_prompt(exercise_requirement, student_code, criterion, language, analysis=analysis)) for criterion in criteria]
+        
+        return [{"judge": judge, "model": model, "prompt": prompt, "tokens": estimate_tokens(prompt),
+                 "fits": self.compactor.fits(prompt) if self.compactor else True} for judge, model, prompt in prompts]
+
+    def _as_float(self, value: Any, default: float) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    def score_range(self, criterion: str) -> Tuple[float, float]:
+        return self.evaluation_rubric.templates["score_ranges"][criterion]
+
+    def level_for_score(self, criterion: str, score: float) -> str:
+        levels = self.evaluation_rubric.templates["levels_by_floor"][criterion]
+        for level, low in levels:
+            if score >= low:
+                return level
+        return levels[-1][0]
+
+    def judgment_schema(self, criteria: List[str] = None, fields: List[str] = None) -> Dict[str, Any]:
+        criteria = criteria or list(self.evaluation_rubric.keys())
+        fields = fields or JUDGMENT_FIELDS
+        ranges = [self.score_range(criterion) for criterion in criteria]
+        levels = []
+        for criterion in criteria:
+            levels.extend(level for level in self.evaluation_rubric[criterion]["levels"] if level not in levels)
+        
+        properties = {
+            "criterion": {"type": "string", "enum": criteria},
+            "score": {"type": "number", "minimum": min(low for low, _ in ranges), "maximum": max(high for _, high in ranges)},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+            "level": {"type": "string", "enum": levels},
+            "reasoning": {"type": "string"},
+            "specific_evidence": {"type": "array", "items": {"type": "string"}}
+        }
+        
+        return {
+            "type": "object",
+            "properties": {field: properties[field] for field in fields},
+            "required": list(fields)
+        }
+
+    def combined_judgment_schema(self, criteria: List[str] = None) -> Dict[str, Any]:
+        criteria = criteria or list(self.evaluation_rubric.keys())
+        return {
+            "type": "array",
+            "items": self.judgment_schema(criteria),
+            "minItems": len(criteria),
+            "maxItems": len(criteria)
+        }
+
+    def chief_judge_schema(self) -> Dict[str, Any]:
+        list_field = {"type": "array", "items": {"type": "string"}}
+        return {
+            "type": "object",
+            "properties": {
+                "final_score": {"type": "number", "minimum": 0, "maximum": 10},
+                "overall_assessment": {"type": "string"},
+                "weighted_breakdown": {
+                    "type": "object",
+                    "properties": {criterion: {"type": "number", "minimum": 0, "maximum": 10} for criterion in self.evaluation_rubric},
+                    "required": list(self.evaluation_rubric.keys())
+                },
+                "key_strengths": list_field,
+                "critical_issues": list_field,
+                "actionable_improvements": list_field,
+                "learning_path": list_field,
+                "judge_consensus": {"type": "string"}
+            },
+            "required": ["final_score", "overall_assessment", "weighted_breakdown", "key_strengths",
+                         "critical_issues", "actionable_improvements", "learning_path", "judge_consensus"]
+        }
+
+    def validate_judgment(self, data: Dict[str, Any], criterion: str) -> Tuple[Judgment, List[str]]:
+        low, high = self.score_range(criterion)
+        levels = self.evaluation_rubric[criterion]["levels"]
+        invalid = []
+        
+        score = self._as_float(data.get("score"), None)
+        if score is None or not low <= score <= high:
+            invalid.append("score")
+            score = None
+        
+        confidence = self._as_float(data.get("confidence"), None)
+        if confidence is None or not 0 <= confidence <= 1:
+            invalid.append("confidence")
+            confidence = None
+        
+        # The level is fully determined by the score, so an unusable level never costs a re-ask.
+        level = str(data.get("level") or "").lower()
+        if level not in levels:
+            level = self.level_for_score(criterion, score) if score is not None else None
+            if level is None:
+                invalid.append("level")
+        
+        reasoning = data.get("reasoning")
+        if not isinstance(reasoning, str) or not reasoning.strip():
+            invalid.append("reasoning")
+            reasoning = None
+        
+        evidence = data.get("specific_evidence")
+        if not isinstance(evidence, list):
+            evidence = []
+        evidence = [str(item) for item in evidence if isinstance(item, (str, int, float)) and str(item).strip()]
+        
+        return Judgment(criterion, score, confidence, level, reasoning, evidence), invalid
+
+    def create_judgment_repair_prompt(self, original_prompt: str, judgment: Judgment, invalid_fields: List[str]) -> str:
+        partial = {field: value for field, value in judgment.to_dict().items() if value is not None and field not in invalid_fields}
+        
+        return f"""{original_prompt}
+
+        Your previous judgment for {judgment.criterion} was incomplete:
+        {json.dumps(partial, indent=2)}
+
+        The following fields were missing or invalid: {', '.join(invalid_fields)}.
+        Respond with a JSON object containing ONLY these fields, consistent with the judgment above.
+        """
+
+    def parse_final_evaluation_json(self, response_text: str) -> Dict[str, Any]:
+        try:
+            data = json.loads(response_text)
+        except json.JSONDecodeError:
+            json_match = JSON_OBJECT_PATTERN.search(response_text)
+            try:
+                data = json.loads(json_match.group()) if json_match else None
+            except json.JSONDecodeError:
+                data = None
+        
+        if not isinstance(data, dict):
+            return self.parse_final_evaluation(response_text)
+        
+        evaluation = {
+            "final_score": min(10.0, max(0.0, self._as_float(data.get("final_score"), 0))),
+            "overall_assessment": str(data.get("overall_assessment") or "").strip(),
+            "weighted_breakdown": {},
+            "key_strengths": [],
+            "critical_issues": [],
+            "actionable_improvements": [],
+            "learning_path": [],
+            "judge_consensus": str(data.get("judge_consensus") or "").strip(),
+            "raw_response": response_text
+        }
+        
+        breakdown = data.get("weighted_breakdown")
+        if isinstance(breakdown, dict):
+            for criterion in self.evaluation_rubric.keys():
+                score = self._as_float(breakdown.get(criterion), None)
+                if score is not None:
+                    evaluation["weighted_breakdown"][criterion] = score
+        
+        for key in ["key_strengths", "critical_issues", "actionable_improvements", "learning_path"]:
+            items = data.get(key)
+            if isinstance(items, list):
+                evaluation[key] = [str(item).strip() for item in items if str(item).strip()][:6]
+        
+        return evaluation
+
+    def aggregate_judgments(self, individual_judgments: List[Dict]) -> Dict[str, Any]:
+        scores = {}
+        confidences = {}
+        certain = []
+        
+        for judgment in individual_judgments:
+            criterion = str(judgment.get("criterion", "")).lower()
+            if criterion in self.evaluation_rubric and criterion not in scores:
+                scores[criterion] = min(10.0, max(0.0, self._as_float(judgment.get("score"), 0.0)))
+                confidences[criterion] = min(1.0, max(0.0, self._as_float(judgment.get("confidence"), 0.5)))
+                if any(judgment.get(marker) for marker in CERTAIN_MARKERS):
+                    certain.append(criterion)
+        
+        aggregation = {
+            "final_score": 0.0,
+            "weighted_breakdown": scores,
+            "consensus_level": "none",
+            "score_spread": 0.0,
+            "min_confidence": 0.0,
+            "needs_chief_judge": False,
+            "chief_judge_reasons": [],
+            "certain_criteria": certain
+        }
+        
+        if not scores:
+            aggregation["judge_consensus"] = "none (no valid judgments)"
+            return aggregation
+        
+        # Weights are renormalised over the criteria that were actually judged,
+        # so a failed judge does not silently drag the final score towards zero.
+        total_weight = sum(self.evaluation_rubric[criterion]["weight"] for criterion in scores)
+        weighted_score = sum(score * self.evaluation_rubric[criterion]["weight"] for criterion, score in scores.items()) / total_weight
+        
+        # A certain score of zero next to a model's 8 is not a disagreement for the chief to settle.
+        judged = [criterion for criterion in scores if criterion not in certain]
+        spread = max(scores[criterion] for criterion in judged) - min(scores[criterion] for criterion in judged) if judged else 0.0
+        min_confidence = min(confidences[criterion] for criterion in judged) if judged else 1.0
+        
+        if spread <= self.disagreement_threshold / 2:
+            consensus_level = "high"
+        elif spread <= self.disagreement_threshold:
+            consensus_level = "medium"
+        else:
+            consensus_level = "low"
+        
+        reasons = []
+        if spread > self.disagreement_threshold:
+            reasons.append(f"score spread {spread:.1f} exceeds {self.disagreement_threshold:.1f}")
+        if min_confidence < self.min_confidence:
+            reasons.append(f"judge confidence {min_confidence:.2f} below {self.min_confidence:.2f}")
+        
+        aggregation.update({
+            "final_score": round(weighted_score, 2),
+            "consensus_level": consensus_level,
+            "score_spread": round(spread, 2),
+            "min_confidence": round(min_confidence, 2),
+            "needs_chief_judge": bool(reasons),
+            "chief_judge_reasons": reasons,
+            "judge_consensus": f"{consensus_level} (score spread {spread:.1f}, lowest confidence {min_confidence:.2f})"
+        })
+        
+        return aggregation
+
+    def merge_chunk_judgments(self, criterion: str, chunk_judgments: List[Dict], chunk_names: List[str], chunk_weights: List[float]) -> Dict[str, Any]:
+        valid = [(judgment, name, weight) for judgment, name, weight in zip(chunk_judgments, chunk_names, chunk_weights) if "error" not in judgment]
+        if not valid:
+            return chunk_judgments[0] if chunk_judgments else {"error": "No chunk judgments"}
+        
+        low, high = self.score_range(criterion)
+        scores = [min(high, max(low, self._as_float(judgment.get("score"), low))) for judgment, _, _ in valid]
+        confidences = [min(1.0, max(0.0, self._as_float(judgment.get("confidence"), 0.5))) for judgment, _, _ in valid]
+        total_weight = sum(weight for _, _, weight in valid) or 1.0
+        
+        if self.evaluation_rubric[criterion].get("chunk_merge") == "min":
+            worst = scores.index(min(scores))
+            score, confidence = scores[worst], confidences[worst]
+        else:
+            score = sum(score * weight for score, (_, _, weight) in zip(scores, valid)) / total_weight
+            confidence = sum(confidence * weight for confidence, (_, _, weight) in zip(confidences, valid)) / total_weight
+        
+        evidence = []
+        for judgment, _, _ in valid:
+            items = judgment.get("specific_evidence")
+            evidence.extend(items[:2] if isinstance(items, list) else [])
+        
+        return {
+            "criterion": criterion,
+            "score": round(score, 2),
+            "confidence": round(confidence, 2),
+            "level": self.level_for_score(criterion, score),
+            "reasoning": " ".join(f"[{name}] {judgment.get('reasoning', '')}".strip() for judgment, name, _ in valid),
+            "specific_evidence": evidence,
+            "chunks": len(valid)
+        }
+
+    def create_local_evaluation(self, aggregation: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "final_score": aggregation["final_score"],
+            "overall_assessment": "",
+            "weighted_breakdown": dict(aggregation["weighted_breakdown"]),
+            "key_strengths": [],
+            "critical_issues": [],
+            "actionable_improvements": [],
+            "learning_path": [],
+            "judge_consensus": aggregation["judge_consensus"],
+            "raw_response": ""
+        }
 
     def parse_final_evaluation(self, response_text: str) -> Dict[str, Any]:
         evaluation = {
@@ -143,33 +698,24 @@ class LLMJudgeEvaluatorCore:
         }
         
         try:
-            score_match = re.search(r'\*\*1\.\s*FINAL SCORE\s*\(0-10\):\*\*\s*(\d+(?:\.\d+)?)', response_text)
+            score_match = FINAL_SCORE_PATTERN.search(response_text)
             if score_match:
                 evaluation["final_score"] = float(score_match.group(1))
             
-            overview_match = re.search(r'\*\*2\.\s*OVERALL ASSESSMENT:\*\*\s*(.*?)(?=\*\*3\.|$)', response_text, re.DOTALL)
+            overview_match = OVERVIEW_PATTERN.search(response_text)
             if overview_match:
                 evaluation["overall_assessment"] = overview_match.group(1).strip()
             
-            breakdown_section = re.search(r'\*\*3\.\s*WEIGHTED BREAKDOWN:\*\*(.*?)(?=\*\*4\.|$)', response_text, re.DOTALL)
+            breakdown_section = BREAKDOWN_PATTERN.search(response_text)
             if breakdown_section:
                 breakdown_text = breakdown_section.group(1)
-                for criterion in self.evaluation_rubric.keys():
-                    pattern = fr'\*\*{criterion}:\*\*\s*(\d+(?:\.\d+)?)'
-                    match = re.search(pattern, breakdown_text, re.IGNORECASE)
+                for criterion, pattern in self.evaluation_rubric.templates["breakdown_patterns"].items():
+                    match = pattern.search(breakdown_text)
                     if match:
                         evaluation["weighted_breakdown"][criterion] = float(match.group(1))
             
-            sections = {
-                "key_strengths": (r'\*\*4\.\s*KEY STRENGTHS:\*\*(.*?)(?=\*\*5\.|$)', True),
-                "critical_issues": (r'\*\*5\.\s*CRITICAL ISSUES:\*\*(.*?)(?=\*\*6\.|$)', True),
-                "actionable_improvements": (r'\*\*6\.\s*ACTIONABLE IMPROVEMENTS:\*\*(.*?)(?=\*\*7\.|$)', True),
-                "learning_path": (r'\*\*7\.\s*LEARNING PATH:\*\*(.*?)(?=\*\*8\.|$)', True),
-                "judge_consensus": (r'\*\*8\.\s*JUDGE CONSENSUS:\*\*(.*?)(?=$)', False)
-            }
-            
-            for key, (pattern, is_list) in sections.items():
-                match = re.search(pattern, response_text, re.IGNORECASE | re.DOTALL)
+            for key, (pattern, is_list) in SECTION_PATTERNS.items():
+                match = pattern.search(response_text)
                 if match:
                     content = match.group(1).strip()
                     if is_list:
@@ -189,8 +735,8 @@ class LLMJudgeEvaluatorCore:
         
         for line in lines:
             line = line.strip()
-            if line.startswith('-') or re.match(r'^\s*[•*]\s*', line):
-                item = re.sub(r'^[-\s•*]+\s*', '', line).strip()
+            if line.startswith('-') or LIST_BULLET_PATTERN.match(line):
+                item = LIST_MARKER_PATTERN.sub('', line).strip()
                 if item and len(item) > 3:
                     items.append(item)
             elif line and not line.startswith('**') and len(line) > 10:
@@ -0,0 +1,182 @@
+import ast
+import builtins
+import hashlib
+import keyword
+import re
+from typing import Dict, List, Any, Tuple
+from .llm_judge_compaction import strip_comments
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z_]\w*|\d+(?:\.\d+)?|\S")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_]\w*")
+BUILTIN_NAMES = set(dir(builtins))
+# Keywords of the C family, Java, JavaScript, Go and Rust; everything else that
+# looks like an identifier is renamed in the token fallback.
+OTHER_KEYWORDS = set("""
+abstract as async await bool boolean break byte case catch char class const continue def default defer delete do double
+else enum export extends false final finally float fn for func function go goto if impl implements import in instanceof
+int interface let long loop map match mod mut namespace new nil null package private protected pub public range return
+self short signed sizeof static string struct super switch this throw throws trait true try type typeof uint union unsigned
+use using var void volatile where while yield include define std cout cin endl printf scanf main System out println String
+""".split())
+
+class _IdentifierCanonicalizer(ast.NodeTransformer):
+    def __init__(self):
+        self.names = {}
+        self.imported = set()
+
+    def _rename(self, name: str) -> str:
+        if name in BUILTIN_NAMES or name in self.imported:
+            return name
+        if name not in self.names:
+            self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+    def _drop_docstring(self, node):
+        if node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant) and isinstance(node.body[0].value.value, str):
+            node.body = node.body[1:] or [ast.Pass()]
+
+    def visit_Module(self, node):
+        self._drop_docstring(node)
+        return self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imported.add((alias.asname or alias.name).split(".")[0])
+        return node
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            self.imported.add(alias.asname or alias.name)
+        return node
+
+    def _visit_definition(self, node):
+        node.name = self._rename(node.name)
+        self._drop_docstring(node)
+        return self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_definition
+
+    def visit_Name(self, node):
+        node.id = self._rename(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._rename(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_Global(self, node):
+        node.names = [self._rename(name) for name in node.names]
+        return node
+
+    visit_Nonlocal = visit_Global
+
+def canonical_tokens(code: str, language: str = "python") -> List[str]:
+    language = language.lower()
+    if language in {"python", "py"}:
+        try:
+            tree = _IdentifierCanonicalizer().visit(ast.parse(code))
+            # unparse also normalises formatting, quoting and redundant parentheses.
+            return TOKEN_PATTERN.findall(ast.unparse(tree))
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    
+    names = {}
+    tokens = []
+    for token in TOKEN_PATTERN.findall(strip_comments(code, language)):
+        if IDENTIFIER_PATTERN.fullmatch(token) and token not in OTHER_KEYWORDS and not keyword.iskeyword(token):
+            token = names.setdefault(token, f"v{len(names)}")
+        tokens.append(token)
+    return tokens
+
+class SubmissionDeduplicator:
+    def __init__(self, threshold: float = 0.95, num_perm: int = 128, bands: int = 32, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+    def _hash(self, text: str) -> int:
+        return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def fingerprint(self, code: str, language: str = "python") -> Dict[str, Any]:
+        tokens = canonical_tokens(code, language)
+        size = self.shingle_size
+        shingles = {self._hash(" ".join(tokens[index:index + size])) for index in range(max(1, len(tokens) - size + 1))}
+        return {"canonical": self._hash(" ".join(tokens)), "shingles": shingles, "signature": self.signature(shingles)}
+
+    def signature(self, shingles) -> Tuple[int, ...]:
+        # One-permutation MinHash: each shingle hash lands in one bin and every bin
+        # keeps its minimum, so the cost is one pass instead of num_perm passes.
+        bins = [None] * self.num_perm
+        for value in shingles:
+            index, rest = value % self.num_perm, value // self.num_perm
+            if bins[index] is None or rest < bins[index]:
+                bins[index] = rest
+        
+        # Empty bins borrow from the next filled one, offset by the distance so two
+        # borrowed bins only match when the same shingles produced them.
+        filled = [index for index, value in enumerate(bins) if value is not None]
+        if not filled:
+            return tuple(bins)
+        signature = []
+        for index, value in enumerate(bins):
+            if value is None:
+                source = next((candidate for candidate in filled if candidate > index), filled[0])
+                distance = (source - index) % self.num_perm
+                value = bins[source] + distance * (1 << 60)
+            signature.append(value)
+        return tuple(signature)
+
+    def similarity(self, first: Dict[str, Any], second: Dict[str, Any]) -> float:
+        if first["canonical"] == second["canonical"]:
+            return 1.0
+        union = len(first["shingles"] | second["shingles"])
+        return len(first["shingles"] & second["shingles"]) / union if union else 1.0
+
+    def cluster(self, submissions: Dict[str, str], language: str = "python") -> List[Dict[str, Any]]:
+        fingerprints = {submission_id: self.fingerprint(code, language) for submission_id, code in submissions.items()}
+        
+        buckets = {}
+        for submission_id, fingerprint in fingerprints.items():
+            signature = fingerprint["signature"]
+            for band in range(self.bands):
+                key = (band, signature[band * self.rows:(band + 1) * self.rows])
+                buckets.setdefault(key, []).append(submission_id)
+        
+        candidates = {submission_id: set() for submission_id in fingerprints}
+        for members in buckets.values():
+            if len(members) > 1:
+                for submission_id in members:
+                    candidates[submission_id].update(members)
+        
+        # Leader clustering rather than connected components: every member is
+        # checked against the representative whose judgment it will reuse, so
+        # similarity never drifts along a chain of near-duplicates.
+        clusters = []
+        assigned = set()
+        for submission_id in submissions:
+            if submission_id in assigned:
+                continue
+            assigned.add(submission_id)
+            members = []
+            for candidate in sorted(candidates[submission_id] - assigned):
+                similarity = self.similarity(fingerprints[submission_id], fingerprints[candidate])
+                if similarity >= self.threshold:
+                    members.append((candidate, round(similarity, 4)))
+                    assigned.add(candidate)
+            clusters.append({"representative": submission_id, "members": members})
+        
+        return clusters
+
+def add_dedup_arguments(parser):
+    parser.add_argument("--dedup", action="store_true", help="Evaluate one submission per cluster of near-duplicates and reuse its judgment")
+    parser.add_argument("--dedup-threshold", type=float, default=0.95, help="Minimum similarity to reuse a judgment (default: 0.95, 1.0 for exact duplicates only)")
+
+def build_deduplicator(args) -> SubmissionDeduplicator:
+    if not args.dedup:
+        return None
+    return SubmissionDeduplicator(threshold=args.dedup_threshold)
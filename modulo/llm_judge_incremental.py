@@ -0,0 +1,143 @@
+import ast
+import difflib
+import re
+from typing import Dict, List, Any, Optional
+from .llm_judge_compaction import code_units, strip_comments
+
+PYTHON_LANGUAGES = {"python", "py"}
+# Lines that iterate or pick a data structure are the ones that move the efficiency judgment.
+LOOP_PATTERN = re.compile(r"\b(for|while|sorted|sort|range|insert|pop|index|count|copy|deepcopy|set|dict|list|deque|heapq|bisect|append|join|cache|lru_cache)\b")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_]\w*")
+DEFAULT_TRIGGERS = ["code", "comments"]
+
+def _normalize(code: str) -> str:
+    return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+
+def _python_skeleton(code: str) -> Optional[str]:
+    # The AST without docstrings: equal skeletons mean only comments, docstrings or layout changed.
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and body:
+            if isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str):
+                node.body = body[1:]
+    return ast.dump(tree)
+
+def _comment_lines(code: str, language: str) -> List[str]:
+    kept = set(strip_comments(code, language).splitlines())
+    return [line.strip() for line in _normalize(code).splitlines() if line not in kept]
+
+def _named_units(code: str, language: str) -> Dict[str, str]:
+    lines = code.splitlines()
+    units = {}
+    for name, start, end in code_units(code, language):
+        # Module code between definitions can occur several times.
+        key, number = name, 2
+        while key in units:
+            key, number = f"{name} #{number}", number + 1
+        units[key] = _normalize("\n".join(lines[start - 1:end]))
+    return units
+
+def _unified(old: str, new: str, old_name: str, new_name: str, context: int = 3) -> List[str]:
+    return list(difflib.unified_diff(old.splitlines(), new.splitlines(), old_name, new_name, n=context, lineterm=""))
+
+def _changed_line_count(unified: List[str]) -> int:
+    # A replaced line is one removal plus one addition; each run of changes counts its longer side once.
+    count = added = removed = 0
+    for line in unified + [""]:
+        if line[:1] == "-" and not line.startswith("---"):
+            removed += 1
+        elif line[:1] == "+" and not line.startswith("+++"):
+            added += 1
+        else:
+            count += max(added, removed)
+            added = removed = 0
+    return count
+
+def code_diff(old_code: str, new_code: str, language: str = "python", context: int = 3) -> Dict[str, Any]:
+    language = language.lower()
+    old_normalized, new_normalized = _normalize(old_code), _normalize(new_code)
+    diff = {"level": "line", "added": [], "removed": [], "modified": [], "changed_lines": 0,
+            "total_lines": max(len(old_normalized.splitlines()), len(new_normalized.splitlines())), "change_ratio": 0.0,
+            "unchanged": old_normalized == new_normalized, "code_changed": False, "comments_changed": False,
+            "names_changed": False, "loops_changed": False, "unified": ""}
+    if diff["unchanged"]:
+        return diff
+    
+    old_skeleton = _python_skeleton(old_code) if language in PYTHON_LANGUAGES else None
+    new_skeleton = _python_skeleton(new_code) if language in PYTHON_LANGUAGES else None
+    
+    if old_skeleton is not None and new_skeleton is not None:
+        # Function level: each top-level function or class is compared as a whole and diffed on its own.
+        diff["level"] = "function"
+        diff["code_changed"] = old_skeleton != new_skeleton
+        old_units, new_units = _named_units(old_code, language), _named_units(new_code, language)
+        diff["added"] = [name for name in new_units if name not in old_units]
+        diff["removed"] = [name for name in old_units if name not in new_units]
+        diff["modified"] = [name for name in new_units if name in old_units and new_units[name] != old_units[name]]
+        unified = []
+        for name in diff["removed"]:
+            unified += _unified(old_units[name], "", f"{name} (previous)", "(removed)", context)
+        for name in diff["modified"] + diff["added"]:
+            unified += _unified(old_units.get(name, ""), new_units[name], f"{name} (previous)", f"{name} (revised)", context)
+    else:
+        diff["code_changed"] = strip_comments(old_code, language) != strip_comments(new_code, language)
+        unified = _unified(old_normalized, new_normalized, "previous", "revised", context)
+    
+    changed = [line[1:] for line in unified if line[:1] in "+-" and not line.startswith(("+++", "---"))]
+    diff["changed_lines"] = _changed_line_count(unified)
+    # Only code changes count towards the from-scratch threshold: edited comments leave the program as it was.
+    diff["change_ratio"] = round(min(1.0, diff["changed_lines"] / max(1, diff["total_lines"])), 3) if diff["code_changed"] else 0.0
+    diff["comments_changed"] = _comment_lines(old_code, language) != _comment_lines(new_code, language)
+    diff["names_changed"] = set(IDENTIFIER_PATTERN.findall(strip_comments(old_code, language))) != set(IDENTIFIER_PATTERN.findall(strip_comments(new_code, language)))
+    diff["loops_changed"] = diff["code_changed"] and any(LOOP_PATTERN.search(strip_comments(line, language)) for line in changed)
+    diff["unified"] = "\n".join(unified)
+    return diff
+
+def _triggered(diff: Dict[str, Any], trigger: str) -> bool:
+    if trigger == "code":
+        return diff["code_changed"]
+    if trigger == "structure":
+        return bool(diff["added"] or diff["removed"])
+    return bool(diff.get(f"{trigger}_changed"))
+
+def affected_criteria(diff: Dict[str, Any], evaluation_rubric: Dict[str, Any]) -> List[str]:
+    if diff["unchanged"]:
+        return []
+    return [criterion for criterion, info in evaluation_rubric.items()
+            if any(_triggered(diff, trigger) for trigger in info.get("revision_triggers", DEFAULT_TRIGGERS))]
+
+def previous_judgments(evaluation: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    # Static certainties and test-derived scores are recomputed on every run, so only model judgments carry over.
+    return {judgment["criterion"]: judgment for judgment in (evaluation or {}).get("individual_judgments", [])
+            if judgment.get("criterion") and not judgment.get("static") and not judgment.get("tests")}
+
+def describe_changes(diff: Dict[str, Any]) -> str:
+    if diff["unchanged"]:
+        return "no changes"
+    parts = [f"{diff['changed_lines']} changed lines of {diff['total_lines']}"]
+    for key in ["modified", "added", "removed"]:
+        if diff[key]:
+            parts.append(f"{key} {', '.join(diff[key])}")
+    if not diff["code_changed"]:
+        parts.append("comments or layout only")
+    return "; ".join(parts)
+
+def format_revision_summary(revision: Dict[str, Any]) -> str:
+    if not revision:
+        return ""
+    
+    summary = f"Revision of the evaluation from {revision.get('previous_evaluated_at') or 'an earlier run'}: {revision['changes']}."
+    if revision.get("rejudged"):
+        summary += f"\nRe-judged from the diff: {', '.join(revision['rejudged'])}"
+    if revision.get("carried_forward"):
+        summary += f"\nCarried forward unchanged: {', '.join(revision['carried_forward'])}"
+    return summary
+
+def add_incremental_arguments(parser):
+    parser.add_argument("--no-incremental", action="store_true", help="Evaluate resubmissions from scratch instead of re-judging only what their changes affect")
+    parser.add_argument("--incremental-max-change", type=float, default=0.3,
+                        help="Largest fraction of changed lines still judged from the diff (default: 0.3)")
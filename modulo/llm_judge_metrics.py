@@ -0,0 +1,211 @@
+import collections
+import contextvars
+import json
+import threading
+import time
+from typing import Dict, List, Any
+
+MODEL_DURATION_FIELDS = {
+    "load_seconds": "load_duration",
+    "prompt_eval_seconds": "prompt_eval_duration",
+    "eval_seconds": "eval_duration",
+    "total_seconds": "total_duration"
+}
+
+submission_call_records = contextvars.ContextVar("submission_call_records", default=None)
+
+def new_call_record(stage: str, model: str, criterion: str = None) -> Dict[str, Any]:
+    return {
+        "stage": stage,
+        "criterion": criterion,
+        "model": model,
+        "started_at": time.time(),
+        "wall_seconds": 0.0,
+        "load_seconds": None,
+        "prompt_eval_seconds": None,
+        "eval_seconds": None,
+        "total_seconds": None,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "retries": 0,
+        "cached": False,
+        "early_stop": False,
+        "parse_path": None,
+        "error": None
+    }
+
+def apply_response_metrics(record: Dict[str, Any], response: Any):
+    def field(name):
+        if isinstance(response, dict):
+            return response.get(name)
+        return getattr(response, name, None)
+    
+    for key, source in MODEL_DURATION_FIELDS.items():
+        nanoseconds = field(source)
+        if nanoseconds is not None:
+            record[key] = nanoseconds / 1e9
+    
+    if field("prompt_eval_count") is not None:
+        record["prompt_tokens"] = field("prompt_eval_count")
+    if field("eval_count") is not None:
+        record["completion_tokens"] = field("eval_count")
+
+class MetricsCollector:
+    def __init__(self, latency_samples: int = 10000):
+        self.latency_samples = latency_samples
+        self._lock = threading.Lock()
+        self._series = {}
+        self._submissions = 0
+        self._submission_seconds = 0.0
+
+    def _series_for(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        key = (record["stage"], record.get("criterion") or "", record.get("model") or "")
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = {
+                "calls": 0,
+                "errors": 0,
+                "cached": 0,
+                "early_stops": 0,
+                "retries": 0,
+                "wall_seconds": 0.0,
+                "load_seconds": 0.0,
+                "prompt_eval_seconds": 0.0,
+                "eval_seconds": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "parse_paths": collections.Counter(),
+                "wall_samples": collections.deque(maxlen=self.latency_samples)
+            }
+        return series
+
+    def add(self, record: Dict[str, Any]):
+        with self._lock:
+            series = self._series_for(record)
+            series["calls"] += 1
+            series["errors"] += 1 if record.get("error") else 0
+            series["cached"] += 1 if record.get("cached") else 0
+            series["early_stops"] += 1 if record.get("early_stop") else 0
+            series["retries"] += record.get("retries") or 0
+            series["wall_seconds"] += record.get("wall_seconds") or 0.0
+            series["wall_samples"].append(record.get("wall_seconds") or 0.0)
+            for key in ["load_seconds", "prompt_eval_seconds", "eval_seconds"]:
+                series[key] += record.get(key) or 0.0
+            for key in ["prompt_tokens", "completion_tokens"]:
+                series[key] += record.get(key) or 0
+            if record.get("parse_path"):
+                series["parse_paths"][record["parse_path"]] += 1
+
+    def add_submission(self, wall_seconds: float):
+        with self._lock:
+            self._submissions += 1
+            self._submission_seconds += wall_seconds
+
+    def _percentile(self, samples, fraction: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = []
+            for (stage, criterion, model), series in sorted(self._series.items()):
+                stages.append({
+                    "stage": stage,
+                    "criterion": criterion or None,
+                    "model": model or None,
+                    "calls": series["calls"],
+                    "errors": series["errors"],
+                    "cached": series["cached"],
+                    "early_stops": series["early_stops"],
+                    "retries": series["retries"],
+                    "wall_seconds": {
+                        "total": round(series["wall_seconds"], 3),
+                        "mean": round(series["wall_seconds"] / series["calls"], 3),
+                        "p50": round(self._percentile(series["wall_samples"], 0.50), 3),
+                        "p95": round(self._percentile(series["wall_samples"], 0.95), 3)
+                    },
+                    "model_seconds": {
+                        "load": round(series["load_seconds"], 3),
+                        "prompt_eval": round(series["prompt_eval_seconds"], 3),
+                        "eval": round(series["eval_seconds"], 3)
+                    },
+                    "tokens": {"prompt": series["prompt_tokens"], "completion": series["completion_tokens"]},
+                    "parse_paths": dict(series["parse_paths"])
+                })
+            
+            return {
+                "submissions": self._submissions,
+                "submission_seconds": round(self._submission_seconds, 3),
+                "stages": stages
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def _escape_label(self, value: Any) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def to_prometheus(self) -> str:
+        summary = self.summary()
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str, samples: List):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{self._escape_label(label)}"' for key, label in labels.items() if label is not None)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        
+        def labels(stage: Dict[str, Any], **extra) -> Dict[str, Any]:
+            return dict({"stage": stage["stage"], "criterion": stage["criterion"], "model": stage["model"]}, **extra)
+        
+        stages = summary["stages"]
+        metric("llm_judge_submissions_total", "counter", "Submissions evaluated.", [({}, summary["submissions"])])
+        metric("llm_judge_submission_seconds_total", "counter", "Wall time spent evaluating submissions.", [({}, summary["submission_seconds"])])
+        metric("llm_judge_calls_total", "counter", "LLM calls by stage.", [(labels(stage), stage["calls"]) for stage in stages])
+        metric("llm_judge_call_errors_total", "counter", "LLM calls that failed after retries.", [(labels(stage), stage["errors"]) for stage in stages])
+        metric("llm_judge_cache_hits_total", "counter", "LLM calls answered from the judgment cache.", [(labels(stage), stage["cached"]) for stage in stages])
+        metric("llm_judge_early_stops_total", "counter", "Streamed calls cut off once the JSON was complete.", [(labels(stage), stage["early_stops"]) for stage in stages])
+        metric("llm_judge_retries_total", "counter", "Retried LLM requests.", [(labels(stage), stage["retries"]) for stage in stages])
+        metric("llm_judge_call_wall_seconds_total", "counter", "Wall time spent in LLM calls.", [(labels(stage), stage["wall_seconds"]["total"]) for stage in stages])
+        metric("llm_judge_call_wall_seconds_p95", "gauge", "95th percentile LLM call wall time.", [(labels(stage), stage["wall_seconds"]["p95"]) for stage in stages])
+        metric("llm_judge_model_seconds_total", "counter", "Model-reported time by phase.",
+               [(labels(stage, phase=phase), seconds) for stage in stages for phase, seconds in stage["model_seconds"].items()])
+        metric("llm_judge_tokens_total", "counter", "Prompt and completion tokens.",
+               [(labels(stage, direction=direction), count) for stage in stages for direction, count in stage["tokens"].items()])
+        metric("llm_judge_parse_path_total", "counter", "Parse path that produced each result.",
+               [(labels(stage, path=path), count) for stage in stages for path, count in stage["parse_paths"].items()])
+        
+        return "\n".join(lines) + "\n"
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-json", default=None, help="Write a JSON summary of per-stage timings and token usage to this file")
+    parser.add_argument("--metrics-prom", default=None, help="Write per-stage metrics in Prometheus text format to this file")
+
+def print_metrics_summary(collector: MetricsCollector):
+    summary = collector.summary()
+    if not summary["stages"]:
+        return
+    
+    print(" Stage timings:")
+    for stage in summary["stages"]:
+        name = f"{stage['stage']}:{stage['criterion']}" if stage["criterion"] else stage["stage"]
+        wall = stage["wall_seconds"]
+        tokens = stage["tokens"]
+        # Ollama counts only the prompt tokens it had to evaluate, so prefix reuse shows up as a lower mean here.
+        evaluated = stage["calls"] - stage["cached"]
+        prompt_mean = tokens["prompt"] // evaluated if evaluated else 0
+        print(f"   {name:<28} {stage['calls']:>4} calls  mean {wall['mean']:.2f}s  p95 {wall['p95']:.2f}s  "
+              f"tokens {tokens['prompt']}/{tokens['completion']} ({prompt_mean} prompt/call)  retries {stage['retries']}")
+
+def write_metrics(collector: MetricsCollector, args):
+    if args.metrics_json:
+        with open(args.metrics_json, 'w', encoding='utf-8') as f:
+            f.write(collector.to_json())
+        print(f" Metrics summary saved to: {args.metrics_json}")
+    if args.metrics_prom:
+        with open(args.metrics_prom, 'w', encoding='utf-8') as f:
+            f.write(collector.to_prometheus())
+        print(f" Prometheus metrics saved to: {args.metrics_prom}")
@@ -1,12 +1,23 @@
 import datetime
+import io
 from typing import Dict, List, Any
 from .llm_judge_core import LLMJudgeEvaluatorCore
+from .llm_judge_static import format_static_summary
+from .llm_judge_sandbox import format_test_summary
+from .llm_judge_incremental import format_revision_summary
+from .llm_judge_sampling import format_sample_summary
+from .llm_judge_store import ResultStore
 
 class LLMJudgeEvaluatorOutput:
     def __init__(self, evaluator_core: LLMJudgeEvaluatorCore = None):
         self.evaluator_core = evaluator_core if evaluator_core else LLMJudgeEvaluatorCore()
 
-    def display_evaluation_result(self, evaluation: Dict[str, Any]):
+    def display_evaluation_result(self, evaluation: Dict[str, Any], sections: List[str] = None):
+        if sections is not None:
+            for key in sections:
+                self._display_section(evaluation, key)
+            return
+        
         print("\n" + "=" * 80)
         print(" LLM-AS-A-JUDGE EVALUATION RESULTS")
         print("=" * 80)
@@ -15,126 +26,177 @@ class LLMJudgeEvaluatorOutput:
             print(f"Error: {evaluation['error']}")
             return
         
-        score = evaluation.get("final_score", 0)
-        print(f" FINAL SCORE: {score:.1f}/10.0")
+        for key in ["final_score", "overall_assessment", "weighted_breakdown", "individual_judgments",
+                    "key_strengths", "critical_issues", "actionable_improvements", "learning_path", "judge_consensus"]:
+            self._display_section(evaluation, key)
+        
+        print("=" * 80)
+
+    def _display_section(self, evaluation: Dict[str, Any], key: str):
+        list_titles = {
+            "key_strengths": " KEY STRENGTHS",
+            "critical_issues": " CRITICAL ISSUES",
+            "actionable_improvements": " ACTIONABLE IMPROVEMENTS",
+            "learning_path": " LEARNING PATH"
+        }
+        
+        if key == "final_score":
+            score = evaluation.get("final_score", 0)
+            print(f" FINAL SCORE: {score:.1f}/10.0")
         
-        if evaluation.get("overall_assessment"):
+        elif key == "overall_assessment" and evaluation.get("overall_assessment"):
             print(f"\n OVERALL ASSESSMENT:")
             print(f"   {evaluation['overall_assessment']}")
         
-        if evaluation.get("weighted_breakdown"):
+        elif key == "weighted_breakdown" and evaluation.get("weighted_breakdown"):
             print(f"\n WEIGHTED BREAKDOWN:")
             for criterion, score in evaluation["weighted_breakdown"].items():
                 weight = self.evaluator_core.evaluation_rubric[criterion]["weight"] * 100
                 print(f"   {criterion.title():<15}: {score:<4.1f} (weight: {weight}%)")
         
-        if evaluation.get("individual_judgments"):
+        elif key == "individual_judgments" and evaluation.get("individual_judgments"):
             print(f"\n  INDIVIDUAL JUDGE SCORES:")
             for judgment in evaluation["individual_judgments"]:
                 criterion = judgment.get("criterion", "unknown")
                 score = judgment.get("score", 0)
                 confidence = judgment.get("confidence", 0)
                 level = judgment.get("level", "unknown")
-                print(f"   {criterion.title():<15}: {score:<4.1f} ({level}, confidence: {confidence:.2f})")
+                print(f"   {criterion.title():<15}: {score:<4.1f} ({level}, confidence: {confidence:.2f}{format_sample_summary(judgment)})")
         
-        sections = [
-            (" KEY STRENGTHS", "key_strengths"),
-            (" CRITICAL ISSUES", "critical_issues"), 
-            (" ACTIONABLE IMPROVEMENTS", "actionable_improvements"),
-            (" LEARNING PATH", "learning_path")
-        ]
+        elif key in list_titles and evaluation.get(key):
+            print(f"\n{list_titles[key]}:")
+            for i, item in enumerate(evaluation[key], 1):
+                print(f"   {i}. {item}")
         
-        for title, key in sections:
-            if evaluation.get(key):
-                print(f"\n{title}:")
-                for i, item in enumerate(evaluation[key], 1):
-                    print(f"   {i}. {item}")
-        
-        if evaluation.get("judge_consensus"):
+        elif key == "judge_consensus" and evaluation.get("judge_consensus"):
             print(f"\n🤝 JUDGE CONSENSUS:")
             print(f"   {evaluation['judge_consensus']}")
+
+    def display_rendered_prompts(self, prompts: List[Dict[str, Any]], settled: List[str] = None):
+        for rendered in prompts:
+            note = "" if rendered["fits"] else f", over the {self.evaluator_core.compactor.token_budget}-token budget so it would be judged in chunks"
+            print("=" * 80)
+            print(f" {rendered['judge'].upper()} JUDGE PROMPT ({rendered['model']}, ~{rendered['tokens']} tokens{note})")
+            print("=" * 80)
+            print(rendered["prompt"])
         
-        print("=" * 80)
+        if settled:
+            print(f" Settled by static analysis, no prompt sent: {', '.join(settled)}")
+        print(f" Dry run: {len(prompts)} prompts rendered, nothing sent to Ollama or saved")
 
-    def save_evaluation_to_file(self, exercise_requirement: str, student_code: str, evaluation: Dict[str, Any], language: str = "python", output_file: str = None):
-        try:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    def render_report(self, exercise_requirement: str, student_code: str, evaluation: Dict[str, Any], language: str = "python",
+                      model_name: str = None, evaluated_at: str = None) -> str:
+        evaluated_at = datetime.datetime.fromisoformat(evaluated_at) if evaluated_at else datetime.datetime.now()
+        
+        with io.StringIO() as f:
+            f.write("LLM-AS-A-JUDGE EVALUATION REPORT\n")
+            f.write("=" * 60 + "\n\n")
             
-            if not output_file:
-                output_file = f"llm_judge_evaluation_{timestamp}.txt"
+            f.write(f"Evaluation Date: {evaluated_at.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Programming Language: {language}\n")
+            f.write(f"Model Used: {model_name or self.evaluator_core.model_name}\n")
+            f.write(f"Final Score: {evaluation.get('final_score', 0):.1f}/10.0\n\n")
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("LLM-AS-A-JUDGE EVALUATION REPORT\n")
-                f.write("=" * 60 + "\n\n")
-                
-                f.write(f"Evaluation Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Programming Language: {language}\n")
-                f.write(f"Model Used: {self.evaluator_core.model_name}\n")
-                f.write(f"Final Score: {evaluation.get('final_score', 0):.1f}/10.0\n\n")
-                
-                f.write("EXERCISE REQUIREMENT:\n")
+            f.write("EXERCISE REQUIREMENT:\n")
+            f.write("-" * 40 + "\n")
+            f.write(f"{exercise_requirement}\n\n")
+            
+            f.write("STUDENT CODE:\n")
+            f.write("-" * 40 + "\n")
+            f.write(f"```{language}\n{student_code}\n```\n\n")
+            
+            f.write("FINAL EVALUATION:\n")
+            f.write("-" * 40 + "\n")
+            f.write(f"Score: {evaluation.get('final_score', 0):.1f}/10.0\n\n")
+            
+            if evaluation.get('overall_assessment'):
+                f.write("Overall Assessment:\n")
+                f.write(f"{evaluation['overall_assessment']}\n\n")
+            
+            if evaluation.get("weighted_breakdown"):
+                f.write("WEIGHTED BREAKDOWN:\n")
                 f.write("-" * 40 + "\n")
-                f.write(f"{exercise_requirement}\n\n")
-                
-                f.write("STUDENT CODE:\n")
+                for criterion, score in evaluation["weighted_breakdown"].items():
+                    weight = self.evaluator_core.evaluation_rubric[criterion]["weight"] * 100
+                    f.write(f"{criterion.title():<15}: {score:<4.1f} (weight: {weight}%)\n")
+                f.write("\n")
+            
+            if evaluation.get("individual_judgments"):
+                f.write("INDIVIDUAL JUDGE SCORES:\n")
                 f.write("-" * 40 + "\n")
-                f.write(f"```{language}\n{student_code}\n```\n\n")
-                
-                f.write("FINAL EVALUATION:\n")
+                for judgment in evaluation["individual_judgments"]:
+                    criterion = judgment.get("criterion", "unknown")
+                    score = judgment.get("score", 0)
+                    confidence = judgment.get("confidence", 0)
+                    level = judgment.get("level", "unknown")
+                    f.write(f"{criterion.title():<15}: {score:<4.1f} ({level}, confidence: {confidence:.2f}{format_sample_summary(judgment)})\n")
+                f.write("\n")
+            
+            if format_static_summary(evaluation.get("static_analysis")):
+                f.write("STATIC ANALYSIS:\n")
                 f.write("-" * 40 + "\n")
-                f.write(f"Score: {evaluation.get('final_score', 0):.1f}/10.0\n\n")
-                
-                if evaluation.get('overall_assessment'):
-                    f.write("Overall Assessment:\n")
-                    f.write(f"{evaluation['overall_assessment']}\n\n")
-                
-                if evaluation.get("weighted_breakdown"):
-                    f.write("WEIGHTED BREAKDOWN:\n")
-                    f.write("-" * 40 + "\n")
-                    for criterion, score in evaluation["weighted_breakdown"].items():
-                        weight = self.evaluator_core.evaluation_rubric[criterion]["weight"] * 100
-                        f.write(f"{criterion.title():<15}: {score:<4.1f} (weight: {weight}%)\n")
-                    f.write("\n")
-                
-                if evaluation.get("individual_judgments"):
-                    f.write("INDIVIDUAL JUDGE SCORES:\n")
+                f.write(f"{format_static_summary(evaluation['static_analysis'])}\n\n")
+            
+            if evaluation.get("tests"):
+                f.write("TEST RESULTS:\n")
+                f.write("-" * 40 + "\n")
+                f.write(f"{format_test_summary(evaluation['tests'], max_failures=len(evaluation['tests']['cases']))}\n\n")
+            
+            if evaluation.get("revision"):
+                f.write("REVISION:\n")
+                f.write("-" * 40 + "\n")
+                f.write(f"{format_revision_summary(evaluation['revision'])}\n\n")
+            
+            sections = [
+                ("KEY STRENGTHS", "key_strengths"),
+                ("CRITICAL ISSUES", "critical_issues"),
+                ("ACTIONABLE IMPROVEMENTS", "actionable_improvements"), 
+                ("LEARNING PATH", "learning_path")
+            ]
+            
+            for title, key in sections:
+                if evaluation.get(key):
+                    f.write(f"{title.replace('_', ' ').upper()}:\n")
                     f.write("-" * 40 + "\n")
-                    for judgment in evaluation["individual_judgments"]:
-                        criterion = judgment.get("criterion", "unknown")
-                        score = judgment.get("score", 0)
-                        confidence = judgment.get("confidence", 0)
-                        level = judgment.get("level", "unknown")
-                        f.write(f"{criterion.title():<15}: {score:<4.1f} ({level}, confidence: {confidence:.2f})\n")
+                    if isinstance(evaluation[key], list):
+                        for i, item in enumerate(evaluation[key], 1):
+                            f.write(f"{i}. {item}\n")
+                    else:
+                        f.write(f"{evaluation[key]}\n")
                     f.write("\n")
-                
-                sections = [
-                    ("KEY STRENGTHS", "key_strengths"),
-                    ("CRITICAL ISSUES", "critical_issues"),
-                    ("ACTIONABLE IMPROVEMENTS", "actionable_improvements"), 
-                    ("LEARNING PATH", "learning_path")
-                ]
-                
-                for title, key in sections:
-                    if evaluation.get(key):
-                        f.write(f"{title.replace('_', ' ').upper()}:\n")
-                        f.write("-" * 40 + "\n")
-                        if isinstance(evaluation[key], list):
-                            for i, item in enumerate(evaluation[key], 1):
-                                f.write(f"{i}. {item}\n")
-                        else:
-                            f.write(f"{evaluation[key]}\n")
-                        f.write("\n")
-                
-                if evaluation.get("judge_consensus"):
-                    f.write("JUDGE CONSENSUS:\n")
-                    f.write("-" * 40 + "\n")
-                    f.write(f"{evaluation['judge_consensus']}\n\n")
-                
-                f.write("=" * 60 + "\n")
-                f.write("End of Evaluation Report\n")
+            
+            if evaluation.get("judge_consensus"):
+                f.write("JUDGE CONSENSUS:\n")
+                f.write("-" * 40 + "\n")
+                f.write(f"{evaluation['judge_consensus']}\n\n")
+            
+            f.write("=" * 60 + "\n")
+            f.write("End of Evaluation Report\n")
+            return f.getvalue()
+
+    def _write_report(self, report: str, output_file: str = None):
+        try:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            
+            if not output_file:
+                output_file = f"llm_judge_evaluation_{timestamp}.txt"
+            
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(report)
             
             print(f" Results saved to: {output_file}")
             return output_file
             
         except Exception as e:
             return None
+
+    def save_evaluation_to_file(self, exercise_requirement: str, student_code: str, evaluation: Dict[str, Any], language: str = "python", output_file: str = None):
+        return self._write_report(self.render_report(exercise_requirement, student_code, evaluation, language), output_file)
+
+    def save_stored_evaluation(self, store: ResultStore, evaluation_id: int, output_file: str = None):
+        stored = store.get(evaluation_id)
+        if not stored:
+            return None
+        report = self.render_report(stored["exercise"], stored["code"] or "", stored["evaluation"], stored["language"] or "python",
+                                    stored["model"], stored["evaluated_at"])
+        return self._write_report(report, output_file)
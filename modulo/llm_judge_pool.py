@@ -0,0 +1,184 @@
+import asyncio
+import collections
+import time
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
+
+# ollama (with httpx and pydantic) is most of the CLI's start-up time, so it is only imported once a client is needed.
+if TYPE_CHECKING:
+    from ollama import AsyncClient
+
+class OllamaHost:
+    def __init__(self, host: Optional[str] = None):
+        self.host = host
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.healthy = True
+        self._loop = None
+        self._client = None
+
+    @property
+    def name(self) -> str:
+        return self.host or "default"
+
+    def client(self) -> "AsyncClient":
+        # httpx connection pools are tied to the event loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            from ollama import AsyncClient
+            self._loop = loop
+            self._client = AsyncClient(host=self.host)
+        return self._client
+
+class OllamaClientPool:
+    def __init__(self, hosts: List[str] = None, hedge: bool = True, hedge_min_samples: int = 20, latency_window: int = 200,
+                 unhealthy_after: int = 3, health_check_interval: float = 10.0):
+        self.hosts = [OllamaHost(host) for host in (hosts or [None])]
+        self.hedge = hedge and len(self.hosts) > 1
+        self.hedge_min_samples = hedge_min_samples
+        self.unhealthy_after = unhealthy_after
+        self.health_check_interval = health_check_interval
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=latency_window))
+        self._last_health_check = 0.0
+        self._health_check_task = None
+
+    def _pick(self, exclude: List[OllamaHost] = ()) -> Optional[OllamaHost]:
+        self._maybe_check_health()
+        
+        candidates = [host for host in self.hosts if host not in exclude]
+        healthy = [host for host in candidates if host.healthy]
+        # With every host marked down, keep routing anyway: the request doubles as a probe.
+        candidates = healthy or candidates
+        if not candidates:
+            return None
+        return min(candidates, key=lambda host: (host.outstanding, host.requests))
+
+    def latency_p95(self, latency_key: str) -> Optional[float]:
+        samples = self._latencies[latency_key]
+        if len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _record_failure(self, host: OllamaHost, error: Exception):
+        import httpx
+        host.failures += 1
+        if isinstance(error, (ConnectionError, httpx.TransportError)):
+            host.consecutive_failures += 1
+            if host.consecutive_failures >= self.unhealthy_after and host.healthy:
+                host.healthy = False
+                print(f"    Ollama host {host.name} marked unhealthy ({error!r})")
+
+    def _record_success(self, host: OllamaHost):
+        host.consecutive_failures = 0
+        host.healthy = True
+
+    def _maybe_check_health(self):
+        now = time.monotonic()
+        if now - self._last_health_check < self.health_check_interval or all(host.healthy for host in self.hosts):
+            return
+        if self._health_check_task is not None and not self._health_check_task.done():
+            return
+        self._last_health_check = now
+        self._health_check_task = asyncio.get_running_loop().create_task(self.check_health())
+
+    async def check_health(self, timeout: float = 2.0) -> Dict[str, bool]:
+        async def probe(host: OllamaHost):
+            try:
+                await asyncio.wait_for(host.client().ps(), timeout)
+                self._record_success(host)
+            except Exception as e:
+                self._record_failure(host, e)
+        
+        await asyncio.gather(*[probe(host) for host in self.hosts if not host.healthy])
+        return {host.name: host.healthy for host in self.hosts}
+
+    async def _call(self, host: OllamaHost, latency_key: str, kwargs: Dict[str, Any]) -> Any:
+        host.outstanding += 1
+        host.requests += 1
+        started = time.monotonic()
+        try:
+            response = await host.client().chat(**kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_failure(host, e)
+            raise
+        finally:
+            host.outstanding -= 1
+        
+        self._record_success(host)
+        self._latencies[latency_key].append(time.monotonic() - started)
+        return response
+
+    async def _stream(self, host: OllamaHost, kwargs: Dict[str, Any]):
+        host.outstanding += 1
+        host.requests += 1
+        stream = None
+        try:
+            stream = await host.client().chat(stream=True, **kwargs)
+            async for chunk in stream:
+                yield chunk
+            self._record_success(host)
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._record_failure(host, e)
+            raise
+        finally:
+            host.outstanding -= 1
+            if stream is not None:
+                await stream.aclose()
+
+    async def chat(self, stream: bool = False, latency_key: str = "chat", **kwargs) -> Any:
+        primary = self._pick()
+        if stream:
+            return self._stream(primary, kwargs)
+        
+        primary_task = asyncio.ensure_future(self._call(primary, latency_key, kwargs))
+        hedge_after = self.latency_p95(latency_key) if self.hedge else None
+        pending = {primary_task}
+        
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                backup = None if done else self._pick(exclude=[primary])
+                if backup is not None:
+                    # The call is slower than 95% of its peers: race a duplicate on another host.
+                    self.hedged_requests += 1
+                    pending.add(asyncio.ensure_future(self._call(backup, latency_key, kwargs)))
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary_task:
+                            self.hedge_wins += 1
+                        return task.result()
+            
+            return primary_task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": {host.name: {"requests": host.requests, "failures": host.failures, "healthy": host.healthy} for host in self.hosts},
+            "hedged_requests": self.hedged_requests,
+            "hedge_wins": self.hedge_wins
+        }
+
+def add_pool_arguments(parser):
+    parser.add_argument("--host", action="append", dest="hosts", default=None,
+                        help="Ollama endpoint, repeat for several hosts (default: OLLAMA_HOST or localhost)")
+    parser.add_argument("--no-hedge", action="store_true", help="Never duplicate slow requests on a second host")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="LLM requests in flight at once (default: 4 per host)")
+
+def build_client_pool(args) -> OllamaClientPool:
+    pool = OllamaClientPool(args.hosts, hedge=not args.no_hedge)
+    if args.max_concurrency is None:
+        args.max_concurrency = 4 * len(pool.hosts)
+    return pool
@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+submission_deadline = contextvars.ContextVar("submission_deadline", default=None)
+
+class CircuitOpenError(Exception):
+    pass
+
+class DeadlineExceededError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open" and not self.probing:
+            # A single caller probes the backend; the others fail fast until its result closes or re-opens the circuit.
+            self.probing = True
+            return True
+        return state == "closed"
+
+    def release_probe(self):
+        # The probe ended without saying whether the backend is healthy, so the next caller probes instead.
+        self.probing = False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        # A failed half-open probe re-opens the circuit for another full reset period.
+        if self.consecutive_failures >= self.failure_threshold or self.state == "half-open":
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 3, request_timeout: float = 180.0, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 jitter: float = 0.5, submission_timeout: float = None, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.max_retries = max(1, max_retries)
+        self.request_timeout = request_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.submission_timeout = submission_timeout
+        self.circuit_breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def start_submission(self) -> contextvars.Token:
+        deadline = time.monotonic() + self.submission_timeout if self.submission_timeout else None
+        return submission_deadline.set(deadline)
+
+    def end_submission(self, token: contextvars.Token):
+        submission_deadline.reset(token)
+
+    def remaining_budget(self) -> Optional[float]:
+        deadline = submission_deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+            return False
+        # Imported here rather than at the top: by the time a call has failed the client has loaded it anyway.
+        import httpx
+        if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, httpx.TransportError)):
+            return True
+        status_code = getattr(error, "status_code", None)
+        return status_code in RETRYABLE_STATUS_CODES
+
+    def backoff_delay(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (1 - self.jitter * random.random())
+
+    def _timeout(self) -> Optional[float]:
+        remaining = self.remaining_budget()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError("Submission deadline exceeded")
+        if remaining is None:
+            return self.request_timeout
+        return remaining if self.request_timeout is None else min(self.request_timeout, remaining)
+
+    async def run(self, request: Callable[[Optional[float]], Awaitable[Any]], on_retry: Callable[[int, Exception], None] = None) -> Any:
+        # The request enforces the timeout it is handed itself, so time spent queueing
+        # for a concurrency slot is not charged against the per-request timeout.
+        for attempt in range(self.max_retries):
+            if not self.circuit_breaker.allow():
+                raise CircuitOpenError(f"Backend unavailable after {self.circuit_breaker.consecutive_failures} consecutive failures")
+            probe = self.circuit_breaker.probing
+            
+            try:
+                timeout = self._timeout()
+                result = await request(timeout)
+            except BaseException as e:
+                # Cancellations and non-retryable errors say nothing about the backend's health.
+                if not isinstance(e, Exception) or not self.is_retryable(e):
+                    if probe:
+                        self.circuit_breaker.release_probe()
+                    raise
+                
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_retries - 1:
+                    raise
+                
+                delay = self.backoff_delay(attempt)
+                remaining = self.remaining_budget()
+                if remaining is not None and remaining <= delay:
+                    raise DeadlineExceededError(f"Submission deadline exceeded after {attempt + 1} attempts: {e!r}") from e
+                
+                if on_retry:
+                    on_retry(attempt + 1, e)
+                await asyncio.sleep(delay)
+                continue
+            
+            self.circuit_breaker.record_success()
+            return result
+
+def add_retry_arguments(parser):
+    parser.add_argument("--max-retries", type=int, default=3, help="Attempts per LLM call for retryable errors (default: 3)")
+    parser.add_argument("--request-timeout", type=float, default=180.0, help="Seconds before a single LLM request is abandoned (default: 180)")
+    parser.add_argument("--submission-timeout", type=float, default=None, help="Overall time budget in seconds for one submission")
+
+def build_retry_policy(args) -> RetryPolicy:
+    return RetryPolicy(max_retries=args.max_retries, request_timeout=args.request_timeout, submission_timeout=args.submission_timeout)
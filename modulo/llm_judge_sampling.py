@@ -0,0 +1,78 @@
+import math
+import statistics
+from typing import Dict, List, Any, Tuple
+
+class SamplingPolicy:
+    def __init__(self, max_samples: int = 1, initial_samples: int = 2, tolerance: float = 1.0, min_confidence: float = 0.7, seed: int = 0):
+        self.max_samples = max(1, max_samples)
+        self.initial_samples = max(1, min(initial_samples, self.max_samples))
+        self.tolerance = tolerance
+        self.min_confidence = min_confidence
+        self.seed = seed
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_samples > 1
+
+    def next_round(self, drawn: int) -> int:
+        # Every round, the first included, draws initial_samples at once so their latencies overlap.
+        return min(self.initial_samples, self.max_samples - drawn)
+
+    def seed_for(self, index: int) -> int:
+        return self.seed + index
+
+    def settled(self, samples: List[Dict[str, Any]], evaluator_core) -> bool:
+        valid = valid_samples(samples, evaluator_core)
+        if not valid or statistics.fmean(confidence for _, _, confidence in valid) < self.min_confidence:
+            return False
+        if len(valid) == 1:
+            return True
+        # For two samples this compares their difference with the tolerance; with more it asks whether the
+        # median is pinned down, so one outlier among otherwise agreeing samples does not force the cap.
+        scores = [score for _, score, _ in valid]
+        return math.sqrt(statistics.variance(scores) / len(scores)) <= self.tolerance / 2
+
+def valid_samples(samples: List[Dict[str, Any]], evaluator_core) -> List[Tuple[Dict[str, Any], float, float]]:
+    valid = []
+    for sample in samples:
+        score = evaluator_core._as_float(sample.get("score"), None) if "error" not in sample else None
+        if score is not None:
+            valid.append((sample, score, min(1.0, max(0.0, evaluator_core._as_float(sample.get("confidence"), 0.5)))))
+    return valid
+
+def aggregate_samples(samples: List[Dict[str, Any]], criterion: str, evaluator_core) -> Dict[str, Any]:
+    valid = valid_samples(samples, evaluator_core)
+    if not valid:
+        return samples[0]
+    
+    scores = [score for _, score, _ in valid]
+    median = statistics.median(scores)
+    # The reasoning and evidence come from the sample closest to the median, so they explain the reported score.
+    representative = min(valid, key=lambda item: abs(item[1] - median))[0]
+    
+    judgment = dict(representative)
+    judgment.update({
+        "score": round(median, 2),
+        "confidence": round(statistics.median(confidence for _, _, confidence in valid), 2),
+        "level": evaluator_core.level_for_score(criterion, median),
+        "samples": len(scores),
+        "sample_scores": scores,
+        "score_variance": round(statistics.variance(scores), 3) if len(scores) > 1 else 0.0
+    })
+    return judgment
+
+def format_sample_summary(judgment: Dict[str, Any]) -> str:
+    if judgment.get("samples", 1) < 2:
+        return ""
+    return f", median of {judgment['samples']} samples, variance {judgment.get('score_variance', 0.0):g}"
+
+def add_sampling_arguments(parser):
+    parser.add_argument("--samples", type=int, default=1, help="Most judgments sampled per criterion for self-consistency; the median is kept (default: 1, off)")
+    parser.add_argument("--initial-samples", type=int, default=2, help="Samples drawn at once per round before checking agreement (default: 2)")
+    parser.add_argument("--sample-tolerance", type=float, default=1.0, help="Score difference within which two samples agree (default: 1.0)")
+    parser.add_argument("--sample-min-confidence", type=float, default=0.7, help="Mean judge confidence needed to stop sampling early (default: 0.7)")
+    parser.add_argument("--sample-seed", type=int, default=0, help="Seed of the first sample; each further sample adds one (default: 0)")
+
+def build_sampling_policy(args) -> SamplingPolicy:
+    return SamplingPolicy(max_samples=args.samples, initial_samples=args.initial_samples, tolerance=args.sample_tolerance,
+                          min_confidence=args.sample_min_confidence, seed=args.sample_seed)
@@ -0,0 +1,246 @@
+import errno
+import glob
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+
+RUNNABLE_LANGUAGES = {"python", "py"}
+MAX_DETAIL = 120
+
+# Runs as the sandboxed interpreter: the limits are applied before the submission is loaded, and
+# hard values equal the soft ones so the student code cannot raise them again. The CPU limit is the
+# exception: its hard value is one second higher, so code that ignores the SIGXCPU sent at the soft
+# limit is killed with SIGKILL a second later; either signal is reported as a timeout.
+BOOTSTRAP = """
+import os, resource, sys
+cpu_seconds, memory_bytes, output_bytes, isolate, path = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]), sys.argv[4] == "1", sys.argv[5]
+for limit, value in ((resource.RLIMIT_CPU, cpu_seconds), (resource.RLIMIT_AS, memory_bytes), (resource.RLIMIT_FSIZE, output_bytes), (resource.RLIMIT_CORE, 0)):
+    resource.setrlimit(limit, (value, value + (limit == resource.RLIMIT_CPU)))
+if isolate:
+    try:
+        os.unshare(os.CLONE_NEWUSER | os.CLONE_NEWNET)
+    except OSError:
+        os.unshare(os.CLONE_NEWNET)
+    if sys.argv[6:] == ["--probe"]:
+        sys.exit(0)
+with open(path, "rb") as source:
+    code = compile(source.read(), path, "exec")
+sys.argv = [path]
+# runpy.run_path would be the obvious call, but importing it costs more than the typical test case.
+exec(code, {"__name__": "__main__", "__file__": path, "__builtins__": __builtins__})
+"""
+
+def load_test_cases(directory: str) -> List[Dict[str, str]]:
+    cases = []
+    for input_path in sorted(glob.glob(os.path.join(directory, "*.in"))):
+        expected_path = input_path[:-3] + ".out"
+        if not os.path.isfile(expected_path):
+            continue
+        with open(input_path, 'r', encoding='utf-8') as f:
+            case_input = f.read()
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            expected = f.read()
+        cases.append({"name": os.path.basename(input_path)[:-3], "input": case_input, "expected": expected})
+    return cases
+
+def _normalize_output(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.strip("\n").splitlines()).rstrip()
+
+def _first_difference(expected: str, actual: str) -> str:
+    expected_lines, actual_lines = expected.splitlines(), actual.splitlines()
+    for number in range(max(len(expected_lines), len(actual_lines))):
+        want = expected_lines[number] if number < len(expected_lines) else "<end of output>"
+        got = actual_lines[number] if number < len(actual_lines) else "<end of output>"
+        if want != got:
+            return f"line {number + 1}: expected {want[:MAX_DETAIL]!r}, got {got[:MAX_DETAIL]!r}"
+    return "output differs"
+
+class TestCaseRunner:
+    def __init__(self, cases: List[Dict[str, str]], cpu_seconds: int = 2, wall_seconds: float = 5.0,
+                 memory_mb: int = 256, max_output_kb: int = 1024, workers: int = None, isolate_network: bool = True):
+        self.cases = cases
+        self.cpu_seconds = max(1, cpu_seconds)
+        self.wall_seconds = wall_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.output_bytes = max_output_kb * 1024
+        self.isolate_network = isolate_network
+        # Each case is a separate process, so threads only wait on children and one per core keeps every core busy.
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm-judge-tests")
+
+    def _command(self, path: str, isolate: bool) -> List[str]:
+        # -S skips site-packages: submissions get the standard library only, and startup is several times faster.
+        return [sys.executable, "-I", "-S", "-c", BOOTSTRAP, str(self.cpu_seconds), str(self.memory_bytes), str(self.output_bytes),
+                "1" if isolate else "0", path]
+
+    def network_isolation_available(self) -> bool:
+        with tempfile.TemporaryDirectory(prefix="llm_judge_probe_") as workdir:
+            path = os.path.join(workdir, "probe.py")
+            open(path, 'w').close()
+            try:
+                return subprocess.run(self._command(path, True) + ["--probe"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.wall_seconds).returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                return False
+
+    def _run_case(self, workdir: str, index: int, case: Dict[str, str]) -> Dict[str, Any]:
+        result = {"name": case["name"], "status": "passed", "seconds": 0.0}
+        input_path = os.path.join(workdir, f"{index}.in")
+        output_path = os.path.join(workdir, f"{index}.stdout")
+        error_path = os.path.join(workdir, f"{index}.stderr")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(case["input"])
+        # Each case starts in its own empty scratch directory, which is also HOME and TMPDIR, so files written to the
+        # usual places are private to the case and removed with it. This is not filesystem isolation: the code can still
+        # read and write whatever the grader's user can, so run the grader as an unprivileged user or in a container.
+        scratch = os.path.join(workdir, f"{index}.scratch")
+        os.mkdir(scratch)
+        
+        command = self._command(os.path.join(workdir, "solution.py"), self.isolate_network)
+        # Output goes to files rather than pipes so RLIMIT_FSIZE caps it and the parent never buffers it.
+        with open(input_path, 'rb') as stdin, open(output_path, 'wb') as stdout, open(error_path, 'wb') as stderr:
+            started = time.perf_counter()
+            try:
+                process = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=stderr, cwd=scratch,
+                                           env={"PATH": os.environ.get("PATH", ""), "LANG": "C.UTF-8", "HOME": scratch, "TMPDIR": scratch},
+                                           start_new_session=True)
+            except OSError as e:
+                return {**result, "status": "error", "detail": f"could not start: {e}"}
+            # Popen.wait(timeout) polls with sleeps of up to 50ms, which dominates short cases; a pidfd wakes up on exit.
+            pidfd = os.pidfd_open(process.pid)
+            try:
+                finished, _, _ = select.select([pidfd], [], [], self.wall_seconds)
+            finally:
+                os.close(pidfd)
+                # The whole session is killed so that processes the submission forked do not outlive it.
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                returncode = process.wait()
+            result["seconds"] = round(time.perf_counter() - started, 3)
+        
+        with open(error_path, 'r', encoding='utf-8', errors='replace') as f:
+            error_lines = [line for line in f.read().splitlines() if line.strip()]
+        last_error = error_lines[-1][:MAX_DETAIL] if error_lines else ""
+        
+        if not finished:
+            return {**result, "status": "timeout", "detail": f"no result after {self.wall_seconds:g}s"}
+        if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+            return {**result, "status": "timeout", "detail": f"used more than {self.cpu_seconds}s of CPU"}
+        # Python ignores SIGXFSZ, so hitting the output limit surfaces as EFBIG on write.
+        if returncode == -signal.SIGXFSZ or f"[Errno {errno.EFBIG}]" in last_error:
+            return {**result, "status": "output_limit", "detail": f"printed more than {self.output_bytes // 1024} KB"}
+        if last_error.startswith("MemoryError"):
+            return {**result, "status": "memory", "detail": f"exceeded {self.memory_bytes // (1024 * 1024)} MB"}
+        if returncode != 0:
+            return {**result, "status": "runtime_error", "detail": last_error or f"exit code {returncode}"}
+        
+        with open(output_path, 'r', encoding='utf-8', errors='replace') as f:
+            actual = _normalize_output(f.read())
+        expected = _normalize_output(case["expected"])
+        if actual != expected:
+            return {**result, "status": "failed", "detail": _first_difference(expected, actual)}
+        return result
+
+    def _summarize(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        passed = sum(1 for result in results if result["status"] == "passed")
+        return {
+            "passed": passed,
+            "total": len(results),
+            "pass_rate": round(passed / len(results), 3) if results else 0.0,
+            "seconds": round(sum(result["seconds"] for result in results), 3),
+            "cases": results
+        }
+
+    def run(self, code: str, language: str = "python") -> Dict[str, Any]:
+        return self.run_cohort({"submission": code}, language).get("submission")
+
+    def run_cohort(self, codes: Dict[str, str], language: str = "python") -> Dict[str, Dict[str, Any]]:
+        if language.lower() not in RUNNABLE_LANGUAGES or not self.cases:
+            return {}
+        
+        with tempfile.TemporaryDirectory(prefix="llm_judge_tests_") as root:
+            futures = {}
+            for number, (submission_id, code) in enumerate(codes.items()):
+                workdir = os.path.join(root, str(number))
+                os.mkdir(workdir)
+                with open(os.path.join(workdir, "solution.py"), 'w', encoding='utf-8') as f:
+                    f.write(code)
+                futures[submission_id] = [self.executor.submit(self._run_case, workdir, index, case) for index, case in enumerate(self.cases)]
+            
+            # Every case of the cohort is queued before any is awaited, so the pool never idles between submissions.
+            results = {submission_id: [future.result() for future in case_futures] for submission_id, case_futures in futures.items()}
+        
+        return {submission_id: self._summarize(cases) for submission_id, cases in results.items()}
+
+def format_test_summary(results: Dict[str, Any], max_failures: int = 5) -> str:
+    if not results:
+        return ""
+    
+    summary = f"Passed {results['passed']} of {results['total']} test cases."
+    failures = [case for case in results["cases"] if case["status"] != "passed"]
+    for case in failures[:max_failures]:
+        summary += f"\n- {case['name']}: {case['status'].replace('_', ' ')} ({case.get('detail', '')})"
+    if len(failures) > max_failures:
+        summary += f"\n- ... and {len(failures) - max_failures} more failing cases"
+    return summary
+
+def judgment_from_tests(results: Dict[str, Any], evaluator_core) -> Dict[str, Any]:
+    low, high = evaluator_core.score_range("correctness")
+    score = round(low + (high - low) * results["pass_rate"], 1)
+    failures = [case for case in results["cases"] if case["status"] != "passed"]
+    return {
+        "criterion": "correctness",
+        "score": score,
+        "confidence": 1.0,
+        "level": evaluator_core.level_for_score("correctness", score),
+        "reasoning": f"Passed {results['passed']} of {results['total']} test cases.",
+        "specific_evidence": [f"{case['name']}: {case['status'].replace('_', ' ')} ({case.get('detail', '')})" for case in failures[:5]],
+        "tests": True
+    }
+
+def add_test_arguments(parser):
+    parser.add_argument("--tests", default=None, help="Directory of NAME.in/NAME.out test cases (default: question.cases/ next to question.md)")
+    parser.add_argument("--no-tests", action="store_true", help="Do not run test cases even if the exercise ships them")
+    parser.add_argument("--tests-replace-correctness", action="store_true", help="Score correctness from the pass rate instead of asking a judge")
+    parser.add_argument("--test-timeout", type=float, default=5.0, help="Wall-clock seconds per test case (default: 5)")
+    parser.add_argument("--test-cpu", type=int, default=2, help="CPU seconds per test case (default: 2)")
+    parser.add_argument("--test-memory-mb", type=int, default=256, help="Address-space limit per test case in MB (default: 256)")
+    parser.add_argument("--test-workers", type=int, default=None, help="Test cases run in parallel (default: one per CPU)")
+    parser.add_argument("--tests-allow-network", action="store_true", help="Run test cases even where network namespaces are unavailable")
+
+def build_test_runner(args, question_file: str, language: str) -> TestCaseRunner:
+    if args.no_tests:
+        return None
+    
+    # Named after the question rather than a plain tests/, which a repository usually keeps for its own test suite.
+    directory = args.tests or os.path.splitext(os.path.abspath(question_file))[0] + ".cases"
+    if not os.path.isdir(directory):
+        if args.tests:
+            print(f" Test directory not found: {directory}")
+        return None
+    
+    cases = load_test_cases(directory)
+    if not cases:
+        print(f" No NAME.in/NAME.out test cases in {directory}")
+        return None
+    if language.lower() not in RUNNABLE_LANGUAGES:
+        print(f" Test cases are only run for Python submissions; {language} correctness stays with the judges")
+        return None
+    
+    runner = TestCaseRunner(cases, cpu_seconds=args.test_cpu, wall_seconds=args.test_timeout,
+                            memory_mb=args.test_memory_mb, workers=args.test_workers)
+    if not runner.network_isolation_available():
+        if not args.tests_allow_network:
+            print(" Network isolation is unavailable here (no network namespaces); not running tests. Use --tests-allow-network to run them anyway.")
+            return None
+        runner.isolate_network = False
+    
+    print(f" Tests: {len(cases)} cases from {directory}")
+    return runner
@@ -0,0 +1,144 @@
+import asyncio
+import collections
+import contextlib
+from typing import Dict, List, Any
+
+# Ollama unloads a model after five idle minutes by default. With several models, one waits idle while the scheduler
+# drains the others' groups, and reloading it costs what the grouping saved.
+MULTI_MODEL_KEEP_ALIVE = "30m"
+
+class ModelAffinityScheduler:
+    def __init__(self, max_concurrency: int = 4, max_group_run: int = 64):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_group_run = max(1, max_group_run)
+        self.active_model = None
+        self.in_flight = 0
+        self._waiting = collections.OrderedDict()
+        self._group_run = 0
+        self._last_requested = None
+        self.switches = 0
+        self.fifo_switches = 0
+
+    def _pending_other_models(self) -> bool:
+        return any(model != self.active_model for model in self._waiting)
+
+    def _can_start(self, model: str) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        if self.active_model is None:
+            return True
+        if model == self.active_model:
+            # A long-running group yields after max_group_run calls so other models do not starve.
+            return not (self._group_run >= self.max_group_run and self._pending_other_models())
+        # Other models only get a turn once the active group has fully drained.
+        return self.in_flight == 0 and self.active_model not in self._waiting
+
+    def _switch_to(self, model: str):
+        if self.active_model is not None and model != self.active_model:
+            self.switches += 1
+        self.active_model = model
+        self._group_run = 0
+
+    def _start(self, model: str):
+        if model != self.active_model:
+            self._switch_to(model)
+        self.in_flight += 1
+        self._group_run += 1
+
+    def _dispatch(self):
+        if self.in_flight == 0 and self._waiting:
+            if self.active_model not in self._waiting:
+                # Switch to the model with the most queued calls, oldest group first on ties.
+                self._switch_to(max(self._waiting, key=lambda model: len(self._waiting[model])))
+            elif self._group_run >= self.max_group_run and self._pending_other_models():
+                self._switch_to(next(model for model in self._waiting if model != self.active_model))
+        
+        waiters = self._waiting.get(self.active_model)
+        while waiters and self._can_start(self.active_model):
+            future = waiters.popleft()
+            if not future.done():
+                self._start(self.active_model)
+                future.set_result(None)
+        if waiters is not None and not waiters:
+            del self._waiting[self.active_model]
+
+    async def acquire(self, model: str):
+        # What a plain FIFO semaphore would have cost: a load every time the next
+        # call in arrival order targets a different model.
+        if self._last_requested is not None and model != self._last_requested:
+            self.fifo_switches += 1
+        self._last_requested = model
+        
+        if model not in self._waiting and self._can_start(model):
+            self._start(model)
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(model, collections.deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                waiters = self._waiting.get(model)
+                if waiters and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiting[model]
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model: str):
+        await self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_switches": self.switches,
+            "fifo_model_switches": self.fifo_switches,
+            "model_loads_avoided": max(0, self.fifo_switches - self.switches)
+        }
+
+def parse_model_assignments(assignments: List[str], criteria: List[str]) -> Dict[str, str]:
+    models = {}
+    for assignment in assignments or []:
+        criterion, separator, model = assignment.partition("=")
+        criterion = criterion.strip().lower()
+        if not separator or not model.strip():
+            raise ValueError(f"Expected CRITERION=MODEL, got {assignment!r}")
+        if criterion not in criteria:
+            raise ValueError(f"Unknown criterion {criterion!r} (expected one of: {', '.join(criteria)})")
+        models[criterion] = model.strip()
+    return models
+
+def add_model_arguments(parser):
+    parser.add_argument("--criterion-model", action="append", default=None, metavar="CRITERION=MODEL",
+                        help="Judge one criterion with another model, repeat per criterion (e.g. correctness=qwen2.5-coder:14b)")
+    parser.add_argument("--chief-model", default=None, help="Model used by the chief judge (default: the run's model)")
+    parser.add_argument("--keep-alive", default=None,
+                        help=f"How long Ollama keeps each model loaded after a call (e.g. 30m, -1 for forever; default: {MULTI_MODEL_KEEP_ALIVE} "
+                             "when criteria or the chief use other models, otherwise the server's own)")
+    parser.add_argument("--no-prefix-warmup", action="store_true", help="Send the judge calls together instead of letting one evaluate the shared prompt prefix first")
+
+def apply_model_arguments(evaluator_core, args):
+    models = parse_model_assignments(args.criterion_model, list(evaluator_core.evaluation_rubric.keys()))
+    for criterion, model in models.items():
+        evaluator_core.evaluation_rubric = evaluator_core.evaluation_rubric.with_criterion_options(criterion, model=model)
+    if args.chief_model:
+        evaluator_core.chief_model = args.chief_model
+
+def build_keep_alive(args, evaluator_core) -> str:
+    if args.keep_alive is not None:
+        return args.keep_alive
+    models = {info.get("model") or evaluator_core.model_name for info in evaluator_core.evaluation_rubric.values()}
+    models.add(evaluator_core.chief_model or evaluator_core.model_name)
+    # A single model stays busy for the whole run, so the server's setting (OLLAMA_KEEP_ALIVE) is left alone.
+    return MULTI_MODEL_KEEP_ALIVE if len(models) > 1 else None
@@ -0,0 +1,315 @@
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional
+from .llm_judge_api import LLMJudgeEvaluatorAPI
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Evaluation queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class EvaluationJob:
+    def __init__(self, key: str, exercise_requirement: str, student_code: str, language: str, priority: int):
+        self.job_id = uuid.uuid4().hex
+        self.key = key
+        self.exercise_requirement = exercise_requirement
+        self.student_code = student_code
+        self.language = language
+        self.priority = priority
+        self.queue_order = None
+        self.status = "queued"
+        self.submissions = 1
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "language": self.language,
+            "priority": self.priority,
+            "submissions": self.submissions,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+class LLMJudgeEvaluationService:
+    def __init__(self, evaluator_api: LLMJudgeEvaluatorAPI, workers: int = 4, queue_size: int = 100, max_finished_jobs: int = 1000):
+        self.evaluator_api = evaluator_api
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs = collections.OrderedDict()
+        self._in_flight = {}
+        # Jobs waiting in the queue, kept here for queue positions rather than read from the queue's internals.
+        self._queued = {}
+        self._sequence = itertools.count()
+        self._durations = collections.deque(maxlen=50)
+        self._counters = {"submitted": 0, "coalesced": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._worker_tasks = []
+
+    def job_key(self, exercise_requirement: str, student_code: str, language: str) -> str:
+        digest = hashlib.sha256()
+        for part in [self.evaluator_api.model_name, language, exercise_requirement, student_code]:
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def start(self):
+        # All jobs run on one event loop in a background thread, so the API's
+        # pooled clients and concurrency limit are shared by every request.
+        ready = threading.Event()
+        
+        def run_loop():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._queue = asyncio.PriorityQueue(maxsize=self.queue_size)
+            self._worker_tasks = [self._loop.create_task(self._worker()) for _ in range(self.workers)]
+            ready.set()
+            self._loop.run_forever()
+        
+        self._thread = threading.Thread(target=run_loop, name="llm-judge-service", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        if not self._loop:
+            return
+        
+        async def shutdown():
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def _run(self, coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def retry_after(self) -> int:
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        return max(1, int(average * len(self._queued) / self.workers + 0.5))
+
+    async def _submit_async(self, exercise_requirement: str, student_code: str, language: str, priority: int):
+        key = self.job_key(exercise_requirement, student_code, language)
+        
+        job = self._in_flight.get(key)
+        if job:
+            job.submissions += 1
+            self._counters["coalesced"] += 1
+            if job.status == "queued" and priority > job.priority:
+                self._promote(job, priority)
+            return job, True
+        
+        job = EvaluationJob(key, exercise_requirement, student_code, language, priority)
+        # Higher priorities are served first, equal priorities in arrival order.
+        job.queue_order = (-priority, next(self._sequence))
+        try:
+            self._queue.put_nowait((*job.queue_order, job))
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        
+        self._counters["submitted"] += 1
+        self._in_flight[key] = job
+        self._queued[job.job_id] = job
+        self._jobs[job.job_id] = job
+        self._forget_finished_jobs()
+        return job, False
+
+    def _promote(self, job: EvaluationJob, priority: int):
+        # A queue entry cannot be reordered in place, so the job is queued again at the higher priority, keeping
+        # its arrival order, and the worker drops the old entry. With no room for a second entry it keeps its place.
+        queue_order = (-priority, job.queue_order[1])
+        try:
+            self._queue.put_nowait((*queue_order, job))
+        except asyncio.QueueFull:
+            return
+        job.priority = priority
+        job.queue_order = queue_order
+
+    def submit(self, exercise_requirement: str, student_code: str, language: str = "python", priority: int = 0):
+        return self._run(self._submit_async(exercise_requirement, student_code, language, priority))
+
+    def _forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    async def _get_job_async(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        
+        status = job.to_dict()
+        if job.status == "queued":
+            status["queue_position"] = sum(1 for queued in self._queued.values() if queued.queue_order <= job.queue_order)
+        if job.status == "done":
+            status["result"] = job.result
+        return status
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._run(self._get_job_async(job_id))
+
+    async def _worker(self):
+        while True:
+            negated_priority, sequence, job = await self._queue.get()
+            if (negated_priority, sequence) != job.queue_order:
+                # An entry left behind when a coalesced submission raised the job's priority.
+                self._queue.task_done()
+                continue
+            self._queued.pop(job.job_id, None)
+            job.status = "running"
+            job.started_at = time.time()
+            
+            try:
+                job.result = await self.evaluator_api.evaluate_with_multiple_judges_async(job.exercise_requirement, job.student_code, job.language)
+                job.status = "done"
+                self._counters["completed"] += 1
+            except Exception as e:
+                job.error = f"Evaluation failed: {e}"
+                job.status = "failed"
+                self._counters["failed"] += 1
+            finally:
+                job.finished_at = time.time()
+                self._durations.append(job.finished_at - job.started_at)
+                self._in_flight.pop(job.key, None)
+                # Both copies are only needed while the job is pending.
+                job.exercise_requirement = job.student_code = None
+                self._queue.task_done()
+
+    async def _stats_async(self) -> Dict[str, Any]:
+        return dict(self._counters,
+                    queued=len(self._queued),
+                    running=sum(1 for job in self._in_flight.values() if job.status == "running"),
+                    queue_size=self.queue_size,
+                    workers=self.workers,
+                    **self.evaluator_api.scheduler_stats())
+
+    def stats(self) -> Dict[str, Any]:
+        return self._run(self._stats_async())
+
+    def to_prometheus(self) -> str:
+        stats = self.stats()
+        lines = []
+        for name in ["submitted", "coalesced", "rejected", "completed", "failed"]:
+            lines.append(f"# TYPE llm_judge_service_jobs_{name}_total counter")
+            lines.append(f"llm_judge_service_jobs_{name}_total {stats[name]}")
+        for name in ["model_switches", "model_loads_avoided"]:
+            lines.append(f"# TYPE llm_judge_service_{name}_total counter")
+            lines.append(f"llm_judge_service_{name}_total {stats[name]}")
+        for name in ["queued", "running", "queue_size", "workers"]:
+            lines.append(f"# TYPE llm_judge_service_{name} gauge")
+            lines.append(f"llm_judge_service_{name} {stats[name]}")
+        return "\n".join(lines) + "\n" + self.evaluator_api.metrics.to_prometheus()
+
+class LLMJudgeRequestHandler(BaseHTTPRequestHandler):
+    service: LLMJudgeEvaluationService = None
+    max_body_bytes = 1024 * 1024
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def do_POST(self):
+        if self._path_parts() != ["jobs"]:
+            self._send_json(404, {"error": "Not found"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        # A negative length would make rfile.read block until the client gives up.
+        if length < 0:
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return
+        if length > self.max_body_bytes:
+            self._send_json(413, {"error": "Request body too large"})
+            return
+        
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            exercise_requirement = payload["exercise"]
+            student_code = payload["code"]
+            language = payload.get("language", "python")
+            priority = int(payload.get("priority", 0))
+            if not all(isinstance(value, str) and value for value in [exercise_requirement, student_code, language]):
+                raise ValueError("exercise, code and language must be non-empty strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid job request: {e!r}"})
+            return
+        
+        try:
+            job, coalesced = self.service.submit(exercise_requirement, student_code, language, priority)
+        except QueueFullError as e:
+            self._send_json(429, {"error": str(e)}, {"Retry-After": str(e.retry_after)})
+            return
+        
+        self._send_json(202, {"job_id": job.job_id, "status": job.status, "coalesced": coalesced},
+                        {"Location": f"/jobs/{job.job_id}"})
+
+    def do_GET(self):
+        parts = self._path_parts()
+        
+        if parts == ["metrics"]:
+            body = self.service.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parts == ["health"]:
+            self._send_json(200, dict(self.service.stats(), status="ok"))
+        elif len(parts) in [2, 3] and parts[0] == "jobs" and (len(parts) == 2 or parts[2] == "result"):
+            job = self.service.get_job(parts[1])
+            if not job:
+                self._send_json(404, {"error": "Unknown job"})
+            elif len(parts) == 2:
+                job.pop("result", None)
+                self._send_json(200, job)
+            elif job["status"] == "done":
+                self._send_json(200, job["result"])
+            elif job["status"] == "failed":
+                self._send_json(500, {"error": job["error"]})
+            else:
+                self._send_json(202, {"job_id": job["job_id"], "status": job["status"]})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(service: LLMJudgeEvaluationService, bind: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    handler = type("BoundLLMJudgeRequestHandler", (LLMJudgeRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((bind, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,250 @@
+import ast
+import io
+import os
+import re
+import tokenize
+from typing import Dict, List, Any
+from .llm_judge_compaction import strip_comments
+
+LONG_LINE = 100
+ACCEPTED_SHORT_NAMES = {"i", "j", "k", "n", "x", "y", "_"}
+SNAKE_CASE = re.compile(r"_{0,2}[a-z][a-z0-9_]*_{0,2}$")
+BRANCH_KEYWORDS = re.compile(r"\b(if|for|while|case|catch|except|elif)\b|&&|\|\||\?")
+LOOP_OR_BRACE = re.compile(r"\b(?:for|while)\b|[{}]")
+# Which metrics each criterion's judge is shown; criteria not listed see all of them.
+CRITERION_METRICS = {
+    "correctness": ["lines", "functions", "classes", "max_complexity"],
+    "efficiency": ["lines", "max_complexity", "max_nesting", "nested_loops", "nested_loops_same_collection"],
+    "readability": ["lines", "max_complexity", "max_nesting", "max_line_length", "long_lines", "short_names", "non_snake_case_names", "comment_ratio", "docstring_coverage"]
+}
+METRIC_LABELS = {
+    "lines": "non-blank lines",
+    "functions": "functions",
+    "classes": "classes",
+    "max_complexity": "max cyclomatic complexity",
+    "max_nesting": "max nesting depth",
+    "nested_loops": "nested loops",
+    "nested_loops_same_collection": "nested loops over the same collection",
+    "max_line_length": "longest line",
+    "long_lines": f"lines over {LONG_LINE} chars",
+    "short_names": "single-letter names",
+    "non_snake_case_names": "non snake_case function/variable names",
+    "comment_ratio": "comment lines per code line",
+    "docstring_coverage": "functions/classes with docstrings"
+}
+
+class _PythonMetrics(ast.NodeVisitor):
+    BLOCKS = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith, ast.Match)
+    LOOPS = (ast.For, ast.AsyncFor, ast.While)
+
+    def __init__(self):
+        self.complexities = []
+        self.max_nesting = 0
+        self.nested_loops = 0
+        self.nested_loops_same_collection = 0
+        self.names = set()
+        self.functions = 0
+        self.classes = 0
+        self.documented = 0
+        self._depth = 0
+        self._loops = []
+
+    def _complexity(self, node) -> int:
+        complexity = 1
+        for child in ast.walk(node):
+            if isinstance(child, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert)):
+                complexity += 1
+            elif isinstance(child, ast.BoolOp):
+                complexity += len(child.values) - 1
+            elif isinstance(child, ast.comprehension):
+                complexity += 1 + len(child.ifs)
+            elif isinstance(child, ast.match_case):
+                complexity += 1
+        return complexity
+
+    def _visit_definition(self, node):
+        self.documented += 1 if ast.get_docstring(node) else 0
+        if isinstance(node, ast.ClassDef):
+            self.classes += 1
+        else:
+            self.functions += 1
+            self.names.add(node.name)
+            self.complexities.append(self._complexity(node))
+        # Nesting is counted per function, so a method inside a class starts again at zero.
+        depth, loops = self._depth, self._loops
+        self._depth, self._loops = 0, []
+        self.generic_visit(node)
+        self._depth, self._loops = depth, loops
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_definition
+
+    def generic_visit(self, node):
+        if not isinstance(node, self.BLOCKS):
+            return super().generic_visit(node)
+        
+        self._depth += 1
+        self.max_nesting = max(self.max_nesting, self._depth)
+        if isinstance(node, self.LOOPS):
+            if self._loops:
+                self.nested_loops += 1
+                iterated = ast.dump(node.iter) if isinstance(node, (ast.For, ast.AsyncFor)) else None
+                if iterated and iterated in self._loops:
+                    self.nested_loops_same_collection += 1
+            self._loops.append(ast.dump(node.iter) if isinstance(node, (ast.For, ast.AsyncFor)) else None)
+            super().generic_visit(node)
+            self._loops.pop()
+        else:
+            super().generic_visit(node)
+        self._depth -= 1
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Store):
+            self.names.add(node.id)
+
+    def visit_arg(self, node):
+        self.names.add(node.arg)
+
+def _line_metrics(code: str, code_lines: List[str]) -> Dict[str, Any]:
+    lengths = [len(line) for line in code.splitlines()]
+    return {
+        "lines": len(code_lines),
+        "max_line_length": max(lengths, default=0),
+        "long_lines": sum(1 for length in lengths if length > LONG_LINE)
+    }
+
+def _analyze_python(code: str) -> Dict[str, Any]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        line = getattr(e, "lineno", None)
+        return {"parses": False, "syntax_error": f"line {line}: {e.msg}" if line else str(e)}
+    
+    visitor = _PythonMetrics()
+    visitor.visit(tree)
+    
+    try:
+        comments = sum(1 for token in tokenize.generate_tokens(io.StringIO(code).readline) if token.type == tokenize.COMMENT)
+    except (tokenize.TokenError, SyntaxError):
+        comments = 0
+    
+    code_lines = [line for line in code.splitlines() if line.strip() and not line.strip().startswith("#")]
+    names = visitor.names
+    analysis = {
+        "parses": True,
+        "functions": visitor.functions,
+        "classes": visitor.classes,
+        "max_complexity": max(visitor.complexities, default=1),
+        "mean_complexity": round(sum(visitor.complexities) / len(visitor.complexities), 1) if visitor.complexities else 1.0,
+        "max_nesting": visitor.max_nesting,
+        "nested_loops": visitor.nested_loops,
+        "nested_loops_same_collection": visitor.nested_loops_same_collection,
+        "short_names": sorted(name for name in names if len(name) == 1 and name not in ACCEPTED_SHORT_NAMES),
+        # UPPER_CASE constants are accepted as well as snake_case.
+        "non_snake_case_names": sorted(name for name in names if not SNAKE_CASE.match(name) and not name.isupper()),
+        "comment_ratio": round(comments / len(code_lines), 2) if code_lines else 0.0,
+        "docstring_coverage": f"{visitor.documented}/{visitor.functions + visitor.classes}"
+    }
+    analysis.update(_line_metrics(code, code_lines))
+    return analysis
+
+def _analyze_tokens(code: str, language: str) -> Dict[str, Any]:
+    stripped = strip_comments(code, language)
+    code_lines = [line for line in stripped.splitlines() if line.strip()]
+    
+    depth = max_depth = nested_loops = 0
+    loop_depths = []
+    balanced = True
+    for match in LOOP_OR_BRACE.finditer(stripped):
+        token = match.group()
+        if token == "{":
+            depth += 1
+            max_depth = max(max_depth, depth)
+        elif token == "}":
+            depth -= 1
+            balanced = balanced and depth >= 0
+            while loop_depths and loop_depths[-1] >= depth:
+                loop_depths.pop()
+        else:
+            if loop_depths:
+                nested_loops += 1
+            loop_depths.append(depth)
+    
+    comments = sum(1 for line in code.splitlines() if line.strip()) - len(code_lines)
+    analysis = {
+        # Without a parser this is only a hint, so it never short-circuits a judge.
+        "parses": None,
+        "balanced_braces": balanced and depth == 0,
+        "max_complexity": 1 + len(BRANCH_KEYWORDS.findall(stripped)),
+        "max_nesting": max_depth,
+        "nested_loops": nested_loops,
+        "comment_ratio": round(comments / len(code_lines), 2) if code_lines else 0.0
+    }
+    analysis.update(_line_metrics(code, code_lines))
+    return analysis
+
+def analyze_code(code: str, language: str = "python") -> Dict[str, Any]:
+    if not code or not code.strip():
+        return {"empty": True, "parses": False, "lines": 0}
+    
+    if language.lower() in {"python", "py"}:
+        analysis = _analyze_python(code)
+    else:
+        analysis = _analyze_tokens(code, language.lower())
+    analysis["empty"] = False
+    return analysis
+
+def analyze_cohort(codes: Dict[str, str], language: str = "python", processes: int = None) -> Dict[str, Dict[str, Any]]:
+    ids = list(codes)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(ids) < 2:
+        return {submission_id: analyze_code(codes[submission_id], language) for submission_id in ids}
+    
+    # multiprocessing costs more to import than a single-submission run spends analysing, so only cohorts load it.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(processes, len(ids))) as executor:
+        chunksize = max(1, len(ids) // (processes * 4))
+        results = executor.map(analyze_code, [codes[submission_id] for submission_id in ids], [language] * len(ids), chunksize=chunksize)
+        return dict(zip(ids, results))
+
+def format_static_summary(analysis: Dict[str, Any], criterion: str = None) -> str:
+    if not analysis or analysis.get("empty"):
+        return ""
+    if analysis.get("parses") is False:
+        return f"The code does not parse ({analysis.get('syntax_error')})."
+    
+    facts = []
+    for key in CRITERION_METRICS.get(criterion, list(METRIC_LABELS)):
+        if key not in analysis:
+            continue
+        value = analysis[key]
+        if isinstance(value, list):
+            value = f"{len(value)} ({', '.join(value[:5])}{', ...' if len(value) > 5 else ''})" if value else 0
+        facts.append(f"{METRIC_LABELS[key]}: {value}")
+    if analysis.get("balanced_braces") is False:
+        facts.append("braces are unbalanced")
+    return "; ".join(facts)
+
+def certain_judgments(analysis: Dict[str, Any], evaluator_core) -> Dict[str, Dict[str, Any]]:
+    if not analysis:
+        return {}
+    
+    def certain(criterion: str, reasoning: str, evidence: List[str]) -> Dict[str, Any]:
+        low, _ = evaluator_core.score_range(criterion)
+        return {
+            "criterion": criterion,
+            "score": low,
+            "confidence": 1.0,
+            "level": evaluator_core.level_for_score(criterion, low),
+            "reasoning": reasoning,
+            "specific_evidence": evidence,
+            "static": True
+        }
+    
+    if analysis.get("empty"):
+        return {criterion: certain(criterion, "The submission is empty.", []) for criterion in evaluator_core.evaluation_rubric}
+    if analysis.get("parses") is False and "correctness" in evaluator_core.evaluation_rubric:
+        return {"correctness": certain("correctness", "The code does not parse, so it cannot run.", [analysis["syntax_error"]])}
+    return {}
+
+def add_static_arguments(parser):
+    parser.add_argument("--no-static-analysis", action="store_true", help="Do not pre-analyse code or skip judges whose result is certain")
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+DEFAULT_STORE_PATH = "llm_judge_results.sqlite3"
+SUMMARY_COLUMNS = ["id", "submission_id", "exercise_hash", "code_hash", "model", "language", "evaluated_at", "final_score", "error", "duplicate_of", "elapsed_seconds"]
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ResultStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH, batch_size: int = 100):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._pending = []
+        self._known_texts = set()
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Exercise statements and submitted code are stored once per distinct text; evaluations refer to them by hash.
+        self._conn.execute("CREATE TABLE IF NOT EXISTS texts (hash TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS evaluations ("
+            "id INTEGER PRIMARY KEY, submission_id TEXT NOT NULL, exercise_hash TEXT NOT NULL, code_hash TEXT, "
+            "model TEXT, language TEXT, evaluated_at TEXT, final_score REAL, error TEXT, duplicate_of TEXT, elapsed_seconds REAL)"
+        )
+        # The full evaluation JSON lives apart from the indexed columns, so aggregate queries scan narrow rows.
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (evaluation_id INTEGER PRIMARY KEY, evaluation TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "evaluation_id INTEGER NOT NULL, criterion TEXT NOT NULL, score REAL, confidence REAL, "
+            "PRIMARY KEY (evaluation_id, criterion)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_submission ON evaluations (submission_id, exercise_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_exercise_score ON evaluations (exercise_hash, final_score)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_model ON evaluations (model)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS evaluations_final_score ON evaluations (final_score)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_criterion ON scores (criterion, score)")
+
+    def add(self, record: Dict[str, Any], exercise_requirement: str, student_code: str = None):
+        with self._lock:
+            self._pending.append((record, exercise_requirement, student_code))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self) -> List[int]:
+        with self._lock:
+            return self._flush()
+
+    def _flush(self) -> List[int]:
+        if not self._pending:
+            return []
+        
+        pending, self._pending = self._pending, []
+        ids = []
+        # One transaction per batch: a cohort pays one WAL commit per batch_size evaluations rather than one per row.
+        self._conn.execute("BEGIN")
+        try:
+            for record, exercise_requirement, student_code in pending:
+                exercise_hash = self._put_text(exercise_requirement)
+                code_hash = self._put_text(student_code) if student_code is not None else None
+                evaluation = record.get("evaluation") or {}
+                cursor = self._conn.execute(
+                    "INSERT INTO evaluations (submission_id, exercise_hash, code_hash, model, language, evaluated_at, "
+                    "final_score, error, duplicate_of, elapsed_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record.get("submission_id"), exercise_hash, code_hash, record.get("model"), record.get("language"),
+                     record.get("evaluated_at"), evaluation.get("final_score"), record.get("error"),
+                     record.get("duplicate_of"), record.get("elapsed_seconds"))
+                )
+                ids.append(cursor.lastrowid)
+                if evaluation:
+                    self._conn.execute("INSERT INTO documents (evaluation_id, evaluation) VALUES (?, ?)",
+                                       (cursor.lastrowid, json.dumps(evaluation, ensure_ascii=False)))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO scores (evaluation_id, criterion, score, confidence) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, judgment.get("criterion"), judgment.get("score"), judgment.get("confidence"))
+                     for judgment in evaluation.get("individual_judgments", []) if judgment.get("criterion")]
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            self._known_texts.clear()
+            raise
+        return ids
+
+    def _put_text(self, text: str) -> str:
+        digest = text_hash(text)
+        if digest not in self._known_texts:
+            self._conn.execute("INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", (digest, text))
+            self._known_texts.add(digest)
+        return digest
+
+    def _text(self, digest: Optional[str]) -> Optional[str]:
+        if digest is None:
+            return None
+        row = self._conn.execute("SELECT text FROM texts WHERE hash = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def _row_to_dict(self, row: sqlite3.Row, full: bool) -> Dict[str, Any]:
+        result = {column: row[column] for column in SUMMARY_COLUMNS}
+        result["scores"] = {criterion: score for criterion, score in self._conn.execute(
+            "SELECT criterion, score FROM scores WHERE evaluation_id = ?", (row["id"],))}
+        if full:
+            document = self._conn.execute("SELECT evaluation FROM documents WHERE evaluation_id = ?", (row["id"],)).fetchone()
+            result["evaluation"] = json.loads(document[0]) if document else {}
+            result["exercise"] = self._text(row["exercise_hash"])
+            result["code"] = self._text(row["code_hash"])
+        return result
+
+    def get(self, evaluation_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM evaluations WHERE id = ?", (evaluation_id,)).fetchone()
+            return self._row_to_dict(row, full=True) if row else None
+
+    def latest(self, submission_id: str, exercise_hash: str = None) -> Optional[Dict[str, Any]]:
+        sql = "SELECT * FROM evaluations WHERE submission_id = ? AND error IS NULL"
+        params = [submission_id]
+        if exercise_hash:
+            sql += " AND exercise_hash = ?"
+            params.append(exercise_hash)
+        
+        with self._lock:
+            row = self._conn.execute(sql + " ORDER BY id DESC LIMIT 1", params).fetchone()
+            return self._row_to_dict(row, full=True) if row else None
+
+    def recorded(self, exercise_hash: str) -> Set[Tuple[str, str]]:
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute("SELECT submission_id, evaluated_at FROM evaluations WHERE exercise_hash = ?", (exercise_hash,))
+            return {(submission_id, evaluated_at) for submission_id, evaluated_at in rows}
+
+    def _where(self, exercise_hash: str = None, model: str = None, submission_id: str = None,
+               min_score: float = None, max_score: float = None):
+        clauses, params = [], []
+        if exercise_hash is not None:
+            # A hash prefix is enough, as with git; GLOB keeps the lookup on the index.
+            clauses.append("exercise_hash GLOB ?")
+            params.append(exercise_hash + "*")
+        for column, value in (("model", model), ("submission_id", submission_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_score is not None:
+            clauses.append("final_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("final_score <= ?")
+            params.append(max_score)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, limit: int = 100, full: bool = False, **filters) -> List[Dict[str, Any]]:
+        where, params = self._where(**filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT * FROM evaluations{where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+            return [self._row_to_dict(row, full) for row in rows]
+
+    def summary(self, **filters) -> Dict[str, Any]:
+        where, params = self._where(**filters)
+        with self._lock:
+            totals = self._conn.execute(
+                f"SELECT COUNT(*), COUNT(error), AVG(final_score), MIN(final_score), MAX(final_score) FROM evaluations{where}", params
+            ).fetchone()
+            scoped = f" WHERE evaluation_id IN (SELECT id FROM evaluations{where})" if where else ""
+            criteria = self._conn.execute(
+                f"SELECT criterion, COUNT(*), AVG(score), MIN(score), MAX(score) FROM scores{scoped} GROUP BY criterion ORDER BY criterion", params
+            ).fetchall()
+        
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+        
+        return {
+            "evaluations": totals[0],
+            "failed": totals[1],
+            "final_score": {"mean": rounded(totals[2]), "min": totals[3], "max": totals[4]},
+            "criteria": {row[0]: {"count": row[1], "mean": rounded(row[2]), "min": row[3], "max": row[4]} for row in criteria}
+        }
+
+    def iter_rows(self, full: bool = True, **filters):
+        where, params = self._where(**filters)
+        # A separate read connection streams the export without holding the lock that writers need.
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            texts = {}
+            for row in conn.execute(f"SELECT * FROM evaluations{where} ORDER BY id", params):
+                result = {column: row[column] for column in SUMMARY_COLUMNS}
+                result["scores"] = {criterion: score for criterion, score in conn.execute(
+                    "SELECT criterion, score FROM scores WHERE evaluation_id = ?", (row["id"],))}
+                if full:
+                    for key, digest in (("exercise", row["exercise_hash"]), ("code", row["code_hash"])):
+                        if digest is not None and digest not in texts:
+                            found = conn.execute("SELECT text FROM texts WHERE hash = ?", (digest,)).fetchone()
+                            texts[digest] = found[0] if found else None
+                        result[key] = texts.get(digest)
+                    document = conn.execute("SELECT evaluation FROM documents WHERE evaluation_id = ?", (row["id"],)).fetchone()
+                    result["evaluation"] = json.loads(document[0]) if document else {}
+                yield result
+        finally:
+            conn.close()
+
+    def export_jsonl(self, output_file: str, **filters) -> int:
+        count = 0
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for row in self.iter_rows(full=True, **filters):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def export_parquet(self, output_file: str, **filters) -> int:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        
+        # One flat column per criterion so the file can be filtered and aggregated without parsing JSON.
+        rows = []
+        for row in self.iter_rows(full=False, **filters):
+            scores = row.pop("scores")
+            row.update({f"score_{criterion}": score for criterion, score in scores.items()})
+            rows.append(row)
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), output_file)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+def add_store_arguments(parser):
+    parser.add_argument("--store", default=None, metavar="PATH", help=f"Also record evaluations in a SQLite results store (e.g. {DEFAULT_STORE_PATH})")
+
+def build_store(args) -> Optional[ResultStore]:
+    if not args.store:
+        return None
+    return ResultStore(args.store)
@@ -0,0 +1,106 @@
+import re
+from typing import Callable, Dict, List, Any
+
+CHIEF_SECTION_KEYS = [
+    "final_score",
+    "overall_assessment",
+    "weighted_breakdown",
+    "key_strengths",
+    "critical_issues",
+    "actionable_improvements",
+    "learning_path",
+    "judge_consensus"
+]
+
+class IncrementalJSONScanner:
+    def __init__(self, openers: str = "{"):
+        self.openers = openers
+        self.text = ""
+        self.start = None
+        self.end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    @property
+    def value(self) -> str:
+        return self.text[self.start:self.end] if self.complete else None
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete:
+            return True
+        
+        offset = len(self.text)
+        self.text += chunk
+        
+        for index, char in enumerate(chunk, offset):
+            if self.start is None:
+                if char in self.openers:
+                    self.start = index
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = index + 1
+                    return True
+        
+        return False
+
+class ChiefSectionTracker:
+    def __init__(self, parse_final_evaluation: Callable[[str], Dict[str, Any]], on_sections: Callable[[Dict[str, Any], List[str]], None], structured: bool = False):
+        self.parse_final_evaluation = parse_final_evaluation
+        self.on_sections = on_sections
+        self.structured = structured
+        self.text = ""
+        self.completed = 0
+
+    def feed(self, chunk: str):
+        self.text += chunk
+        
+        # A section is complete once the next one has started to arrive. Structured
+        # answers follow the schema's key order, so the same rule applies to JSON keys.
+        if self.structured:
+            started = [(index, match.start()) for index, key in enumerate(CHIEF_SECTION_KEYS)
+                       for match in [re.search(f'"{key}"\\s*:', self.text)] if match]
+            if not started:
+                return
+            completed, position = max(started)
+            if completed > self.completed:
+                prefix = self.text[:position].rstrip().rstrip(',') + "}"
+                self._emit(completed, prefix)
+        else:
+            headers = [int(number) for number in re.findall(r'\*\*(\d)\.', self.text)]
+            completed = max([number - 1 for number in headers if number <= len(CHIEF_SECTION_KEYS)], default=0)
+            if completed > self.completed:
+                self._emit(completed, self.text)
+
+    def reset(self):
+        # A retried stream starts over; sections already shown stay shown and are not emitted again.
+        self.text = ""
+
+    def finish(self):
+        if self.completed < len(CHIEF_SECTION_KEYS):
+            self._emit(len(CHIEF_SECTION_KEYS), self.text)
+
+    def _emit(self, completed: int, text: str):
+        partial = self.parse_final_evaluation(text)
+        new_sections = CHIEF_SECTION_KEYS[self.completed:completed]
+        self.completed = completed
+        self.on_sections(partial, new_sections)
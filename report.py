@@ -0,0 +1,71 @@
+import argparse
+import json
+
+from modulo.llm_judge_core import LLMJudgeEvaluatorCore
+from modulo.llm_judge_output import LLMJudgeEvaluatorOutput
+from modulo.llm_judge_store import ResultStore
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Query, render and export evaluations recorded in a LLM-as-a-Judge results store.",
+        epilog="Example: python report.py results.sqlite3 --summary --model llama3.1:8b"
+    )
+    parser.add_argument("store", help="SQLite results store written with --store")
+    parser.add_argument("--summary", action="store_true", help="Print counts and score statistics (default action)")
+    parser.add_argument("--list", type=int, metavar="N", default=None, help="List the latest N evaluations")
+    parser.add_argument("--render", nargs=2, metavar=("ID", "OUTPUT"), default=None, help="Render evaluation ID as a text report")
+    parser.add_argument("--export-jsonl", metavar="FILE", default=None, help="Export matching evaluations, with exercise and code, as JSONL")
+    parser.add_argument("--export-parquet", metavar="FILE", default=None, help="Export matching evaluations as Parquet (needs pyarrow)")
+    parser.add_argument("--exercise", default=None, help="Only evaluations of the exercise whose hash starts with this prefix")
+    parser.add_argument("--model", default=None, help="Only evaluations made with this model")
+    parser.add_argument("--submission", default=None, help="Only evaluations of this submission id")
+    parser.add_argument("--min-score", type=float, default=None, help="Only evaluations with at least this final score")
+    parser.add_argument("--max-score", type=float, default=None, help="Only evaluations with at most this final score")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    store = ResultStore(args.store)
+    filters = {
+        "exercise_hash": args.exercise,
+        "model": args.model,
+        "submission_id": args.submission,
+        "min_score": args.min_score,
+        "max_score": args.max_score
+    }
+    
+    if args.render:
+        evaluation_id, output_file = args.render
+        stored = store.get(int(evaluation_id))
+        if not stored:
+            print(f"No evaluation {evaluation_id} in {args.store}")
+            return
+        evaluator_output = LLMJudgeEvaluatorOutput(evaluator_core=LLMJudgeEvaluatorCore(model_name=stored["model"] or "llama3.1:8b"))
+        evaluator_output.save_stored_evaluation(store, int(evaluation_id), output_file)
+    
+    if args.list:
+        for row in store.query(limit=args.list, **filters):
+            score = f"{row['final_score']:.1f}" if row["final_score"] is not None else "-"
+            scores = ", ".join(f"{criterion} {value:.1f}" for criterion, value in row["scores"].items() if value is not None)
+            status = row["error"] or scores
+            print(f" #{row['id']:<6} {row['submission_id']:<40} {score:>5}  {row['exercise_hash'][:12]}  {row['model']}  {status}")
+    
+    if args.export_jsonl:
+        count = store.export_jsonl(args.export_jsonl, **filters)
+        print(f" Exported {count} evaluations to {args.export_jsonl}")
+    
+    if args.export_parquet:
+        try:
+            count = store.export_parquet(args.export_parquet, **filters)
+            print(f" Exported {count} evaluations to {args.export_parquet}")
+        except RuntimeError as e:
+            print(f" {e}")
+    
+    if args.summary or not (args.render or args.list or args.export_jsonl or args.export_parquet):
+        print(json.dumps(store.summary(**filters), indent=2))
+    
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+
+from modulo.llm_judge_core import LLMJudgeEvaluatorCore
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+from modulo.llm_judge_service import LLMJudgeEvaluationService, create_server
+from modulo.llm_judge_cache import add_cache_arguments, build_cache
+from modulo.llm_judge_retry import add_retry_arguments, build_retry_policy
+from modulo.llm_judge_sampling import add_sampling_arguments, build_sampling_policy
+from modulo.llm_judge_pool import add_pool_arguments, build_client_pool
+from modulo.llm_judge_scheduler import add_model_arguments, apply_model_arguments, build_keep_alive
+from modulo.llm_judge_compaction import add_compaction_arguments, build_compactor
+from modulo.llm_judge_static import add_static_arguments
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Run LLM-as-a-Judge as a local HTTP evaluation service.",
+        epilog="Example: python serve.py llama3.1:8b --port 8080 --workers 8 --queue-size 500"
+    )
+    parser.add_argument("model_name", nargs="?", default="llama3.1:8b", help="Ollama model (default: llama3.1:8b)")
+    parser.add_argument("--bind", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--workers", type=int, default=4, help="Submissions evaluated concurrently (default: 4)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Queued submissions before requests get 429 (default: 100)")
+    parser.add_argument("--combined-judge", action="store_true", help="Score every criterion in a single LLM call")
+    parser.add_argument("--feedback", action="store_true", help="Always ask the chief judge for narrative feedback")
+    parser.add_argument("--stream", action="store_true", help="Stream responses and stop each judge as soon as its JSON is complete")
+    parser.add_argument("--no-structured-output", action="store_true", help="Do not constrain responses with JSON schemas (for Ollama versions before 0.5)")
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_sampling_arguments(parser)
+    add_pool_arguments(parser)
+    add_model_arguments(parser)
+    add_compaction_arguments(parser)
+    add_static_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    
+    model_name = args.model_name
+    
+    cache = build_cache(args)
+    client_pool = build_client_pool(args)
+    
+    evaluator_core = LLMJudgeEvaluatorCore(model_name=model_name, compactor=build_compactor(args))
+    try:
+        apply_model_arguments(evaluator_core, args)
+    except ValueError as e:
+        print(f"Invalid model assignment: {e}")
+        return
+    
+    evaluator_api = LLMJudgeEvaluatorAPI(model_name=model_name, evaluator_core=evaluator_core, cache=cache,
+                                         judge_mode="combined" if args.combined_judge else "separate",
+                                         narrative_feedback=args.feedback, stream=args.stream,
+                                         structured_output=not args.no_structured_output,
+                                         retry_policy=build_retry_policy(args), client_pool=client_pool,
+                                         max_concurrency=args.max_concurrency, keep_alive=build_keep_alive(args, evaluator_core),
+                                         prefix_warmup=not args.no_prefix_warmup,
+                                         sampling_policy=build_sampling_policy(args),
+                                         static_analysis=not args.no_static_analysis)
+    service = LLMJudgeEvaluationService(evaluator_api, workers=args.workers, queue_size=args.queue_size)
+    service.start()
+    server = create_server(service, args.bind, args.port)
+    
+    print(" LLM-as-a-Judge evaluation service")
+    print(f" Model: {model_name}")
+    print(f" Workers: {args.workers}, queue size: {args.queue_size}")
+    print(f" Listening on http://{args.bind}:{server.server_address[1]}")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n Shutting down...")
+    finally:
+        server.server_close()
+        service.stop()
+        if cache:
+            cache.close()
+
+if __name__ == "__main__":
+    main()
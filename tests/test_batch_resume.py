@@ -0,0 +1,53 @@
+import os
+import pytest
+from modulo.llm_judge_batch import LLMJudgeBatchEvaluator
+from modulo.llm_judge_store import ResultStore
+
+EXERCISE = "Write a function `add(a, b)` that returns the sum of two numbers."
+
+class Killed(BaseException):
+    pass
+
+class StubAPI:
+    # Stands in for the model-backed API; raising Killed after some submissions acts like the process dying.
+    model_name = "stub"
+    static_analysis = False
+
+    def __init__(self, kill_after: int = None):
+        self.kill_after = kill_after
+        self.evaluated = 0
+    
+    async def evaluate_with_multiple_judges_async(self, exercise_requirement, student_code, language, analysis=None, previous=None):
+        if self.kill_after is not None and self.evaluated == self.kill_after:
+            raise Killed()
+        self.evaluated += 1
+        return {"final_score": 7.0, "individual_judgments": [{"criterion": "correctness", "score": 7.0, "confidence": 0.9}]}
+
+def test_store_catches_up_after_a_run_killed_mid_batch(tmp_path):
+    submissions = tmp_path / "submissions"
+    submissions.mkdir()
+    for index in range(10):
+        (submissions / f"student_{index}.py").write_text(f"def add(a, b):\n    return a + b  # {index}\n")
+    results_file = str(tmp_path / "results.jsonl")
+    store_path = str(tmp_path / "results.sqlite3")
+    
+    # The store batches 100 rows per transaction, so nothing reached it before the crash.
+    with pytest.raises(Killed):
+        LLMJudgeBatchEvaluator(StubAPI(kill_after=6), workers=1, store=ResultStore(store_path)).evaluate_cohort(EXERCISE, str(submissions), results_file)
+    with open(results_file, 'r', encoding='utf-8') as f:
+        assert sum(1 for _ in f) == 6
+    assert ResultStore(store_path).summary()["evaluations"] == 0
+    
+    api = StubAPI()
+    store = ResultStore(store_path)
+    summary = LLMJudgeBatchEvaluator(api, workers=2, store=store).evaluate_cohort(EXERCISE, str(submissions), results_file)
+    
+    assert api.evaluated == 4 and summary["skipped"] == 6
+    rows = store.query(limit=100)
+    assert len(rows) == 10
+    assert sorted(row["submission_id"] for row in rows) == sorted(os.path.normpath(str(path)) for path in submissions.iterdir())
+    assert all(row["code_hash"] for row in rows)
+    
+    # A further resume finds nothing missing and adds no rows.
+    LLMJudgeBatchEvaluator(StubAPI(), store=store).evaluate_cohort(EXERCISE, str(submissions), results_file)
+    assert store.summary()["evaluations"] == 10
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+from modulo.llm_judge_batch import LLMJudgeBatchEvaluator
+
+EXERCISE = "Write a function `add(a, b)` that returns the sum of two numbers."
+BROKEN_CODE = "def add(a, b)\n    return a + b\n"
+
+class GenerousAPI(LLMJudgeEvaluatorAPI):
+    # Every judge and the chief answer with a high score, whatever the code.
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.kinds = []
+    
+    async def _chat_text_async(self, kind, prompt, num_predict=None, response_format=None, **kwargs):
+        self.kinds.append(kind)
+        if kind == "chief":
+            return json.dumps({"final_score": 9.5, "overall_assessment": "Excellent work.",
+                               "weighted_breakdown": {criterion: 9.5 for criterion in self.evaluator_core.evaluation_rubric},
+                               "key_strengths": ["clear"], "critical_issues": [], "actionable_improvements": [],
+                               "learning_path": [], "judge_consensus": "high"})
+        criterion = response_format["properties"]["criterion"]["enum"][0]
+        return json.dumps({"criterion": criterion, "score": 9.5, "confidence": 0.9, "level": "excellent",
+                           "reasoning": "Looks great.", "specific_evidence": ["return a + b"]})
+
+def evaluate(**kwargs):
+    api = GenerousAPI(static_analysis=True, **kwargs)
+    return api, asyncio.run(api.evaluate_with_multiple_judges_async(EXERCISE, BROKEN_CODE))
+
+def test_syntax_error_does_not_call_the_chief():
+    api, evaluation = evaluate()
+    
+    assert "chief" not in api.kinds
+    assert evaluation["aggregation"]["certain_criteria"] == ["correctness"]
+    assert not evaluation["aggregation"]["needs_chief_judge"]
+    judgments = {judgment["criterion"]: judgment for judgment in evaluation["individual_judgments"]}
+    assert judgments["correctness"]["static"] and judgments["correctness"]["score"] == 0
+    assert evaluation["final_score"] < 6
+
+def test_chief_cannot_overrule_a_syntax_error():
+    api, evaluation = evaluate(narrative_feedback=True)
+    
+    assert "chief" in api.kinds
+    assert evaluation["overall_assessment"] == "Excellent work."
+    assert evaluation["final_score"] == evaluation["aggregation"]["final_score"] < 6
+    assert evaluation["weighted_breakdown"]["correctness"] == 0
+
+def test_chief_cannot_overrule_replaced_correctness():
+    # Half the test cases fail; the judges and the chief still answer 9.5.
+    api = GenerousAPI(test_mode="replace", narrative_feedback=True)
+    test_results = {"passed": 2, "total": 4, "pass_rate": 0.5, "seconds": 0.1,
+                    "cases": [{"name": name, "status": "wrong_answer", "detail": ""} for name in ["c", "d"]]}
+    evaluation = asyncio.run(api.evaluate_with_multiple_judges_async(EXERCISE, "def add(a, b):\n    return a - b\n", test_results=test_results))
+    
+    assert api.kinds.count("judge") == 2
+    assert evaluation["aggregation"]["certain_criteria"] == ["correctness"]
+    assert evaluation["weighted_breakdown"]["correctness"] == 5.0
+    assert evaluation["final_score"] == evaluation["aggregation"]["final_score"]
+    assert evaluation["final_score"] < 7.5
+
+def test_empty_submission_in_a_batch_scores_zero_without_a_judge(tmp_path):
+    submissions = tmp_path / "submissions"
+    submissions.mkdir()
+    (submissions / "empty.py").write_text("")
+    (submissions / "blank.py").write_text("\n   \n")
+    results_file = str(tmp_path / "results.jsonl")
+    
+    api = GenerousAPI(static_analysis=True)
+    summary = LLMJudgeBatchEvaluator(api, workers=1).evaluate_cohort(EXERCISE, str(submissions), results_file)
+    
+    assert api.kinds == []
+    assert summary["evaluated"] == 2 and summary["failed"] == 0
+    with open(results_file, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert all("error" not in record and record["evaluation"]["final_score"] == 0 for record in records)
+    
+    # Blank files are finished evaluations, so a resume does not run them again.
+    summary = LLMJudgeBatchEvaluator(api, workers=1).evaluate_cohort(EXERCISE, str(submissions), results_file)
+    assert summary["skipped"] == 2 and api.kinds == []
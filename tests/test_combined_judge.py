@@ -0,0 +1,38 @@
+import asyncio
+import json
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+
+EXERCISE = "Write a function `add(a, b)` that returns the sum of two numbers."
+CODE = "def add(a, b):\n    return a + b\n"
+TEST_RESULTS = {"passed": 4, "total": 4, "pass_rate": 1.0, "seconds": 0.1, "cases": []}
+
+class RecordingAPI(LLMJudgeEvaluatorAPI):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+    
+    async def _chat_text_async(self, kind, prompt, num_predict=None, response_format=None, **kwargs):
+        self.calls.append({"kind": kind, "prompt": prompt, "num_predict": num_predict, "response_format": response_format})
+        criteria = response_format["items"]["properties"]["criterion"]["enum"]
+        return json.dumps([{"criterion": criterion, "score": 8, "confidence": 0.9, "level": "good",
+                            "reasoning": "Adds the numbers.", "specific_evidence": ["return a + b"]} for criterion in criteria])
+
+def test_combined_judge_asks_only_for_pending_criteria():
+    # Correctness comes from the tests, so the combined call judges the other two criteria only.
+    api = RecordingAPI(judge_mode="combined", test_mode="replace")
+    evaluation = asyncio.run(api.evaluate_with_multiple_judges_async(EXERCISE, CODE, test_results=TEST_RESULTS))
+    
+    assert [call["kind"] for call in api.calls] == ["judge_combined"]
+    call = api.calls[0]
+    schema = call["response_format"]
+    assert schema["items"]["properties"]["criterion"]["enum"] == ["efficiency", "readability"]
+    assert schema["minItems"] == schema["maxItems"] == 2
+    assert '"criterion": "correctness"' not in call["prompt"]
+    assert '"criterion": "efficiency"' in call["prompt"] and '"criterion": "readability"' in call["prompt"]
+    rubric = api.evaluator_core.evaluation_rubric
+    assert call["num_predict"] == rubric["efficiency"]["num_predict"] + rubric["readability"]["num_predict"]
+    
+    judgments = {judgment["criterion"]: judgment for judgment in evaluation["individual_judgments"]}
+    assert judgments["correctness"]["tests"] and judgments["correctness"]["score"] == 10
+    assert judgments["efficiency"]["score"] == judgments["readability"]["score"] == 8
+    assert evaluation["failed_criteria"] == []
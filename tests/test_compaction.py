@@ -0,0 +1,26 @@
+from modulo.llm_judge_compaction import PromptCompactor
+from modulo.llm_judge_core import LLMJudgeEvaluatorCore
+
+EXERCISE = "Write a function `add(a, b)` that returns the sum of two numbers."
+CODE = "def add(a, b):\n    # the sum of both arguments\n    return a + b\n"
+
+def prefixes(compactor: PromptCompactor):
+    core = LLMJudgeEvaluatorCore(compactor=compactor)
+    return {criterion: core.create_judge_prefix(EXERCISE, CODE, criterion=criterion) for criterion in core.evaluation_rubric}
+
+def test_default_rubric_strips_comments_per_criterion():
+    found = prefixes(PromptCompactor())
+    
+    assert "# the sum" not in found["correctness"] and "# the sum" not in found["efficiency"]
+    assert "# the sum" in found["readability"]
+    # Criteria that render the code alike still share a prefix.
+    assert found["correctness"] == found["efficiency"]
+    
+    core = LLMJudgeEvaluatorCore(compactor=PromptCompactor())
+    assert core.create_judge_prompt(EXERCISE, CODE, "correctness").startswith(found["correctness"])
+
+def test_share_prefix_keeps_comments_for_every_judge():
+    found = prefixes(PromptCompactor(share_prefix=True))
+    
+    assert len(set(found.values())) == 1
+    assert "# the sum" in found["correctness"]
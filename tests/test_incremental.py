@@ -0,0 +1,38 @@
+from modulo.llm_judge_api import LLMJudgeEvaluatorAPI
+from modulo.llm_judge_incremental import code_diff
+
+PREVIOUS_CODE = '''def mean(numbers):
+    # Average of the list
+    if not numbers:
+        return 0
+    return sum(numbers) / len(numbers)
+'''
+
+def previous_evaluation(code):
+    judgments = [{"criterion": criterion, "score": 7.0, "confidence": 0.9, "level": "good", "reasoning": "", "specific_evidence": []}
+                 for criterion in ["correctness", "efficiency", "readability"]]
+    return {"id": 1, "code": code, "language": "python", "evaluated_at": "2024-01-01T00:00:00",
+            "evaluation": {"final_score": 7.0, "individual_judgments": judgments}}
+
+def test_comment_only_resubmission_is_judged_incrementally():
+    new_code = PREVIOUS_CODE.replace("# Average of the list", "# Arithmetic mean; 0 for an empty list")
+    diff = code_diff(PREVIOUS_CODE, new_code)
+    assert not diff["code_changed"] and diff["comments_changed"]
+    assert diff["changed_lines"] == 1
+    assert diff["change_ratio"] == 0.0
+    
+    revision = LLMJudgeEvaluatorAPI()._plan_revision(previous_evaluation(PREVIOUS_CODE), new_code, "python")
+    assert revision is not None
+    assert revision["rejudge"] == ["readability"]
+    assert revision["carry"] == ["correctness", "efficiency"]
+
+def test_replaced_line_counts_once():
+    diff = code_diff(PREVIOUS_CODE, PREVIOUS_CODE.replace("return 0", "return 0.0"))
+    assert diff["code_changed"]
+    assert diff["changed_lines"] == 1
+    assert diff["change_ratio"] == 0.2
+
+def test_change_ratio_never_exceeds_one():
+    diff = code_diff(PREVIOUS_CODE, PREVIOUS_CODE.replace("def mean", "def average"))
+    assert diff["added"] == ["function average"] and diff["removed"] == ["function mean"]
+    assert diff["change_ratio"] == 1.0
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from modulo.llm_judge_retry import CircuitOpenError, RetryPolicy
+
+class BackendDown(ConnectionError):
+    pass
+
+class BadRequest(Exception):
+    status_code = 400
+
+def open_policy() -> RetryPolicy:
+    # One failure opens the circuit and it turns half-open at once.
+    policy = RetryPolicy(max_retries=1, failure_threshold=1, reset_timeout=0.0)
+    
+    async def fail(timeout):
+        raise BackendDown()
+    
+    with pytest.raises(BackendDown):
+        asyncio.run(policy.run(fail))
+    assert policy.circuit_breaker.state == "half-open"
+    return policy
+
+def test_half_open_circuit_lets_a_single_probe_through():
+    policy = open_policy()
+    started = []
+    
+    async def main():
+        release = asyncio.Event()
+        
+        async def request(timeout):
+            started.append(timeout)
+            await release.wait()
+            return "ok"
+        
+        calls = [asyncio.ensure_future(policy.run(request)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*calls, return_exceptions=True)
+    
+    results = asyncio.run(main())
+    
+    assert len(started) == 1
+    assert results.count("ok") == 1 and sum(isinstance(result, CircuitOpenError) for result in results) == 2
+    assert policy.circuit_breaker.state == "closed"
+
+def test_probe_ending_in_a_non_retryable_error_lets_the_next_caller_probe():
+    policy = open_policy()
+    
+    async def rejected(timeout):
+        raise BadRequest()
+    
+    async def accepted(timeout):
+        return "ok"
+    
+    with pytest.raises(BadRequest):
+        asyncio.run(policy.run(rejected))
+    assert asyncio.run(policy.run(accepted)) == "ok"
+    assert policy.circuit_breaker.state == "closed"
@@ -0,0 +1,67 @@
+import asyncio
+import http.client
+import threading
+import time
+from modulo.llm_judge_service import LLMJudgeEvaluationService, create_server
+
+EXERCISE = "Write a function `add(a, b)` that returns the sum of two numbers."
+
+class BlockingAPI:
+    # Holds every evaluation until released and records the order in which submissions start.
+    model_name = "stub"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+    
+    async def evaluate_with_multiple_judges_async(self, exercise_requirement, student_code, language):
+        self.started.append(student_code)
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        return {"final_score": 7.0}
+
+    def scheduler_stats(self):
+        return {"model_switches": 0, "model_loads_avoided": 0}
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+def test_coalesced_submission_raises_the_queued_job_priority():
+    api = BlockingAPI()
+    service = LLMJudgeEvaluationService(api, workers=1)
+    service.start()
+    try:
+        service.submit(EXERCISE, "running")
+        wait_for(lambda: api.started == ["running"])
+        low, _ = service.submit(EXERCISE, "low")
+        service.submit(EXERCISE, "other", priority=3)
+        job, coalesced = service.submit(EXERCISE, "low", priority=5)
+        
+        assert coalesced and job is low
+        status = service.get_job(job.job_id)
+        assert status["priority"] == 5 and status["queue_position"] == 1
+        assert service.stats()["queued"] == 2
+        
+        api.release.set()
+        wait_for(lambda: service.stats()["completed"] == 3)
+        assert api.started == ["running", "low", "other"]
+    finally:
+        api.release.set()
+        service.stop()
+
+def test_negative_content_length_is_rejected():
+    service = LLMJudgeEvaluationService(BlockingAPI())
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Length", "-1")
+        connection.endheaders()
+        assert connection.getresponse().status == 400
+    finally:
+        server.shutdown()
+        server.server_close()